@@ -0,0 +1,59 @@
+"""HTMLパーサーバックエンドごとの解析時間・本文抽出時間の比較
+
+selectolaxはlexborで不要な要素を取り除いてからlxmlで構築し直すため、
+取り除く部分の少ないページ（固定コーパスそのまま）と、スクリプト・スタイル・SVGの多いページ
+（コーパスに埋め込んだもの）の両方で計測する。
+
+使い方: python benchmarks/bench_html_parser.py [回数]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_text_extractor_advanced as wte
+from tests.test_extraction_golden import fixture_pages, read_page
+
+PARSERS = ('html.parser', 'lxml', 'selectolax')
+
+
+def make_heavy(html):
+    """一般的なサイトのようにインラインのスクリプト・スタイル・SVGを埋め込む"""
+    script = '<script>' + ';'.join(f'var a{i}={{"k":"<div>{i}</div>"}}' for i in range(1500)) + '</script>'
+    style = '<style>' + ''.join(f'.c{i}{{color:red;margin:{i}px}}' for i in range(1500)) + '</style>'
+    svg = '<svg>' + ''.join(f'<path d="M{i} {i}L{i + 1} {i + 2}"/>' for i in range(800)) + '</svg>'
+    return html.replace('<head>', '<head>' + style + script, 1).replace('<body>', '<body>' + svg + script, 1)
+
+
+def measure(func, pages, rounds):
+    """最も速かった回の所要時間（ミリ秒）"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(argv):
+    rounds = int(argv[1]) if len(argv) > 1 else 15
+
+    pages = [read_page(name) for name in fixture_pages()]
+    corpora = [('固定コーパス', pages), ('スクリプト・スタイル多め', [make_heavy(page) for page in pages])]
+
+    for label, corpus in corpora:
+        print(f"{label}: {len(corpus)}ページ, {sum(map(len, corpus))}文字, {rounds}回")
+        for parser in PARSERS:
+            extractor = wte.WebContentExtractor({'cache_enabled': False, 'html_parser': parser})
+            if extractor.get_html_parser() != parser:
+                print(f"  {parser:12s} 未インストール")
+                continue
+            parse = measure(extractor.parse_html, corpus, rounds)
+            extract = measure(lambda page: extractor.extract_main_content(page, 'http://example.com/'), corpus, rounds)
+            print(f"  {parser:12s} 解析 {parse:8.1f}ms  本文抽出 {extract:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,90 @@
+"""非同期エンジンの取得で、キャッシュ・デコードなどのブロッキング処理がイベントループのスレッドで実行されないことの確認"""
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+import web_text_extractor_advanced as wte
+
+pytestmark = pytest.mark.skipif(not wte.ASYNC_SUPPORT, reason='aiohttp がインストールされていない')
+
+BODY = '<html><head><title>テスト</title></head><body><p>本文</p></body></html>'.encode('utf-8')
+
+
+class FakeContent:
+    def __init__(self, body):
+        self._body = body
+    
+    async def read(self, size=-1):
+        data, self._body = (self._body, b'') if size < 0 else (self._body[:size], self._body[size:])
+        return data
+
+
+class FakeResponse:
+    status = 200
+    headers = {'Content-Type': 'text/html'}
+    
+    def __init__(self, body):
+        self.content = FakeContent(body)
+    
+    def raise_for_status(self):
+        pass
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    def get(self, url, **kwargs):
+        return FakeResponse(BODY)
+
+
+@pytest.fixture
+def blocking_calls(monkeypatch):
+    """ブロッキング処理を呼び出したスレッドを記録"""
+    calls = []
+    
+    def record(name, function):
+        def wrapper(*args, **kwargs):
+            calls.append((name, threading.current_thread()))
+            return function(*args, **kwargs)
+        return wrapper
+    
+    monkeypatch.setattr(wte, 'detect_html_encoding', record('detect_html_encoding', wte.detect_html_encoding))
+    monkeypatch.setattr(wte, 'decode_html_bytes', record('decode_html_bytes', wte.decode_html_bytes))
+    for name in ('_get_cache_entry', '_decode_cache_entry', '_store_cached_content'):
+        monkeypatch.setattr(wte.WebContentExtractor, name, record(name, getattr(wte.WebContentExtractor, name)))
+    return calls
+
+
+def fetch(extractor, url):
+    async def run():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            loop_thread = threading.current_thread()
+            html = await extractor.fetch_url_async(FakeSession(), executor, url)
+            return html, loop_thread
+    return asyncio.run(run())
+
+
+def test_fetch_and_cache_hit_run_blocking_work_off_the_loop(tmp_path, monkeypatch, blocking_calls):
+    monkeypatch.setattr(wte, 'CACHE_DIR', str(tmp_path))
+    extractor = wte.WebContentExtractor({'cache_enabled': True})
+    try:
+        html, loop_thread = fetch(extractor, 'http://example.com/async')
+        assert 'テスト' in html
+        extractor.save_cache()
+        
+        # キャッシュヒット（有効期限内）
+        cached_html, loop_thread = fetch(extractor, 'http://example.com/async')
+        assert cached_html == html
+    finally:
+        extractor.close_cache()
+    
+    names = {name for name, _ in blocking_calls}
+    assert {'_get_cache_entry', '_decode_cache_entry', '_store_cached_content',
+            'detect_html_encoding', 'decode_html_bytes'} <= names
+    assert all(thread is not loop_thread for _, thread in blocking_calls), blocking_calls
@@ -0,0 +1,100 @@
+"""同じWebContentExtractorで並行するバッチが、互いの取り消し用トークン・本文抽出プロセスプールに影響しないことの確認"""
+import concurrent.futures
+import itertools
+
+import pytest
+
+import web_text_extractor_advanced as wte
+from tests.test_extraction_golden import read_page
+
+PAGE = read_page('page00.html')
+
+ENGINES = ['threads', pytest.param('async', marks=pytest.mark.skipif(
+    not wte.ASYNC_SUPPORT, reason='aiohttp がインストールされていない'))]
+
+
+class FakeExtractionPool:
+    """本文抽出をその場で実行し、どのプールで抽出したかを記録するExtractionPoolの代わり"""
+    
+    ids = itertools.count()
+    
+    def __init__(self, options, settings, processes, max_pending=None):
+        self.id = next(self.ids)
+        self.processes = processes
+        self.max_pending = processes * 2
+        self.extractor = wte.WebContentExtractor({'cache_enabled': False})
+        self.urls = []
+        self.closed = 0
+    
+    def is_full(self):
+        return False
+    
+    def submit(self, html, url):
+        assert not self.closed, 'closed pool used'
+        self.urls.append(url)
+        future = concurrent.futures.Future()
+        future.set_result((self.extractor.extract_main_content(html, url), {}))
+        return future
+    
+    def close(self):
+        self.closed += 1
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    extractor = wte.WebContentExtractor({
+        'cache_enabled': False, 'exclude_duplicates': False, 'domain_rate_limit': 0,
+        'extraction_processes': 1, 'fetch_engine': 'threads',
+    })
+    fetches = []
+    
+    def fetch_url(url, timeout=None, classify=False, cancel_token=None):
+        fetches.append((str(url), cancel_token))
+        return PAGE
+    
+    async def fetch_url_async(session, executor, url, timeout=None, classify=False):
+        fetches.append((str(url), None))
+        return PAGE
+    
+    monkeypatch.setattr(extractor, 'fetch_url', fetch_url)
+    monkeypatch.setattr(extractor, 'fetch_url_async', fetch_url_async)
+    extractor.fetches = fetches
+    return extractor
+
+
+def test_finished_run_keeps_other_runs_cancel_token(extractor):
+    token_a, token_b = wte.CancellationToken(), wte.CancellationToken()
+    run_a = extractor.iter_extract(
+        [f'http://a.example/{i}' for i in range(3)], max_workers=1, window=1, cancel_token=token_a)
+    
+    # 1件目の途中で別のバッチが最後まで実行される
+    assert next(run_a)['success']
+    results_b = list(extractor.iter_extract(['http://b.example/0'], max_workers=1, cancel_token=token_b))
+    assert [result['success'] for result in results_b] == [True]
+    results_a = list(run_a)
+    
+    assert len(results_a) == 2
+    assert sorted(extractor.fetches) == sorted(
+        [(f'http://a.example/{i}', token_a) for i in range(3)] + [('http://b.example/0', token_b)])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_finished_run_keeps_other_runs_extraction_pool(extractor, monkeypatch, engine):
+    pools = []
+    
+    def create_pool(*args, **kwargs):
+        pools.append(FakeExtractionPool(*args, **kwargs))
+        return pools[-1]
+    
+    monkeypatch.setattr(wte, 'ExtractionPool', create_pool)
+    extractor.options.update(extraction_processes=2, fetch_engine=engine, async_concurrency=1)
+    
+    run_a = extractor.iter_extract([f'http://a.example/{i}' for i in range(3)], max_workers=1, window=1)
+    assert next(run_a)['success']
+    assert all(result['success'] for result in extractor.iter_extract(['http://b.example/0'], max_workers=1))
+    assert all(result['success'] for result in run_a)
+    
+    pool_a, pool_b = pools
+    assert pool_a.urls == [f'http://a.example/{i}' for i in range(3)]
+    assert pool_b.urls == ['http://b.example/0']
+    assert (pool_a.closed, pool_b.closed) == (1, 1)
@@ -0,0 +1,118 @@
+"""clean_textの削除用正規表現の確認
+
+- compile_removal_regexで書き換えた正規表現が、元のパターンをre.IGNORECASEでコンパイルしたものと同じ範囲に一致する
+- clean_textの出力が、パターンごとに順にre.subを適用する従来の実装と一致する
+"""
+import os
+import random
+import re
+
+import pytest
+
+import web_text_extractor_advanced as wte
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'clean_text_corpus.txt')
+
+
+def load_corpus():
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def fuzz_corpus(lines, count=2000, seed=13):
+    """コーパスの行と定型句の断片を組み合わせた文字列（大文字小文字・空白を変化させる）"""
+    rng = random.Random(seed)
+    words = [word for line in lines for word in re.split(r'(\s+)', line) if word]
+    texts = []
+    for _ in range(count):
+        parts = rng.sample(words, rng.randint(1, 12))
+        text = ''.join(parts)
+        # 大文字小文字の入れ替えと、re.IGNORECASEで一致する非ASCII文字への置換
+        text = ''.join(
+            rng.choice((c.upper(), c.lower(), c.swapcase(), wte.IGNORECASE_EXTRA_CHARS.get(c.lower(), c)[:1] or c))
+            if rng.random() < 0.3 else c
+            for c in text
+        )
+        texts.append(text)
+    return texts
+
+
+def all_patterns():
+    extractor = wte.WebContentExtractor({'cache_enabled': False})
+    patterns = [pattern for _, patterns in wte.WebContentExtractor.CLEAN_TEXT_PATTERNS for pattern in patterns]
+    return patterns + list(extractor.boilerplate_patterns)
+
+
+def reference_clean_text(extractor, text):
+    """従来のclean_text（パターン文字列ごとにre.subで全体を順に走査）"""
+    for option, patterns in extractor.CLEAN_TEXT_PATTERNS:
+        if extractor.options.get(option, True):
+            for pattern in patterns:
+                text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    for pattern in extractor.boilerplate_patterns:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = '\n'.join(line.strip() for line in text.split('\n'))
+    if extractor.options.get('normalize_spaces', True):
+        text = re.sub(r' {2,}', ' ', text)
+    if extractor.options.get('remove_empty_lines', True):
+        text = re.sub(r'\n{3,}', '\n\n', text)
+    text = text.strip()
+    return re.sub(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+', lambda m: f'[{m.group(0)}]({m.group(0)})', text)
+
+
+CORPUS = load_corpus()
+TEXTS = CORPUS + ['\n'.join(CORPUS)] + fuzz_corpus(CORPUS)
+
+
+def test_corpus_has_non_ascii_and_japanese_text():
+    assert any(re.search(r'[぀-ヿ一-鿿]', line) for line in CORPUS)
+    assert any(c in 'İıſK' for line in CORPUS for c in line)
+
+
+@pytest.mark.parametrize('pattern', all_patterns())
+def test_rewritten_regex_matches_reference(pattern):
+    regex, reference = wte.compile_removal_regex(pattern), re.compile(pattern, re.IGNORECASE)
+    # 既定のパターンはすべて先頭文字を区別する形に書き換えられる
+    assert not regex.flags & re.IGNORECASE
+    
+    for text in TEXTS:
+        assert [m.span() for m in regex.finditer(text)] == [m.span() for m in reference.finditer(text)], text
+
+
+@pytest.mark.parametrize('pattern', [
+    r'(\w)\1',      # 後方参照
+    r'(?i)foo',     # インラインフラグ
+    r'(ab|cd)e',    # 先頭がグループ
+    r'x?yz',        # 先頭が省略可能な文字
+    r'[Pp]romo',    # 先頭が文字クラス
+    r'Ärger',  # 先頭がASCII以外の大文字小文字のある文字
+])
+def test_unsupported_patterns_fall_back_to_ignorecase(pattern):
+    regex = wte.compile_removal_regex(pattern)
+    assert regex.pattern == pattern
+    assert regex.flags & re.IGNORECASE
+
+
+@pytest.mark.parametrize('text, expected', [
+    # 前のパターンの削除で新たに一致する文字列も削除される
+    ('MenTOPu items', 'items'),
+    ('検ログイン索 テスト', 'テスト'),
+    # 先に一致したパターンで削除された部分は後のパターンに一致しない
+    ('Copyright 2000-2020 Foo. All rights reserved. Real text here.', '2000-2020 Foo. . Real text here.'),
+])
+def test_clean_text_applies_patterns_in_order(text, expected):
+    extractor = wte.WebContentExtractor({'cache_enabled': False})
+    assert extractor.clean_text(text) == expected
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'remove_ads': False, 'remove_footer': False},
+    {'remove_navigation': False, 'normalize_spaces': False, 'remove_empty_lines': False},
+], ids=['default', 'no_ads_footer', 'no_navigation_spacing'])
+def test_clean_text_matches_sequential_reference(options):
+    extractor = wte.WebContentExtractor(dict(options, cache_enabled=False))
+    for text in TEXTS:
+        assert extractor.clean_text(text) == reference_clean_text(extractor, text), text
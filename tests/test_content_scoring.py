@@ -0,0 +1,115 @@
+"""find_content_by_scoringの1回走査による集計が、要素ごとのfind_all()・str()による計算と一致することの確認"""
+import re
+
+import pytest
+
+import web_text_extractor_advanced as wte
+from tests.test_extraction_golden import fixture_pages, read_page
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return wte.WebContentExtractor({'cache_enabled': False})
+
+
+def reference_score(extractor, candidate):
+    """要素ごとに部分木を検索・文字列化してスコアを計算（1回走査にする前の実装）"""
+    element = candidate['element']
+    score = candidate['text_length'] * 0.5 + candidate['paragraphs'] * 100
+    if candidate['depth'] < 3:
+        score *= 0.5
+    elif candidate['depth'] > 10:
+        score *= 0.8
+    score += len(element.find_all(HEADING_TAGS)) * 50
+    images = element.find_all('img')
+    if 1 <= len(images) <= 3:
+        score += len(images) * 30
+    elif len(images) > 5:
+        score -= (len(images) - 5) * 20
+    if element.find('form'):
+        score -= 300
+    links = element.find_all('a')
+    if len(links) > 10:
+        score -= (len(links) - 10) * 5
+    if element.get('style'):
+        score -= 50
+    element_class = element.get('class', [])
+    element_id = element.get('id', '')
+    for term in ['content', 'article', 'post', 'entry', 'main', 'body', 'text']:
+        if (element_class and any(term in c.lower() for c in element_class)) or (term in element_id.lower()):
+            score += 100
+    element_html = str(element)
+    for pattern in extractor.boilerplate_patterns:
+        if re.search(pattern, element_html, re.IGNORECASE):
+            score -= 100
+    return score
+
+
+def reference_find_content(extractor, soup):
+    """候補を要素の同一性で区別する、1回走査にする前のfind_content_by_scoring"""
+    candidates = []
+    for p in soup.find_all('p'):
+        text_length = len(p.get_text(strip=True))
+        if text_length > 100:
+            existing = next((c for c in candidates if c['element'] is p.parent), None)
+            if existing:
+                existing['paragraphs'] += 1
+                existing['text_length'] += text_length
+            else:
+                candidates.append({'element': p.parent, 'paragraphs': 1, 'text_length': text_length,
+                                   'depth': extractor.get_element_depth(p.parent)})
+    if not candidates:
+        for div in soup.find_all('div'):
+            text_length = len(div.get_text(strip=True))
+            if text_length > 500:
+                candidates.append({'element': div, 'paragraphs': 1, 'text_length': text_length,
+                                   'depth': extractor.get_element_depth(div)})
+
+    best_candidate = None
+    best_score = 0
+    for candidate in candidates:
+        score = reference_score(extractor, candidate)
+        if score > best_score:
+            best_score = score
+            best_candidate = candidate['element']
+    return best_candidate
+
+
+@pytest.mark.parametrize('cleaned', [False, True], ids=['raw', 'cleaned'])
+@pytest.mark.parametrize('name', fixture_pages())
+def test_scoring_selects_same_element(extractor, name, cleaned):
+    soup = extractor.parse_html(read_page(name))
+    if cleaned:
+        extractor.clean_soup(soup)
+    assert extractor.find_content_by_scoring(soup) is reference_find_content(extractor, soup)
+
+
+@pytest.mark.parametrize('name', fixture_pages())
+def test_analyze_content_tree_matches_subtree_counts(extractor, name):
+    soup = extractor.parse_html(read_page(name))
+    paragraphs, divs, stats, _ = extractor._analyze_content_tree(soup)
+
+    assert paragraphs == soup.find_all('p')
+    assert divs == soup.find_all('div')
+    for element in soup.find_all(True):
+        if element.name in ('script', 'style', 'template'):
+            # get_text()がそれ自身の中身の文字列を返す要素（祖先の集計には含まれない）
+            continue
+        text_length, headings, images, links, has_form, depth, _, _ = stats[id(element)]
+        assert text_length == len(element.get_text(strip=True))
+        assert headings == len(element.find_all(HEADING_TAGS))
+        assert images == len(element.find_all('img'))
+        assert links == len(element.find_all('a'))
+        assert has_form == (element.find('form') is not None)
+        assert depth == extractor.get_element_depth(element)
+
+
+def test_deeply_nested_layout(extractor):
+    # 入れ子の深いレイアウトでも、段落を直接持つ要素が選ばれる
+    paragraph = '<p>' + '本文の段落です。' * 20 + '</p>'
+    html = ('<html><body>' + '<div>' * 300 + '<div id="article">' + paragraph * 3 + '</div>'
+            + '</div>' * 300 + '</body></html>')
+    soup = extractor.parse_html(html)
+    assert extractor.find_content_by_scoring(soup) is soup.find(id='article')
@@ -0,0 +1,29 @@
+"""DomainSchedulerが使われなくなったドメインの状態を削除することの確認"""
+import web_text_extractor_advanced as wte
+
+
+def test_idle_domains_are_evicted():
+    scheduler = wte.DomainScheduler(rate=0, idle_timeout=0)
+    for i in range(1000):
+        scheduler.add(f'http://d{i}.example/')
+        url, _ = scheduler.acquire()
+        scheduler.release(url, {'success': True})
+    scheduler.acquire()
+    assert scheduler._domains == {}
+
+
+def test_busy_and_blocked_domains_are_kept():
+    scheduler = wte.DomainScheduler(rate=0, idle_timeout=0)
+    scheduler.add('http://active.example/')
+    scheduler.add('http://blocked.example/')
+    scheduler.add('http://queued.example/')
+    active, _ = scheduler.acquire()
+    blocked, _ = scheduler.acquire()
+    scheduler.release(blocked, {'success': False, 'status_code': 503})
+    scheduler.acquire()
+    assert set(scheduler._domains) == {'active.example', 'blocked.example', 'queued.example'}
+
+    scheduler.release(active, {'success': True})
+    scheduler.acquire()
+    assert 'active.example' not in scheduler._domains
+    assert 'blocked.example' in scheduler._domains
@@ -0,0 +1,144 @@
+"""本文抽出（clean_soup・スコアリング・extract_formatted_text）の出力が固定コーパスで変わらないことの確認
+
+期待値はhtml.parserの出力。lxmlは閉じていないタグの補い方がhtml.parserと異なるため、その差分を
+backend_differences.json に記録する。selectolax（lexborで前処理してからlxmlで構築）はlxmlとの差分だけを記録する。
+期待値を更新するときは `python -m tests.test_extraction_golden` で再生成する。
+"""
+import glob
+import json
+import os
+
+import pytest
+
+import web_text_extractor_advanced as wte
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'extraction')
+EXPECTED_PATH = os.path.join(FIXTURE_DIR, 'expected.json')
+DIFFERENCES_PATH = os.path.join(FIXTURE_DIR, 'backend_differences.json')
+BACKENDS = ('html.parser', 'lxml', 'selectolax')
+# 差分の基準にするバックエンド
+BASE_BACKENDS = {'lxml': 'html.parser', 'selectolax': 'lxml'}
+MODES = ('auto', 'content', 'fullpage', 'readability')
+FIELDS = ('title', 'description', 'content', 'formatted_text')
+
+
+def fixture_pages():
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+
+
+def read_page(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+        data = f.read()
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('shift_jis')
+
+
+def extract(extractor, name, mode):
+    extractor.options['extraction_mode'] = mode
+    result = extractor.extract_main_content(read_page(name), 'http://example.com/' + name)
+    return {field: result.get(field) for field in FIELDS}
+
+
+def make_extractor(backend):
+    return wte.WebContentExtractor({'cache_enabled': False, 'html_parser': backend})
+
+
+def backend_available(backend):
+    return make_extractor(backend).get_html_parser() == backend
+
+
+def generate_expected(backend='html.parser'):
+    extractor = make_extractor(backend)
+    return {
+        f'{name}:{mode}': extract(extractor, name, mode)
+        for name in fixture_pages()
+        for mode in MODES
+    }
+
+
+def generate_differences(expected):
+    """基準のバックエンドの出力と異なるフィールドだけをバックエンドごとに集める"""
+    outputs = {'html.parser': expected}
+    differences = {}
+    for backend in BACKENDS[1:]:
+        outputs[backend] = generate_expected(backend)
+        base = outputs[BASE_BACKENDS[backend]]
+        differences[backend] = {}
+        for key, result in outputs[backend].items():
+            changed = {field: value for field, value in result.items() if value != base[key][field]}
+            if changed:
+                differences[backend][key] = changed
+    return differences
+
+
+def apply_differences(parser_expected, differences, backend):
+    """html.parserの期待値に基準のバックエンドからの差分を順に重ねる"""
+    if backend == 'html.parser':
+        return parser_expected
+    base = apply_differences(parser_expected, differences, BASE_BACKENDS[backend])
+    return {key: dict(result, **differences[backend].get(key, {})) for key, result in base.items()}
+
+
+@pytest.fixture(scope='module', params=[
+    pytest.param(backend, marks=pytest.mark.skipif(
+        not backend_available(backend), reason=f'{backend} がインストールされていない'))
+    for backend in BACKENDS
+])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture(scope='module')
+def extractor(backend):
+    return make_extractor(backend)
+
+
+@pytest.fixture(scope='module')
+def parser_expected():
+    with open(EXPECTED_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def differences():
+    with open(DIFFERENCES_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def expected(backend, parser_expected, differences):
+    return apply_differences(parser_expected, differences, backend)
+
+
+def test_expected_covers_all_fixtures(parser_expected, differences):
+    assert sorted(parser_expected) == sorted(f'{name}:{mode}' for name in fixture_pages() for mode in MODES)
+    assert sorted(differences) == sorted(BACKENDS[1:])
+    for backend_differences in differences.values():
+        assert set(backend_differences) <= set(parser_expected)
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', fixture_pages())
+def test_extraction_matches_expected(extractor, expected, name, mode):
+    assert extract(extractor, name, mode) == expected[f'{name}:{mode}']
+
+
+def test_parse_time_is_reported_per_backend(extractor, backend):
+    extractor.parse_stats.clear()
+    extract(extractor, 'page00.html', 'auto')
+    assert list(extractor.parse_stats) == [backend]
+    assert extractor.parse_stats[backend]['count'] >= 1
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+if __name__ == '__main__':
+    expected = generate_expected()
+    write_json(EXPECTED_PATH, expected)
+    write_json(DIFFERENCES_PATH, generate_differences(expected))
@@ -0,0 +1,56 @@
+"""extract_formatted_textが入れ子のマークアップで各ブロックを1回だけ出力することの確認"""
+import pytest
+
+import web_text_extractor_advanced as wte
+
+LONG_TEXT = '長い本文のテキスト。' * 30
+
+CASES = {
+    'pre_code': (
+        '<div><pre><code>print(1)\nprint(2)</code></pre></div>',
+        '\n```\nprint(1)\nprint(2)\n```\n',
+    ),
+    'paragraph_in_list_item': (
+        '<ul><li><p>最初の項目</p></li><li><p>次の項目</p><ul><li>入れ子の項目</li></ul></li></ul>',
+        '• 最初の項目\n\n• 次の項目\n\n• 入れ子の項目',
+    ),
+    'nested_ordered_list': (
+        '<ol><li>一</li><li>二<ol><li>二の一</li><li>二の二</li></ol></li><li>三</li></ol>',
+        '1. 一\n\n2. 二\n\n1. 二の一\n\n2. 二の二\n\n3. 三',
+    ),
+    'paragraphs_in_blockquote': (
+        '<blockquote><p>引用の段落</p><p>二つ目</p></blockquote>',
+        '> 引用の段落二つ目',
+    ),
+    'figcaption': (
+        '<figure><img src="a.png"><figcaption><p>図の説明</p></figcaption></figure><p>後の段落</p>',
+        '[図: 図の説明]\n\n後の段落',
+    ),
+    'long_div': (
+        f'<div><div>{LONG_TEXT}<span>内側の要素</span></div><p>段落</p></div>',
+        f'{LONG_TEXT}内側の要素\n\n段落',
+    ),
+    'paragraph_in_table_cell': (
+        '<table><tr><td><p>セル</p></td><td>値</td></tr></table>',
+        '| セル | 値 |',
+    ),
+}
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return wte.WebContentExtractor({'cache_enabled': False})
+
+
+@pytest.mark.parametrize('html, expected', CASES.values(), ids=CASES.keys())
+def test_nested_blocks_are_output_once(extractor, html, expected):
+    soup = extractor.parse_html(f'<html><body>{html}</body></html>')
+    assert extractor.extract_formatted_text(soup.body) == expected
+
+
+def test_deeply_nested_lists_keep_every_item(extractor):
+    depth = 200
+    html = ''.join(f'<div><ol><li>項目{i}' for i in range(depth)) + '</li></ol></div>' * depth
+    soup = extractor.parse_html(f'<html><body>{html}</body></html>')
+    lines = [line for line in extractor.extract_formatted_text(soup.body).split('\n') if line]
+    assert lines == [f'1. 項目{i}' for i in range(depth)]
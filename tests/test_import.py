@@ -0,0 +1,57 @@
+"""モジュールの読み込みが軽量であることの確認（GUI・任意の依存モジュールを読み込まない）"""
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 読み込み時に読み込まれてはならないモジュール（初回使用時に遅延読み込み）
+HEAVY_MODULES = ('tkinter', 'PIL', 'lxml', 'aiohttp', 'zstandard', 'PyPDF2', 'selectolax', 'multiprocessing')
+
+# 読み込み時間の上限（マイクロ秒、-X importtimeの累積時間）
+IMPORT_BUDGET_US = 1_500_000
+
+CHECK_SCRIPT = (
+    "import sys, json\n"
+    "import web_text_extractor_advanced\n"
+    "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))\n"
+)
+
+
+def run_import():
+    """新しいインタープリタでモジュールを読み込み、(読み込まれたモジュール, importtimeの出力)を返す"""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHECK_SCRIPT],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    return set(json.loads(process.stdout.strip().splitlines()[-1])), process.stderr
+
+
+def import_time_us(importtime_output, module_name):
+    """-X importtimeの出力からモジュールの累積読み込み時間を取得"""
+    for line in importtime_output.splitlines():
+        # 例: "import time:       123 |      45678 | web_text_extractor_advanced"
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module_name:
+            return int(parts[1])
+    raise AssertionError(f"{module_name} の読み込み時間が見つかりません")
+
+
+def test_import_does_not_load_heavy_modules():
+    modules, _ = run_import()
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    assert not loaded, f"読み込み時に読み込まれたモジュール: {loaded}"
+
+
+def test_import_time_within_budget():
+    _, importtime_output = run_import()
+    assert import_time_us(importtime_output, 'web_text_extractor_advanced') < IMPORT_BUDGET_US
+
+
+def test_import_has_no_side_effects(tmp_path):
+    # ログファイルやキャッシュディレクトリを読み込み時に作成しない
+    env = dict(os.environ, HOME=str(tmp_path))
+    subprocess.run([sys.executable, '-c', 'import web_text_extractor_advanced'],
+                   cwd=tmp_path, env=dict(env, PYTHONPATH=REPO_DIR), check=True)
+    assert list(tmp_path.iterdir()) == []
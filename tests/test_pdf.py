@@ -0,0 +1,57 @@
+"""PDFからのテキスト抽出の確認"""
+import pytest
+
+import web_text_extractor_advanced as wte
+
+pytestmark = pytest.mark.skipif(not wte.PDF_SUPPORT, reason='PyPDF2 がインストールされていない')
+
+LINES = [
+    'Web Text Extractor PDF test page one.',
+    'The quick brown fox jumps over the lazy dog.',
+    'Second page of the sample document.',
+    'Text layers are extracted page by page.',
+]
+
+
+def build_pdf(pages):
+    """各ページにHelveticaのテキストを並べた最小限のPDFを組み立てる"""
+    font_id = 3 + 2 * len(pages)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join('%d 0 R' % (3 + 2 * i) for i in range(len(pages))), len(pages))).encode('ascii'),
+    ]
+    for i, lines in enumerate(pages):
+        stream = 'BT /F1 12 Tf 72 720 Td 14 TL %s ET' % ' '.join('(%s) Tj T*' % line for line in lines)
+        objects.append(('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                        '/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+                        % (font_id, 4 + 2 * i)).encode('ascii'))
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream.encode('ascii')))
+    objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    data = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return data
+
+
+def test_pdf_bytes_to_html_extracts_every_page():
+    extractor = wte.WebContentExtractor({'cache_enabled': False})
+    html = extractor.pdf_bytes_to_html(build_pdf([LINES[:2], LINES[2:]]), 'http://example.com/a.pdf')
+
+    assert 'http://example.com/a.pdf' in html
+    for line in LINES:
+        assert line in html
+    assert html.index(LINES[1]) < html.index(LINES[2])
+
+
+def test_pdf_without_text_layer_is_rejected():
+    extractor = wte.WebContentExtractor({'cache_enabled': False})
+    with pytest.raises(Exception, match='テキスト抽出に失敗'):
+        extractor.pdf_bytes_to_html(build_pdf([[]]), 'http://example.com/empty.pdf')
@@ -1,49 +1,54 @@
-import tkinter as tk
-from tkinter import ttk, scrolledtext, filedialog, messagebox, Menu, Text, font
 import threading
 import queue
+import atexit
+import concurrent.futures
 import requests
-from bs4 import BeautifulSoup
-from bs4.element import Comment
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
 import re
 import os
+import sys
+import argparse
 import time
 import datetime
+import email.utils
 import json
 import csv
 import random
 import hashlib
 import urllib.parse
 import socket
+import select
 import ssl
 import logging
 import zipfile
 import shutil
 import io
+import zlib
+import bisect
+import math
+import struct
+from array import array
 from urllib.parse import urlparse, urljoin, urlsplit, urlunsplit
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque, OrderedDict
 import tempfile
-import webbrowser
 import platform
-try:
-    from PIL import Image, ImageTk
-except ImportError:
-    pass
+import itertools
+import http.server
+import importlib
+import importlib.util
 from io import BytesIO
 import traceback
 import signal
-try:
-    import ctypes
-except ImportError:
-    pass
 from functools import lru_cache, partial
 import pickle
+import sqlite3
 
 # 必要なライブラリがインストールされていない場合、インストールする関数
 def install_required_packages():
     required_packages = [
         'beautifulsoup4', 'requests', 'Pillow', 'PyPDF2', 
-        'lxml', 'chardet'
+        'lxml', 'chardet', 'aiohttp'
     ]
     
     try:
@@ -59,26 +64,84 @@ def install_required_packages():
         return False
     return True
 
-# PyPDF2をインポートして、PDFサポートを追加
-try:
-    import PyPDF2
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
-    print("PyPDF2 not installed. PDF extraction features will be limited.")
-
-# ロギングの設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename='web_extractor.log'
-)
+# GUIで使用するモジュールを読み込む関数（コマンドラインモードでは読み込まない）
+def load_gui_modules():
+    global tk, ttk, scrolledtext, filedialog, messagebox, Menu, Text, font, Image, ImageTk
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, filedialog, messagebox, Menu, Text, font
+    try:
+        from PIL import Image, ImageTk
+    except ImportError:
+        pass
+
+# HTML解析で使用するモジュールを読み込む関数（bs4はlxmlなどのツリービルダーも読み込むため、
+# 抽出器を作成するまで読み込まない）
+BeautifulSoup = Comment = NavigableString = CData = Tag = None
+
+def load_html_modules():
+    global BeautifulSoup, Comment, NavigableString, CData, Tag
+    if BeautifulSoup is not None:
+        return
+    from bs4 import BeautifulSoup
+    from bs4.element import Comment, NavigableString, CData, Tag
+
+class LazyModule:
+    """初回の属性アクセス時に読み込まれるモジュールの代理オブジェクト"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+def has_module(name):
+    """モジュールを読み込まずにインストールされているかを判定"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# オプションの依存モジュールは存在だけを確認し、初回使用時に読み込む
+# PyPDF2: PDFサポート
+PyPDF2 = LazyModule('PyPDF2')
+PDF_SUPPORT = has_module('PyPDF2')
+
+# aiohttp: 非同期取得エンジン（asyncioも非同期エンジンでしか使わないため同様に遅延）
+asyncio = LazyModule('asyncio')
+aiohttp = LazyModule('aiohttp')
+ASYNC_SUPPORT = has_module('aiohttp')
+
+# lxml: 高速なHTMLパーサー
+LXML_SUPPORT = has_module('lxml')
+
+# selectolax: ネイティブDOMによる前処理
+selectolax_lexbor = LazyModule('selectolax.lexbor')
+# サブモジュールを指定すると親パッケージが読み込まれるため、パッケージの存在だけを確認
+SELECTOLAX_SUPPORT = has_module('selectolax')
+
+# zstandard: キャッシュの高速圧縮（なければzlib）
+zstandard = LazyModule('zstandard')
+ZSTD_SUPPORT = has_module('zstandard')
+
+# multiprocessing: 本文抽出プロセスでしか使わないため遅延
+multiprocessing = LazyModule('multiprocessing')
+
 logger = logging.getLogger('WebExtractor')
 
-# キャッシュディレクトリの設定
+def configure_logging(filename='web_extractor.log', level=logging.INFO):
+    """ログの出力先を設定（エントリーポイントから呼び出し、ライブラリとしての利用時は呼び出し側に任せる）"""
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        filename=filename
+    )
+
+# キャッシュディレクトリ（キャッシュの初回使用時に作成）
 CACHE_DIR = os.path.join(os.path.expanduser("~"), ".web_extractor_cache")
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
 
 # ユーザーエージェントのリスト（ランダムローテーション用）
 USER_AGENTS = [
@@ -94,15 +157,272 @@ url_cache = {}
 dns_cache = {}
 content_type_cache = {}
 
+# モジュール共通のHTTPトランスポート（WebContentExtractor外からの通信用）
+_default_transport = None
+
 def get_random_user_agent():
     return random.choice(USER_AGENTS)
 
+def parse_retry_after(value):
+    """Retry-Afterヘッダー（秒数またはHTTP日付）を待機秒数に変換"""
+    if not value:
+        return None
+    
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def get_cache_lifetime(headers, default_ttl=86400):
+    """Cache-Control / Expiresヘッダーからキャッシュの有効期間（秒）を算出"""
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    
+    # Cache-Controlのディレクティブを解析
+    directives = {}
+    for part in headers.get('cache-control', '').lower().split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name] = value.strip().strip('"')
+    
+    # no-cache / no-store は毎回再検証
+    if 'no-cache' in directives or 'no-store' in directives:
+        return 0
+    
+    # Ageヘッダー（中間キャッシュでの経過時間）を差し引く
+    try:
+        age = max(0, int(headers.get('age', 0)))
+    except ValueError:
+        age = 0
+    
+    if 'max-age' in directives:
+        try:
+            return max(0, int(directives['max-age']) - age)
+        except ValueError:
+            return 0
+    
+    if 'expires' in headers:
+        try:
+            expires = email.utils.parsedate_to_datetime(headers['expires']).timestamp()
+            date = email.utils.parsedate_to_datetime(headers['date']).timestamp() if 'date' in headers else time.time()
+            return max(0, expires - date - age)
+        except (TypeError, ValueError):
+            # 不正なExpiresは期限切れとして扱う
+            return 0
+    
+    return default_ttl
+
+class FetchError(Exception):
+    """HTTP取得エラー（ステータスコードとRetry-Afterの待機秒数を保持）"""
+    
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class ExtractionCancelled(Exception):
+    """バッチ処理の取り消しによる中断"""
+
+class CancellationToken:
+    """実行中のバッチを協調的に取り消すためのトークン（スレッドセーフ）
+    
+    cancel()を呼ぶと、バッチは未開始のURLを取り消し、取得中のURLはチャンクの区切りで中断し、
+    それまでの結果を出力先に同期して終了する。
+    """
+    
+    # バッチが取り消しを確認する間隔（秒）
+    POLL_INTERVAL = 0.25
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        """取り消しを要求"""
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def raise_if_cancelled(self):
+        """取り消されていればExtractionCancelledを送出"""
+        if self._event.is_set():
+            raise ExtractionCancelled("処理が取り消されました")
+
+def detect_html_encoding(body, content_type=''):
+    """レスポンスボディのエンコーディングを判定（charset指定がなければ自動検出）"""
+    match = re.search(r'charset=["\']?([\w\-]+)', content_type or '', re.IGNORECASE)
+    encoding = match.group(1) if match else None
+    
+    if not encoding and requests.compat.chardet is not None:
+        # requestsのapparent_encodingと同じ検出器を使用
+        encoding = requests.compat.chardet.detect(body).get('encoding')
+    
+    return encoding or 'utf-8'
+
+def decode_html_bytes(body, content_type='', encoding=None):
+    """レスポンスボディをテキストにデコード（エンコーディング未指定なら判定）"""
+    encoding = encoding or detect_html_encoding(body, content_type)
+    try:
+        return body.decode(encoding, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+def compress_cache_body(body):
+    """キャッシュ用にボディを圧縮（zstdが使えればzstd、なければzlib）"""
+    if ZSTD_SUPPORT:
+        return zstandard.ZstdCompressor(level=3).compress(body), 'zstd'
+    return zlib.compress(body, 6), 'zlib'
+
+def decompress_cache_body(data, codec):
+    """キャッシュのボディを展開"""
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    return data
+
+# re.IGNORECASEでASCII英字と一致する非ASCII文字
+IGNORECASE_EXTRA_CHARS = {'i': '\u0130\u0131', 'k': '\u212a', 's': '\u017f'}
+
+def split_regex_alternatives(pattern):
+    """正規表現をトップレベルの選択（|）で分割（括弧の対応が取れない場合はNone）"""
+    alternatives = []
+    start = 0
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if in_class:
+            if c == ']':
+                in_class = False
+        elif c == '[':
+            in_class = True
+            # 先頭の^と]は文字クラスの一部
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif c == '|' and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    
+    if depth or in_class:
+        return None
+    alternatives.append(pattern[start:])
+    return alternatives
+
+def split_first_char(alternative):
+    """選択肢を先頭の1文字と残りに分割
+    
+    Returns:
+    - (先頭の1文字に大文字小文字を区別せず一致する表現のリスト, 残りのパターン)
+    - 先頭が1文字に決まらない場合（グループ・文字クラス・省略可能な文字など）はNone
+    """
+    if not alternative:
+        return None
+    
+    c = alternative[0]
+    if c == '\\':
+        escaped = alternative[1:2]
+        if escaped == 'd':
+            token = r'\d'
+            variants = [token]
+        elif not escaped or escaped.isalnum() or escaped == '_':
+            # \w・\s・\bや後方参照などは扱わない
+            return None
+        else:
+            token = '\\' + escaped
+            variants = [token]
+        rest = alternative[2:]
+    elif c in '()[]{}.^$*+?|':
+        return None
+    else:
+        if c.isascii() and c.isalpha():
+            chars = c.lower() + c.upper() + IGNORECASE_EXTRA_CHARS.get(c.lower(), '')
+        elif c.lower() == c and c.upper() == c:
+            chars = c
+        else:
+            # ASCII以外の大文字小文字がある文字は扱わない
+            return None
+        token = re.escape(c)
+        variants = [re.escape(char) for char in chars]
+        rest = alternative[1:]
+    
+    # 先頭の文字の繰り返しは、1文字目を除いた残りの繰り返しとして扱う（省略できる場合は扱わない）
+    if rest[:1] in ('?', '*', '+', '{'):
+        match = re.match(r'(?:\+|\{(\d+)(?:(,)(\d*))?\})', rest)
+        if not match:
+            return None
+        if match.group(0) == '+':
+            quantifier = '*'
+        else:
+            minimum = int(match.group(1))
+            if minimum < 1:
+                return None
+            maximum = match.group(3)
+            if match.group(2) is None:
+                quantifier = f'{{{minimum - 1}}}'
+            elif maximum:
+                quantifier = f'{{{minimum - 1},{int(maximum) - 1}}}'
+            else:
+                quantifier = f'{{{minimum - 1},}}'
+        rest = f'(?:{token}){quantifier}' + rest[match.end():]
+    return variants, rest
+
+def compile_removal_regex(pattern):
+    """大文字小文字を区別しないパターンを、先頭文字で高速にスキャンできる形にコンパイル
+    
+    re.IGNORECASEでは先頭文字による高速スキャンが効かず、全位置で全選択肢を照合する。
+    そのため各選択肢を先頭文字の大文字・小文字ごとに展開し、先頭文字は区別して、
+    残りだけを(?i:...)で照合する（一致する範囲と選択肢の優先順位は元のパターンと同じ）。
+    書き換えられないパターン（インラインフラグ・後方参照・先頭が1文字に決まらないもの）は
+    そのままre.IGNORECASEでコンパイルする。
+    """
+    try:
+        if not re.search(r'\\[1-9]|\(\?P=|\(\?[aiLmsux]', pattern):
+            alternatives = split_regex_alternatives(pattern)
+            parts = [split_first_char(alternative) for alternative in alternatives] if alternatives else None
+            if parts and all(parts):
+                return re.compile('|'.join(
+                    f'{variant}(?i:{rest})' for variants, rest in parts for variant in variants
+                ))
+    except re.error:
+        pass
+    
+    return re.compile(pattern, re.IGNORECASE)
+
 class URL:
     """URLの正規化と検証を行うクラス"""
     
     @staticmethod
     def normalize(url):
         """URLを正規化する"""
+        parts = URL.normalize_parts(url)
+        if not parts:
+            return None
+        
+        # 正規化されたURLを再構築（フラグメントは除去）
+        return urlunsplit(parts + ('',))
+    
+    @staticmethod
+    def normalize_parts(url):
+        """URLを正規化した構成要素 (scheme, netloc, path, query) を返す（無効ならNone）"""
         if not url:
             return None
             
@@ -136,13 +456,8 @@ class URL:
                               ['utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content']]
             query = urllib.parse.urlencode(filtered_params)
             
-            # フラグメントの除去（通常はページ内リンクなので）
-            fragment = ''
-            
-            # 正規化されたURLを再構築
-            normalized_url = urlunsplit((parsed.scheme, netloc, path, query, fragment))
-            
-            return normalized_url
+            # フラグメントは返さない（通常はページ内リンクなので）
+            return parsed.scheme, netloc, path, query
         except Exception as e:
             logger.error(f"URL正規化エラー: {e} - URL: {url}")
             return None
@@ -162,106 +477,1596 @@ class URL:
     @staticmethod
     def get_domain(url):
         """URLのドメイン部分を取得"""
+        if isinstance(url, URLRecord):
+            return url.domain
         try:
             return urlparse(url).netloc
         except:
             return None
     
-    @staticmethod
-    def get_url_hash(url):
-        """URLのハッシュ値を取得（重複チェック用）"""
-        return hashlib.md5(url.encode('utf-8')).hexdigest()
+    @staticmethod
+    def get_url_hash(url):
+        """URLのハッシュ値を取得（重複チェック用）"""
+        return hashlib.md5(url.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def is_same_url(url1, url2):
+        """2つのURLが実質的に同じかどうかを判定"""
+        norm1 = URL.normalize(url1)
+        norm2 = URL.normalize(url2)
+        return norm1 == norm2
+    
+    @staticmethod
+    def resolve_relative_url(base_url, relative_url):
+        """相対URLを絶対URLに変換"""
+        return urljoin(base_url, relative_url)
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def get_content_type(url, timeout=5, transport=None):
+        """URLのコンテンツタイプを取得"""
+        # キャッシュを確認
+        if url in content_type_cache:
+            return content_type_cache[url]
+            
+        try:
+            # HEADリクエストでコンテンツタイプを確認（共有コネクションプール経由）
+            transport = transport or get_default_transport()
+            headers = {'User-Agent': get_random_user_agent()}
+            response = transport.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+            
+            # レスポンスヘッダーからコンテンツタイプを取得
+            content_type = response.headers.get('Content-Type', '').lower()
+            
+            # キャッシュに保存
+            content_type_cache[url] = content_type
+            
+            return content_type
+        except Exception as e:
+            logger.error(f"コンテンツタイプ取得エラー: {e} - URL: {url}")
+            return None
+    
+    @staticmethod
+    def sniff_content_type(head):
+        """レスポンスの先頭バイトからコンテンツタイプを推定（判定できなければNone）"""
+        if not head:
+            return None
+        
+        # バイナリ形式のシグネチャ
+        signatures = [
+            (b'%PDF-', 'application/pdf'),
+            (b'\x89PNG\r\n\x1a\n', 'image/png'),
+            (b'\xff\xd8\xff', 'image/jpeg'),
+            (b'GIF87a', 'image/gif'),
+            (b'GIF89a', 'image/gif'),
+            (b'ID3', 'audio/mpeg'),
+            (b'OggS', 'audio/ogg'),
+            (b'fLaC', 'audio/flac'),
+            (b'PK\x03\x04', 'application/x-zip'),
+            (b'Rar!', 'application/x-rar')
+        ]
+        for signature, content_type in signatures:
+            if head.startswith(signature):
+                return content_type
+        
+        if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+            return 'image/webp'
+        if head[4:8] == b'ftyp':
+            return 'video/mp4'
+        
+        # HTML文書の判定（先頭の空白とBOMを無視）
+        text = head[:512].lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+        if text.startswith((b'<!doctype html', b'<html', b'<head', b'<body')):
+            return 'text/html'
+        
+        return None
+    
+    @staticmethod
+    def is_pdf_url(url, content_type=None, head=None):
+        """URLがPDFファイルを指すかどうかを判定（レスポンス情報があればそれも利用）"""
+        # URL拡張子ベースの判定
+        if url.lower().endswith('.pdf'):
+            return True
+            
+        # 先頭バイトとコンテンツタイプベースの判定（追加のリクエストは送らない）
+        if URL.sniff_content_type(head) == 'application/pdf':
+            return True
+        if content_type and 'application/pdf' in content_type:
+            return True
+            
+        return False
+    
+    @staticmethod
+    def categorize_by_extension(url):
+        """URLの拡張子からカテゴリを判定（判定できなければNone）"""
+        url_lower = url.lower()
+        
+        if re.search(r'\.(pdf|doc|docx|xls|xlsx|ppt|pptx|txt|rtf|odt|ods|odp)$', url_lower):
+            return 'document'
+        elif re.search(r'\.(jpg|jpeg|png|gif|bmp|svg|webp|ico|tiff)$', url_lower):
+            return 'image'
+        elif re.search(r'\.(mp4|avi|mov|wmv|flv|mkv|webm|m4v|mpg|mpeg)$', url_lower):
+            return 'video'
+        elif re.search(r'\.(mp3|wav|ogg|flac|aac|wma|m4a)$', url_lower):
+            return 'audio'
+        elif re.search(r'\.(zip|rar|7z|tar|gz|bz2|tgz|xz)$', url_lower):
+            return 'archive'
+        
+        return None
+    
+    @staticmethod
+    def categorize_content_type(content_type):
+        """コンテンツタイプからカテゴリを判定（判定できなければNone）"""
+        if not content_type:
+            return None
+        
+        if 'text/html' in content_type:
+            return 'html'
+        elif 'application/pdf' in content_type:
+            return 'document'
+        elif content_type.startswith('image/'):
+            return 'image'
+        elif content_type.startswith('video/'):
+            return 'video'
+        elif content_type.startswith('audio/'):
+            return 'audio'
+        elif 'application/x-zip' in content_type or 'application/x-rar' in content_type:
+            return 'archive'
+        
+        return None
+    
+    @staticmethod
+    def categorize_url(url, content_type=None, head=None):
+        """URLのカテゴリを判定（文書、画像、動画など）
+        
+        GETレスポンスのContent-Typeと先頭バイトが渡された場合はそれを使って判定する。
+        判定のための追加リクエストは送らない。
+        """
+        # 拡張子ベースの判定
+        category = URL.categorize_by_extension(url)
+        if category:
+            return category
+        
+        # 先頭バイトのシグネチャを優先（誤ったContent-Typeを返すサーバー対策）
+        sniffed_type = URL.sniff_content_type(head)
+        if sniffed_type and sniffed_type != 'text/html':
+            return URL.categorize_content_type(sniffed_type)
+        
+        # コンテンツタイプベースの判定
+        category = URL.categorize_content_type(content_type)
+        if category:
+            return category
+        
+        # デフォルトはHTML
+        return 'html'
+
+class URLRecord:
+    """取り込み時に一度だけ正規化したURL
+    
+    正規化済みURL・構成要素・ドメイン・カテゴリを保持し、パイプラインの各段階は
+    URL文字列の代わりにこれを受け取って正規化や解析を繰り返さない。
+    URL文字列と等価に比較・ハッシュできるため、文字列のキーと混在してもよい。
+    """
+    __slots__ = ('url', 'scheme', 'domain', 'path', 'query', 'category', '_url_hash')
+    
+    def __init__(self, scheme, domain, path, query):
+        self.url = urlunsplit((scheme, domain, path, query, ''))
+        self.scheme = scheme
+        self.domain = domain
+        self.path = path
+        self.query = query
+        # 拡張子で判定できるカテゴリ（判定できなければNone）
+        self.category = URL.categorize_by_extension(self.url)
+        self._url_hash = None
+    
+    @classmethod
+    def parse(cls, url):
+        """URLを正規化してレコードを作成（レコードならそのまま返し、無効ならNone）"""
+        if isinstance(url, URLRecord):
+            return url
+        
+        parts = URL.normalize_parts(url)
+        return cls(*parts) if parts else None
+    
+    @property
+    def url_hash(self):
+        """正規化済みURLのハッシュ値（重複チェック・キャッシュ用、初回のみ計算）"""
+        if self._url_hash is None:
+            self._url_hash = URL.get_url_hash(self.url)
+        return self._url_hash
+    
+    @property
+    def is_pdf(self):
+        """拡張子からPDFと判定できるかどうか"""
+        return URL.is_pdf_url(self.url)
+    
+    def __str__(self):
+        return self.url
+    
+    def __repr__(self):
+        return f"URLRecord({self.url!r})"
+    
+    def __eq__(self, other):
+        if isinstance(other, URLRecord):
+            return self.url == other.url
+        if isinstance(other, str):
+            return self.url == other
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash(self.url)
+
+def _counting_pool_class(base_class, transport):
+    """接続の再利用/新規作成を記録するコネクションプールクラスを生成"""
+    class CountingConnectionPool(base_class):
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            # ソケットが残っていればキープアライブ接続の再利用、なければ新規接続
+            transport.record_connection(getattr(conn, 'sock', None) is not None)
+            return conn
+    
+    return CountingConnectionPool
+
+
+class PoolCountingAdapter(HTTPAdapter):
+    """プール統計を記録するHTTPAdapter"""
+    
+    def __init__(self, transport, **kwargs):
+        self.transport = transport
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool_class(HTTPConnectionPool, self.transport),
+            'https': _counting_pool_class(HTTPSConnectionPool, self.transport)
+        }
+
+
+class HTTPTransport:
+    """HTTP通信を一元管理するトランスポート層（ホスト単位のコネクションプールとキープアライブ）"""
+    
+    def __init__(self, max_connections=10, pool_hosts=100):
+        # ホストごとの最大接続数とプールを保持するホスト数
+        self.max_connections = max_connections
+        self.pool_hosts = pool_hosts
+        
+        # プール統計（再利用=ヒット / 新規接続=ミス）
+        self.stats = {'hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+        
+        self.session = requests.Session()
+        self._mount_adapters()
+    
+    def _mount_adapters(self):
+        """プールサイズに合わせたアダプタをセッションに登録"""
+        adapter = PoolCountingAdapter(
+            self,
+            pool_connections=self.pool_hosts,
+            pool_maxsize=self.max_connections
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def ensure_pool_size(self, max_connections):
+        """同時接続数がプールサイズを超える場合はプールを拡張"""
+        if max_connections > self.max_connections:
+            self.max_connections = max_connections
+            self._mount_adapters()
+    
+    def record_connection(self, reused):
+        """接続の取得を統計に記録"""
+        with self._stats_lock:
+            if reused:
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+    
+    def get_pool_stats(self):
+        """プールのヒット/ミス数と再利用率を取得"""
+        with self._stats_lock:
+            hits = self.stats['hits']
+            misses = self.stats['misses']
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0
+        }
+    
+    def get(self, url, **kwargs):
+        """GETリクエストを送信"""
+        return self.session.get(url, **kwargs)
+    
+    def head(self, url, **kwargs):
+        """HEADリクエストを送信"""
+        return self.session.head(url, **kwargs)
+    
+    def create_async_session(self, limit):
+        """同じプール統計を記録するaiohttpセッションを作成"""
+        async def on_connection_reuse(session, context, params):
+            self.record_connection(True)
+        
+        async def on_connection_create(session, context, params):
+            self.record_connection(False)
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_reuseconn.append(on_connection_reuse)
+        trace_config.on_connection_create_end.append(on_connection_create)
+        
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=max(self.max_connections, 1),
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+    
+    def close(self):
+        """プール内の接続をすべて閉じる"""
+        self.session.close()
+
+
+class DomainState:
+    """ドメインごとの待ち行列とレート制限の状態"""
+    
+    def __init__(self, burst):
+        self.queue = deque()
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.active = 0
+        self.blocked_until = 0.0
+        self.error_streak = 0
+        self.in_rotation = False
+        self.last_used = self.updated
+
+
+class DomainScheduler:
+    """ドメイン単位の礼儀正しいスケジューラ（トークンバケットによるレート制限）
+    
+    URLをURL.get_domainごとの待ち行列に振り分け、ドメインごとの
+    毎秒リクエスト数と同時接続数の上限を守りながら、ドメイン間を
+    ラウンドロビンで巡回して次に処理するURLを払い出す。
+    Retry-Afterの指定やエラーの連続に応じてドメインごとに待機する。
+    待ち行列が空で処理中のURLもなく、idle_timeout秒以上使われていないドメインの状態は
+    acquireの中で定期的に削除する（長時間のストリーミングで状態が増え続けないように）。
+    """
+    
+    # レート制限・一時的な過負荷を示すステータスコード
+    THROTTLE_STATUS_CODES = (429, 503)
+    
+    def __init__(self, rate=2.0, max_concurrency=2, burst=None, max_retries=2, max_backoff=300, idle_timeout=60):
+        # rateが0以下の場合はレート制限なし
+        self.rate = rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.burst = burst if burst else max(1.0, self.max_concurrency)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+        
+        self._domains = {}
+        self._rotation = deque()
+        self._attempts = {}
+        self._pending = 0
+        self._next_sweep = time.monotonic() + idle_timeout
+        self._lock = threading.Lock()
+    
+    def _get_state(self, domain):
+        state = self._domains.get(domain)
+        if state is None:
+            state = DomainState(self.burst)
+            self._domains[domain] = state
+        return state
+    
+    def _enqueue(self, url, front=False):
+        domain = URL.get_domain(url) or ''
+        state = self._get_state(domain)
+        if front:
+            state.queue.appendleft(url)
+        else:
+            state.queue.append(url)
+        self._pending += 1
+        
+        # 巡回対象に登録
+        if not state.in_rotation:
+            state.in_rotation = True
+            self._rotation.append(domain)
+    
+    def add(self, url):
+        """URLをドメインの待ち行列に追加"""
+        with self._lock:
+            self._enqueue(url)
+    
+    def __len__(self):
+        with self._lock:
+            return self._pending
+    
+    def has_pending(self):
+        """未処理のURLが残っているか"""
+        with self._lock:
+            return self._pending > 0
+    
+    def _wait_time(self, state, now):
+        """ドメインから次のURLを払い出せるまでの秒数（同時接続数の上限ならNone）"""
+        if state.active >= self.max_concurrency:
+            return None
+        
+        wait = max(0.0, state.blocked_until - now)
+        
+        if self.rate > 0:
+            # トークンを補充
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+            state.updated = now
+            if state.tokens < 1:
+                wait = max(wait, (1 - state.tokens) / self.rate)
+        
+        return wait
+    
+    def _evict_idle(self, now):
+        """使われなくなったドメインの状態を削除"""
+        for domain, state in list(self._domains.items()):
+            if state.in_rotation or state.active or state.blocked_until > now:
+                continue
+            if now - state.last_used < self.idle_timeout:
+                continue
+            # トークンが満たされるまでは削除しない（削除でレート制限を回避しない）
+            if self.rate > 0 and state.tokens + (now - state.updated) * self.rate < self.burst:
+                continue
+            del self._domains[domain]
+    
+    def acquire(self):
+        """次に処理可能なURLを取得
+        
+        Returns:
+        - (url, 0): 処理可能なURL
+        - (None, 秒数): レート制限で待機が必要な場合の最短待機時間
+        - (None, None): 処理中のURLの完了待ち、または未処理URLなし
+        """
+        with self._lock:
+            now = time.monotonic()
+            min_wait = None
+            
+            if now >= self._next_sweep:
+                self._evict_idle(now)
+                self._next_sweep = now + self.idle_timeout
+            
+            for _ in range(len(self._rotation)):
+                domain = self._rotation.popleft()
+                state = self._domains[domain]
+                
+                # 待ち行列が空のドメインは巡回から外す
+                if not state.queue:
+                    state.in_rotation = False
+                    continue
+                
+                self._rotation.append(domain)
+                wait = self._wait_time(state, now)
+                if wait is None:
+                    continue
+                
+                if wait <= 0:
+                    url = state.queue.popleft()
+                    self._pending -= 1
+                    state.active += 1
+                    state.last_used = now
+                    if not state.queue:
+                        # 待ち行列が空になったドメインは巡回から外す
+                        self._rotation.pop()
+                        state.in_rotation = False
+                    if self.rate > 0:
+                        state.tokens -= 1
+                    return url, 0
+                
+                min_wait = wait if min_wait is None else min(min_wait, wait)
+            
+            return None, min_wait
+    
+    def _apply_backoff(self, state, retry_after=None):
+        """エラーの連続回数に応じてドメインを一時停止"""
+        state.error_streak += 1
+        base_interval = 1.0 / self.rate if self.rate > 0 else 1.0
+        delay = min(self.max_backoff, base_interval * (2 ** state.error_streak))
+        if retry_after is not None:
+            # Retry-Afterの指定はバックオフより優先
+            delay = min(self.max_backoff, max(delay, retry_after))
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+    
+    def requeue(self, url, error):
+        """レート制限で拒否されたURLを再試行用に戻す（戻した場合はTrue）"""
+        status_code = getattr(error, 'status_code', None)
+        if status_code not in self.THROTTLE_STATUS_CODES:
+            return False
+        
+        with self._lock:
+            attempts = self._attempts.get(url, 0)
+            if attempts >= self.max_retries:
+                return False
+            self._attempts[url] = attempts + 1
+            
+            # Retry-Afterを尊重してドメインを待機させ、先頭に戻す
+            state = self._get_state(URL.get_domain(url) or '')
+            self._apply_backoff(state, getattr(error, 'retry_after', None))
+            self._enqueue(url, front=True)
+        
+        logger.warning(f"レート制限のため再試行します ({attempts + 1}/{self.max_retries}): {url}")
+        return True
+    
+    def release(self, url, result=None):
+        """URLの処理完了を通知し、結果に応じてドメインのバックオフを調整"""
+        with self._lock:
+            state = self._get_state(URL.get_domain(url) or '')
+            state.active = max(0, state.active - 1)
+            state.last_used = time.monotonic()
+            
+            # 再試行のために戻されたURL（バックオフは適用済み）
+            if result is None or result.get('retrying'):
+                return
+            
+            self._attempts.pop(url, None)
+            
+            status_code = result.get('status_code')
+            host_error = (
+                status_code is not None and (status_code in self.THROTTLE_STATUS_CODES or status_code >= 500)
+            ) or result.get('error_type') == 'TimeoutError'
+            
+            if host_error:
+                self._apply_backoff(state, result.get('retry_after'))
+            elif result.get('success'):
+                state.error_streak = 0
+
+
+class ByteLRUCache:
+    """合計バイト数で上限を設けたLRUキャッシュ（スレッドセーフ）"""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """値を取得し、最近使用したものとして記録"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+    
+    def put(self, key, value, size):
+        """値を追加し、上限を超えたら最も古く使われたものから削除"""
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            
+            # 上限より大きい値は保持しない
+            if size > self.max_bytes:
+                return
+            
+            self._items[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+
+class CacheStore:
+    """SQLite（WALモード）による永続キャッシュストア
+    
+    URL.get_url_hashをキーにエントリ単位で読み書きするため、起動時の全件ロードや
+    保存時の全件書き直しが発生しない。ボディは圧縮済みの生バイト列で保持し、
+    合計サイズが上限を超えると最も古く使われたものから削除する。
+    よく使うエントリはバイト数で上限を設けたメモリ上のLRUにも保持する。
+    
+    書き込みは上限付きのキューを介して専用の書き込みスレッドが一定間隔でまとめて行うため、
+    呼び出し側のスレッドはディスクI/Oを待たない。読み込みは別の接続で行う。
+    """
+    
+    # 最終アクセス時刻をディスクに反映する間隔（秒）
+    TOUCH_INTERVAL = 3600
+    
+    # 1トランザクションで書き込む最大件数
+    WRITE_BATCH_SIZE = 500
+    
+    def __init__(self, path, max_bytes=2 * 1024 ** 3, memory_bytes=256 * 1024 ** 2, max_result_bytes=512 * 1024 ** 2,
+                 flush_interval=1.0, write_queue_size=1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        self.flush_interval = flush_interval
+        self.memory = ByteLRUCache(memory_bytes)
+        
+        # 書き込み用の接続（初期化後は書き込みスレッドだけが使用）
+        self._conn = self._connect()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                codec TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )""")
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed)')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                result_key TEXT PRIMARY KEY,
+                result BLOB NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )""")
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self._conn.commit()
+        
+        # テキストで保存していた旧テーブルを移行
+        if self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'entries'").fetchone():
+            self._migrate_text_entries()
+        
+        # 件数と合計サイズはmetaテーブルで管理（起動時に全件を走査しない）
+        meta = dict(self._conn.execute('SELECT key, value FROM meta').fetchall())
+        if 'count' in meta and 'total_bytes' in meta and 'result_bytes' in meta:
+            self.count = meta['count']
+            self.total_bytes = meta['total_bytes']
+            self.result_bytes = meta['result_bytes']
+        else:
+            self.count, self.total_bytes = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+            self.result_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            self._save_meta()
+            self._conn.commit()
+        
+        # 読み込み用の接続（WALモードのため書き込み中も読み込める）
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        
+        # 書き込み待ちのエントリ（ディスクに書き込まれるまで読み込み時に参照）
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self.dropped_writes = 0
+        
+        self._queue = queue.Queue(maxsize=write_queue_size)
+        self._writer = threading.Thread(target=self._write_loop, name='CacheWriter', daemon=True)
+        self._writer.start()
+    
+    def __len__(self):
+        return self.count
+    
+    def __contains__(self, url_hash):
+        return self.get(url_hash) is not None
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    def _migrate_text_entries(self):
+        """デコード済みテキストで保存された旧形式のエントリを圧縮バイト列に変換"""
+        rows = self._conn.execute('SELECT url_hash, content, headers, timestamp, expires FROM entries').fetchall()
+        for url_hash, content, headers, timestamp, expires in rows:
+            body, codec = compress_cache_body(content.encode('utf-8'))
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (url_hash, body, codec, encoding, headers, timestamp, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url_hash, body, codec, 'utf-8', headers, timestamp, expires, timestamp, len(body) + len(headers)))
+        self._conn.execute('DROP TABLE entries')
+        self._conn.execute('DELETE FROM meta')
+        self._conn.commit()
+        logger.info(f"キャッシュを圧縮形式に移行しました: {len(rows)}件")
+    
+    def _save_meta(self):
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            [('count', self.count), ('total_bytes', self.total_bytes), ('result_bytes', self.result_bytes)])
+    
+    def _enqueue(self, op, key, value):
+        """書き込みをキューに追加（キューが満杯の場合は待たずに破棄）"""
+        try:
+            self._queue.put_nowait((op, key, value))
+            return True
+        except queue.Full:
+            with self._pending_lock:
+                self.dropped_writes += 1
+                dropped = self.dropped_writes
+            logger.debug(f"キャッシュの書き込みキューが満杯のため破棄しました: {key}")
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"キャッシュの書き込みキューが満杯のため書き込みを破棄しています（累計 {dropped}件）")
+            return False
+    
+    def _get_pending(self, pending_key):
+        with self._pending_lock:
+            return self._pending.get(pending_key)
+    
+    def get(self, url_hash):
+        """エントリを取得（なければNone）"""
+        entry = self.memory.get(url_hash) or self._get_pending(('page', url_hash))
+        
+        if entry is None:
+            with self._read_lock:
+                row = self._read_conn.execute(
+                    'SELECT body, codec, encoding, headers, timestamp, expires, accessed, size FROM pages WHERE url_hash = ?',
+                    (url_hash,)).fetchone()
+            if row is None:
+                return None
+            
+            body, codec, encoding, headers, timestamp, expires, accessed, size = row
+            entry = {
+                'body': body,
+                'codec': codec,
+                'encoding': encoding,
+                'headers': json.loads(headers),
+                'timestamp': timestamp,
+                'expires': expires,
+                'accessed': accessed
+            }
+            self.memory.put(url_hash, entry, size)
+        
+        # 削除順（LRU）のための最終アクセス時刻は一定間隔でのみ書き込む
+        now = time.time()
+        if now - entry['accessed'] > self.TOUCH_INTERVAL:
+            entry['accessed'] = now
+            self._enqueue('touch_page', url_hash, now)
+        
+        return entry
+    
+    def put(self, url_hash, entry):
+        """エントリを保存（同じキーがあれば置き換え、ディスクへの書き込みは非同期）"""
+        headers = json.dumps(entry.get('headers', {}), ensure_ascii=False)
+        size = len(entry['body']) + len(headers)
+        entry = dict(entry, accessed=time.time())
+        
+        self.memory.put(url_hash, entry, size)
+        with self._pending_lock:
+            self._pending[('page', url_hash)] = entry
+        
+        if not self._enqueue('page', url_hash, (entry, headers, size)):
+            self._discard_pending(('page', url_hash), entry)
+    
+    def get_result(self, result_key):
+        """本文抽出結果を取得（なければNone）"""
+        memory_key = 'result:' + result_key
+        data = self.memory.get(memory_key) or self._get_pending(('result', result_key))
+        
+        if data is None:
+            with self._read_lock:
+                row = self._read_conn.execute(
+                    'SELECT result, accessed FROM results WHERE result_key = ?', (result_key,)).fetchone()
+            if row is None:
+                return None
+            
+            data, accessed = row
+            # 削除順（LRU）のための最終アクセス時刻は一定間隔でのみ書き込む
+            now = time.time()
+            if now - accessed > self.TOUCH_INTERVAL:
+                self._enqueue('touch_result', result_key, now)
+            
+            self.memory.put(memory_key, data, len(data))
+        
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+    
+    def put_result(self, result_key, result):
+        """本文抽出結果を圧縮して保存（ディスクへの書き込みは非同期）"""
+        data = zlib.compress(json.dumps(result, ensure_ascii=False, default=str).encode('utf-8'), 6)
+        
+        self.memory.put('result:' + result_key, data, len(data))
+        with self._pending_lock:
+            self._pending[('result', result_key)] = data
+        
+        if not self._enqueue('result', result_key, data):
+            self._discard_pending(('result', result_key), data)
+    
+    def _discard_pending(self, pending_key, value):
+        """書き込み済み（または破棄した）エントリを書き込み待ちから外す"""
+        with self._pending_lock:
+            if self._pending.get(pending_key) is value:
+                del self._pending[pending_key]
+    
+    def _write_loop(self):
+        """キューに溜まった書き込みを一定間隔でまとめて反映する"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            
+            # 制御要求（flush / stop）が来るか、間隔が経過するまで溜める
+            while batch[-1][0] not in ('flush', 'stop') and len(batch) < self.WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            writes = [item for item in batch if item[0] not in ('flush', 'stop')]
+            try:
+                self._write_batch(writes)
+            except Exception as e:
+                logger.error(f"キャッシュの書き込み中にエラーが発生しました（{len(writes)}件を破棄）: {e}")
+                self._conn.rollback()
+            
+            op, _, value = batch[-1]
+            if op == 'flush':
+                try:
+                    self._conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+                except sqlite3.Error as e:
+                    logger.error(f"キャッシュのチェックポイント中にエラーが発生しました: {e}")
+                value.set()
+            elif op == 'stop':
+                self._conn.close()
+                value.set()
+                return
+    
+    def _write_batch(self, batch):
+        """書き込みを1トランザクションで反映（失敗した場合も書き込み待ちから外す）"""
+        if not batch:
+            return
+        
+        try:
+            self._write_entries(batch)
+        finally:
+            for op, key, value in batch:
+                if op == 'page':
+                    self._discard_pending(('page', key), value[0])
+                elif op == 'result':
+                    self._discard_pending(('result', key), value)
+    
+    def _write_entries(self, batch):
+        """書き込みを1トランザクションで反映"""
+        # 同じファイルを開いている他のストアの書き込みを反映した件数・サイズから更新する
+        self._conn.execute('BEGIN IMMEDIATE')
+        meta = dict(self._conn.execute('SELECT key, value FROM meta').fetchall())
+        self.count = meta.get('count', self.count)
+        self.total_bytes = meta.get('total_bytes', self.total_bytes)
+        self.result_bytes = meta.get('result_bytes', self.result_bytes)
+        
+        for op, key, value in batch:
+            if op == 'page':
+                entry, headers, size = value
+                old = self._conn.execute('SELECT size FROM pages WHERE url_hash = ?', (key,)).fetchone()
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO pages (url_hash, body, codec, encoding, headers, timestamp, expires, accessed, size) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, entry['body'], entry['codec'], entry['encoding'], headers,
+                     entry.get('timestamp', entry['accessed']), entry.get('expires'), entry['accessed'], size))
+                if old is None:
+                    self.count += 1
+                    self.total_bytes += size
+                else:
+                    self.total_bytes += size - old[0]
+            
+            elif op == 'result':
+                old = self._conn.execute('SELECT size FROM results WHERE result_key = ?', (key,)).fetchone()
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO results (result_key, result, accessed, size) VALUES (?, ?, ?, ?)',
+                    (key, value, time.time(), len(value)))
+                self.result_bytes += len(value) - (old[0] if old else 0)
+            
+            elif op == 'touch_page':
+                self._conn.execute('UPDATE pages SET accessed = ? WHERE url_hash = ?', (value, key))
+            
+            elif op == 'touch_result':
+                self._conn.execute('UPDATE results SET accessed = ? WHERE result_key = ?', (value, key))
+        
+        # 上限を超えたら最も古く使われたものから削除
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+        if self.result_bytes > self.max_result_bytes:
+            self._evict_results()
+        
+        self._save_meta()
+        self._conn.commit()
+    
+    def _evict(self):
+        """合計サイズが上限の9割に収まるまで最も古く使われたエントリを削除"""
+        target = self.max_bytes * 0.9
+        while self.total_bytes > target and self.count > 0:
+            rows = self._conn.execute(
+                'SELECT url_hash, size FROM pages ORDER BY accessed LIMIT 100').fetchall()
+            if not rows:
+                break
+            self._conn.executemany('DELETE FROM pages WHERE url_hash = ?', [(row[0],) for row in rows])
+            self.count -= len(rows)
+            self.total_bytes -= sum(row[1] for row in rows)
+        
+        logger.info(f"キャッシュを削減しました: {self.count}件 / {self.total_bytes // (1024 * 1024)}MB")
+    
+    def _evict_results(self):
+        """本文抽出結果の合計サイズが上限の9割に収まるまで最も古く使われたものを削除"""
+        target = self.max_result_bytes * 0.9
+        while self.result_bytes > target:
+            rows = self._conn.execute(
+                'SELECT result_key, size FROM results ORDER BY accessed LIMIT 100').fetchall()
+            if not rows:
+                break
+            self._conn.executemany('DELETE FROM results WHERE result_key = ?', [(row[0],) for row in rows])
+            self.result_bytes -= sum(row[1] for row in rows)
+    
+    def flush(self, timeout=None):
+        """書き込み待ちのエントリをすべてディスクに反映（完了まで待機）"""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(('flush', None, done))
+        done.wait(timeout)
+    
+    def close(self, timeout=None):
+        """書き込み待ちのエントリを反映して接続を閉じる"""
+        if self._writer.is_alive():
+            done = threading.Event()
+            self._queue.put(('stop', None, done))
+            done.wait(timeout)
+        with self._read_lock:
+            self._read_conn.close()
+
+
+def get_default_transport():
+    """モジュール共通のHTTPトランスポートを取得"""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = HTTPTransport()
+    return _default_transport
+
+
+# 本文抽出プロセス内の抽出器（ExtractionPoolのプロセス起動時に1回だけ作成）
+_worker_extractor = None
+
+def _init_extraction_worker(options, settings):
+    """本文抽出プロセスの初期化（親プロセスと同じ設定の抽出器を作成）"""
+    global _worker_extractor
+    # 重複検出とカテゴリのインデックスは親プロセスだけが持つ
+    worker_options = dict(options, cache_enabled=False, exclude_duplicates=False)
+    worker_options.pop('dedup_index_path', None)
+    worker_options.pop('category_index_path', None)
+    _worker_extractor = WebContentExtractor(worker_options)
+    for name, value in settings.items():
+        setattr(_worker_extractor, name, value)
+
+def _run_extraction_worker(html, url):
+    """本文抽出プロセスでHTMLから本文を抽出（抽出結果と解析時間の統計を返す）"""
+    extractor = _worker_extractor
+    extractor.parse_stats = {}
+    result = extractor._extract_main_content(html, url)
+    return result, extractor.parse_stats
+
+
+class ExtractionPool:
+    """本文抽出（解析・クリーニング・スコアリング）を別プロセスで実行するプール
+    
+    取得（I/O）とは別のステージとして、取得済みのHTMLを受け取って処理する。
+    処理待ちの件数がmax_pendingに達している間は、呼び出し側が新しいURLの取得を控える。
+    """
+    
+    def __init__(self, options, settings, processes, max_pending=None):
+        self.processes = processes
+        self.max_pending = max_pending or processes * 2
+        self.pending = 0
+        self._lock = threading.Lock()
+        # 取得スレッドやキャッシュの書き込みスレッドが動いている状態でforkすると、
+        # fork時に保持されていたロックで子プロセスが停止し得るため、新しいプロセスから起動する
+        # （初期化の引数はpickle可能なオプションと設定のみ）
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_extraction_worker,
+            initargs=(dict(options), settings)
+        )
+    
+    def is_full(self):
+        """処理待ちの件数が上限に達しているか"""
+        with self._lock:
+            return self.pending >= self.max_pending
+    
+    def submit(self, html, url):
+        """HTMLを抽出プロセスに渡す（Futureの結果は (抽出結果, 解析時間の統計)）"""
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self._executor.submit(_run_extraction_worker, html, url)
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(self._done)
+        return future
+    
+    def _done(self, future=None):
+        with self._lock:
+            self.pending -= 1
+    
+    def close(self):
+        """プロセスを終了（未処理のタスクは取り消す）"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# 逐次出力で書き出す結果のフィールド
+RESULT_SINK_FIELDS = ('url', 'success', 'category', 'timestamp', 'title', 'content', 'error', 'error_type', 'status_code')
+
+def result_to_record(result):
+    """抽出結果を逐次出力用のフラットなレコードに変換"""
+    raw_result = result.get('raw_result')
+    return {
+        'url': result.get('url', ''),
+        'success': bool(result.get('success')),
+        'category': result.get('category', ''),
+        'timestamp': result.get('timestamp', ''),
+        'title': raw_result.get('title', '') if isinstance(raw_result, dict) else '',
+        'content': result.get('content', '') if result.get('success') else '',
+        'error': result.get('error', ''),
+        'error_type': result.get('error_type', ''),
+        'status_code': result.get('status_code')
+    }
+
+
+def dump_result_json(result):
+    """抽出結果を1行のJSON文字列に変換"""
+    return json.dumps(result, ensure_ascii=False, default=str)
+
+
+class ResultSink:
+    """抽出結果を完了した順に追記する出力先の基底クラス
+    
+    書き込みはバッファリングし、flush_every件ごと、またはfsync_interval秒ごとに
+    ディスクへ同期するため、処理が途中で異常終了しても同期済みの結果は残る。
+    """
+    
+    def __init__(self, path, flush_every=100, fsync_interval=5.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._closed = False
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+    
+    def write(self, result):
+        """結果を1件追記"""
+        with self._lock:
+            self._write(result)
+            self.count += 1
+            self._unsynced += 1
+            if self._unsynced >= self.flush_every or time.monotonic() - self._synced_at >= self.fsync_interval:
+                self._sync()
+    
+    def flush(self):
+        """バッファの内容をディスクに同期"""
+        with self._lock:
+            if self._unsynced and not self._closed:
+                self._sync()
+    
+    def close(self):
+        """同期して出力先を閉じる"""
+        with self._lock:
+            if self._closed:
+                return
+            self._sync()
+            self._close()
+            self._closed = True
+    
+    def _sync(self):
+        self._flush()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+    
+    def _write(self, result):
+        raise NotImplementedError
+    
+    def _flush(self):
+        raise NotImplementedError
+    
+    def _close(self):
+        raise NotImplementedError
+
+
+class FileResultSink(ResultSink):
+    """テキストファイルに追記する出力先の基底クラス（パスが'-'なら標準出力）"""
+    
+    def __init__(self, path, flush_every=100, fsync_interval=5.0):
+        super().__init__(path, flush_every, fsync_interval)
+        if path == '-':
+            self._file = sys.stdout
+            self._is_new = True
+        else:
+            self._file = open(path, 'a', encoding='utf-8', newline='', buffering=1024 * 1024)
+            # 新規ファイルかどうか（CSVのヘッダー出力に使用）
+            self._is_new = self._file.tell() == 0
+    
+    def _flush(self):
+        self._file.flush()
+        if self._file is not sys.stdout:
+            os.fsync(self._file.fileno())
+    
+    def _close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class JSONLResultSink(FileResultSink):
+    """結果を1行1件のJSONとして追記（結果の辞書をそのまま出力）"""
+    
+    def _write(self, result):
+        self._file.write(dump_result_json(result))
+        self._file.write('\n')
+
+
+class CSVResultSink(FileResultSink):
+    """結果をCSVの1行として追記（RESULT_SINK_FIELDSの列）"""
+    
+    def __init__(self, path, flush_every=100, fsync_interval=5.0):
+        super().__init__(path, flush_every, fsync_interval)
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_SINK_FIELDS)
+        if self._is_new:
+            self._writer.writeheader()
+    
+    def _write(self, result):
+        self._writer.writerow(result_to_record(result))
+
+
+class SQLiteResultSink(ResultSink):
+    """結果をSQLiteのresultsテーブルに追記（URLとカテゴリにインデックス）"""
+    
+    def __init__(self, path, flush_every=100, fsync_interval=5.0):
+        super().__init__(path, flush_every, fsync_interval)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                category TEXT,
+                timestamp TEXT,
+                title TEXT,
+                content TEXT,
+                error TEXT,
+                error_type TEXT,
+                status_code INTEGER
+            )""")
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_results_url ON results (url)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_results_category ON results (category, success)')
+        self._conn.commit()
+        self._insert_sql = (
+            f"INSERT INTO results ({', '.join(RESULT_SINK_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(RESULT_SINK_FIELDS))})")
+    
+    def _write(self, result):
+        record = result_to_record(result)
+        self._conn.execute(self._insert_sql, [record[field] for field in RESULT_SINK_FIELDS])
+    
+    def _flush(self):
+        self._conn.commit()
+    
+    def _close(self):
+        self._conn.close()
+
+
+class JobJournal(FileResultSink):
+    """バッチジョブのURLごとの完了状態を追記するジャーナル
+    
+    起動時に既存のジャーナルを再生し、完了したURLと恒久的なエラーで失敗したURLは
+    再開時にスキップする。タイムアウトや5xxなど一時的なエラーで失敗したURLだけを再試行する。
+    """
+    
+    # 再試行の対象とする一時的なエラー
+    # （304のFetchErrorは条件付きでないリクエストに304が返った場合で、再試行しても変わらない）
+    TRANSIENT_STATUS_CODES = (408, 425, 429)
+    TRANSIENT_ERROR_TYPES = ('TimeoutError', 'ConnectionError', 'ConnectionResetError')
+    
+    def __init__(self, path, flush_every=100, fsync_interval=5.0):
+        # URLごとの最新の状態 {URL: (状態, カテゴリ)}（状態は 'done' / 'failed' / 'retry'）
+        self.entries = {}
+        ends_with_newline = self._replay(path)
+        super().__init__(path, flush_every, fsync_interval)
+        
+        # 異常終了で途中まで書かれた行の後ろに続けて書かない
+        if not ends_with_newline:
+            self._file.write('\n')
+    
+    def _replay(self, path):
+        """既存のジャーナルを読み込んで状態を復元（末尾が改行で終わっているかを返す）"""
+        if not os.path.exists(path):
+            return True
+        
+        last_line = b''
+        with open(path, 'rb') as f:
+            for line in f:
+                last_line = line
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry['url']] = (entry['status'], entry.get('category'))
+                except (ValueError, KeyError, TypeError):
+                    # 異常終了で途中まで書かれた行は無視
+                    continue
+        
+        return not last_line or last_line.endswith(b'\n')
+    
+    @classmethod
+    def is_transient(cls, result):
+        """失敗した結果が一時的なエラーによるものか"""
+        if result.get('error_type') in cls.TRANSIENT_ERROR_TYPES:
+            return True
+        if result.get('error_type') != 'FetchError':
+            return False
+        
+        # ステータスコードのない取得エラーは接続エラー
+        status_code = result.get('status_code')
+        return status_code is None or status_code in cls.TRANSIENT_STATUS_CODES or status_code >= 500
+    
+    def is_finished(self, url):
+        """再開時にスキップするURLか（完了または恒久的なエラー）"""
+        entry = self.entries.get(url)
+        return entry is not None and entry[0] != 'retry'
+    
+    def restore_categories(self, url_categories):
+        """処理済みのURLのカテゴリ別の件数を復元（同じインデックスには一度だけ）"""
+        if not url_categories.mark_restored(self.path):
+            return
+        
+        for url, (status, category) in self.entries.items():
+            if status != 'retry':
+                url_categories.add(category, url, pending=False)
+    
+    def get_stats(self):
+        """状態ごとのURL数"""
+        return Counter(status for status, _ in self.entries.values())
+    
+    def _write(self, result):
+        if result.get('success'):
+            status = 'done'
+        else:
+            status = 'retry' if self.is_transient(result) else 'failed'
+        
+        entry = {
+            'url': result.get('url', ''),
+            'status': status,
+            'category': result.get('category'),
+            'error_type': result.get('error_type'),
+            'status_code': result.get('status_code'),
+            'timestamp': result.get('timestamp')
+        }
+        self._file.write(json.dumps(entry, ensure_ascii=False))
+        self._file.write('\n')
+        self.entries[entry['url']] = (status, entry['category'])
+
+
+# 拡張子と出力先クラスの対応
+RESULT_SINK_TYPES = {
+    'jsonl': JSONLResultSink,
+    'csv': CSVResultSink,
+    'sqlite': SQLiteResultSink
+}
+RESULT_SINK_EXTENSIONS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.csv': 'csv',
+    '.sqlite': 'sqlite',
+    '.sqlite3': 'sqlite',
+    '.db': 'sqlite'
+}
+
+def open_result_sink(path, format_type=None, **kwargs):
+    """出力先を開く（形式を省略した場合は拡張子で判定）"""
+    if format_type is None:
+        format_type = RESULT_SINK_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    
+    sink_class = RESULT_SINK_TYPES.get(format_type)
+    if sink_class is None:
+        raise ValueError(f"未対応の出力形式です: {path}")
+    
+    return sink_class(path, **kwargs)
+
+
+class URLFingerprintSet:
+    """重複検出用のURLフィンガープリント（64ビット整数）の集合
+    
+    URLハッシュの先頭64ビットをオープンアドレス法のハッシュ表（array('Q')）に保持し、
+    1件あたり十数バイトで判定する。bloom_capacityを指定するとBloomフィルタで判定し
+    （偽陽性率error_rate）、メモリ使用量をURL数によらず一定にする。
+    pathを指定すると起動時に読み込み、save()で保存する（保存済みの方式を優先）。
+    
+    処理中のURLはreserve()で予約し、完了または恒久的なエラーで終わったときにcommit()で
+    確定する。予約は保存されないため、中断や一時的なエラーで終わったURLは次回に再処理される。
+    """
+    
+    MAGIC = b'WTEFP1'
+    HEADER = struct.Struct('<BIQ')  # 方式（0: ハッシュ表 / 1: Bloomフィルタ）、ハッシュ関数の数、件数
+    INITIAL_SIZE = 1 << 12
+    
+    def __init__(self, path=None, bloom_capacity=0, error_rate=0.001):
+        self.path = path
+        self._lock = threading.Lock()
+        self._count = 0
+        self._table = None
+        self._bloom = None
+        self._bloom_hashes = 0
+        # 処理中のURLのフィンガープリント（保存しない）
+        self._in_flight = set()
+        
+        if path and os.path.exists(path):
+            try:
+                self._load(path)
+                return
+            except Exception as e:
+                logger.warning(f"URLフィンガープリントを読み込めないため新規に作成します: {path} - {e}")
+        
+        if bloom_capacity:
+            # 想定件数と偽陽性率から最適なビット数とハッシュ関数の数を決める
+            bits = max(64, int(-bloom_capacity * math.log(error_rate) / math.log(2) ** 2))
+            self._bloom = bytearray((bits + 7) // 8)
+            self._bloom_hashes = max(1, round(bits / bloom_capacity * math.log(2)))
+        else:
+            self._table = array('Q', bytes(8 * self.INITIAL_SIZE))
+    
+    @staticmethod
+    def fingerprint(url_hash):
+        """URLハッシュ（16進数）の先頭64ビット（0は空きスロットを表すため1にする）"""
+        return int(url_hash[:16], 16) or 1
+    
+    def __len__(self):
+        return self._count
+    
+    def __contains__(self, url_hash):
+        fingerprint = self.fingerprint(url_hash)
+        with self._lock:
+            return self._contains(fingerprint)
+    
+    def add(self, url_hash):
+        """URLハッシュを確定済みとして追加（新規に追加した場合はTrue、既に含まれていればFalse）"""
+        fingerprint = self.fingerprint(url_hash)
+        with self._lock:
+            return self._add(fingerprint)
+    
+    def reserve(self, url_hash):
+        """処理中のURLとして予約（確定済みか処理中であればFalse）"""
+        fingerprint = self.fingerprint(url_hash)
+        with self._lock:
+            if fingerprint in self._in_flight or self._contains(fingerprint):
+                return False
+            self._in_flight.add(fingerprint)
+            return True
+    
+    def commit(self, url_hash):
+        """予約したURLを確定（予約されていなければ何もしない）"""
+        fingerprint = self.fingerprint(url_hash)
+        with self._lock:
+            if fingerprint in self._in_flight:
+                self._in_flight.remove(fingerprint)
+                self._add(fingerprint)
+    
+    def discard(self, url_hash):
+        """予約を取り消す（次回に再処理できるようにする）"""
+        with self._lock:
+            self._in_flight.discard(self.fingerprint(url_hash))
+    
+    def clear_reservations(self):
+        """確定しなかった予約をすべて取り消す"""
+        with self._lock:
+            self._in_flight.clear()
+    
+    def _contains(self, fingerprint):
+        if self._bloom is not None:
+            return all(self._bloom[bit >> 3] & (1 << (bit & 7)) for bit in self._bloom_bits(fingerprint))
+        return self._find(fingerprint)[0]
+    
+    def _add(self, fingerprint):
+        if self._bloom is not None:
+            return self._bloom_add(fingerprint)
+        
+        found, index = self._find(fingerprint)
+        if found:
+            return False
+        
+        self._table[index] = fingerprint
+        self._count += 1
+        # 使用率が7割を超えたら拡張
+        if self._count * 10 > len(self._table) * 7:
+            self._resize(len(self._table) * 2)
+        return True
+    
+    def _find(self, fingerprint):
+        """ハッシュ表を線形探索（(見つかったか, スロット位置)を返す）"""
+        table = self._table
+        mask = len(table) - 1
+        index = fingerprint & mask
+        while True:
+            slot = table[index]
+            if slot == fingerprint:
+                return True, index
+            if not slot:
+                return False, index
+            index = (index + 1) & mask
+    
+    def _resize(self, size):
+        old_table = self._table
+        self._table = array('Q', bytes(8 * size))
+        for fingerprint in old_table:
+            if fingerprint:
+                self._table[self._find(fingerprint)[1]] = fingerprint
     
-    @staticmethod
-    def is_same_url(url1, url2):
-        """2つのURLが実質的に同じかどうかを判定"""
-        norm1 = URL.normalize(url1)
-        norm2 = URL.normalize(url2)
-        return norm1 == norm2
+    def _bloom_bits(self, fingerprint):
+        """Bloomフィルタで使うビット位置（64ビットを2つのハッシュに分けたダブルハッシュ）"""
+        bits = len(self._bloom) * 8
+        low, high = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        return [(low + i * high) % bits for i in range(self._bloom_hashes)]
     
-    @staticmethod
-    def resolve_relative_url(base_url, relative_url):
-        """相対URLを絶対URLに変換"""
-        return urljoin(base_url, relative_url)
+    def _bloom_add(self, fingerprint):
+        bloom = self._bloom
+        added = False
+        for bit in self._bloom_bits(fingerprint):
+            mask = 1 << (bit & 7)
+            if not bloom[bit >> 3] & mask:
+                bloom[bit >> 3] |= mask
+                added = True
+        if added:
+            self._count += 1
+        return added
     
-    @staticmethod
-    @lru_cache(maxsize=1024)
-    def get_content_type(url, timeout=5):
-        """URLのコンテンツタイプを取得"""
-        # キャッシュを確認
-        if url in content_type_cache:
-            return content_type_cache[url]
-            
-        try:
-            # HEADリクエストでコンテンツタイプを確認
-            headers = {'User-Agent': get_random_user_agent()}
-            response = requests.head(url, headers=headers, timeout=timeout, allow_redirects=True)
-            
-            # レスポンスヘッダーからコンテンツタイプを取得
-            content_type = response.headers.get('Content-Type', '').lower()
-            
-            # キャッシュに保存
-            content_type_cache[url] = content_type
-            
-            return content_type
-        except Exception as e:
-            logger.error(f"コンテンツタイプ取得エラー: {e} - URL: {url}")
-            return None
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError("URLフィンガープリントのファイルではありません")
+            mode, hashes, count = self.HEADER.unpack(f.read(self.HEADER.size))
+            data = f.read()
+        
+        if mode == 1:
+            self._bloom = bytearray(data)
+            self._bloom_hashes = hashes
+        else:
+            table = array('Q')
+            table.frombytes(data)
+            if not table or len(table) & (len(table) - 1):
+                raise ValueError("ハッシュ表の大きさが不正です")
+            self._table = table
+        self._count = count
     
-    @staticmethod
-    def is_pdf_url(url):
-        """URLがPDFファイルを指すかどうかを判定"""
-        # URL拡張子ベースの判定
-        if url.lower().endswith('.pdf'):
-            return True
-            
-        # コンテンツタイプベースの判定
-        content_type = URL.get_content_type(url)
-        if content_type and 'application/pdf' in content_type:
-            return True
-            
-        return False
+    def save(self, path=None):
+        """ファイルに保存（一時ファイルに書き込んでから置き換える）"""
+        path = path or self.path
+        if not path:
+            return
+        
+        with self._lock:
+            mode = 1 if self._bloom is not None else 0
+            data = self._bloom if self._bloom is not None else self._table
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(self.MAGIC)
+                f.write(self.HEADER.pack(mode, self._bloom_hashes, self._count))
+                f.write(data)
+            os.replace(temp_path, path)
+
+
+class URLCategoryIndex:
+    """URLのカテゴリ別の件数とURLからカテゴリへの対応（スレッドセーフ）
     
-    @staticmethod
-    def categorize_url(url):
-        """URLのカテゴリを判定（文書、画像、動画など）"""
-        url_lower = url.lower()
+    処理済みURLの文字列は保持せず、カテゴリごとの件数だけを数える。結果を確定するまでの
+    処理中のURLについてのみ、分類されたカテゴリをビットの組み合わせで保持する。
+    pathを指定するとURLとカテゴリの対応をSQLiteに記録し（同じURLは一度だけ数える）、
+    次回の起動時に件数を復元する。件数はワーカーの書き込み中でもsnapshot()で読み出せる。
+    """
+    
+    CATEGORIES = ('html', 'document', 'pdf', 'image', 'video', 'audio', 'archive',
+                  'ecommerce', 'adult', 'invalid', 'duplicate')
+    
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.CATEGORIES, 0)
+        self._bits = {category: 1 << i for i, category in enumerate(self.CATEGORIES)}
+        # 結果を確定するまでのURLごとのカテゴリのビット {URL: ビットの論理和}
+        self._pending = {}
+        # 件数を復元済みのジョブジャーナル
+        self._restored_journals = set()
+        self._conn = None
+        
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS url_categories (
+                    url TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    PRIMARY KEY (url, category)
+                ) WITHOUT ROWID""")
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_url_categories_category ON url_categories (category)')
+            self._conn.commit()
+            for category, count in self._conn.execute('SELECT category, COUNT(*) FROM url_categories GROUP BY category'):
+                if category in self._counts:
+                    self._counts[category] = count
+    
+    def add(self, category, url, pending=True):
+        """URLをカテゴリに分類（処理中のURLを同じカテゴリに重ねて数えない）
         
-        # 拡張子ベースの判定
-        if re.search(r'\.(pdf|doc|docx|xls|xlsx|ppt|pptx|txt|rtf|odt|ods|odp)$', url_lower):
-            return 'document'
-        elif re.search(r'\.(jpg|jpeg|png|gif|bmp|svg|webp|ico|tiff)$', url_lower):
-            return 'image'
-        elif re.search(r'\.(mp4|avi|mov|wmv|flv|mkv|webm|m4v|mpg|mpeg)$', url_lower):
-            return 'video'
-        elif re.search(r'\.(mp3|wav|ogg|flac|aac|wma|m4a)$', url_lower):
-            return 'audio'
-        elif re.search(r'\.(zip|rar|7z|tar|gz|bz2|tgz|xz)$', url_lower):
-            return 'archive'
+        pendingがFalseの場合は処理を終えたURLとして件数だけを数える。
+        """
+        bit = self._bits.get(category)
+        if bit is None:
+            return
         
-        # コンテンツタイプベースの判定
-        content_type = URL.get_content_type(url)
-        if content_type:
-            if 'text/html' in content_type:
-                return 'html'
-            elif 'application/pdf' in content_type:
-                return 'document'
-            elif content_type.startswith('image/'):
-                return 'image'
-            elif content_type.startswith('video/'):
-                return 'video'
-            elif content_type.startswith('audio/'):
-                return 'audio'
-            elif 'application/x-zip' in content_type or 'application/x-rar' in content_type:
-                return 'archive'
+        url = str(url)
+        with self._lock:
+            if pending:
+                flags = self._pending.get(url, 0)
+                if flags & bit:
+                    return
+                self._pending[url] = flags | bit
+            
+            if self._conn is not None:
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO url_categories (url, category) VALUES (?, ?)', (url, category))
+                if cursor.rowcount != 1:
+                    return
+            
+            self._counts[category] += 1
+    
+    def mark_restored(self, journal_path):
+        """ジョブジャーナルを復元済みとして記録（既に復元済みならFalse）"""
+        key = os.path.abspath(journal_path)
+        with self._lock:
+            if key in self._restored_journals:
+                return False
+            self._restored_journals.add(key)
+            return True
+    
+    def _category_from_flags(self, flags, default):
+        # 複数のカテゴリに分類された場合は定義順で先のもの（最下位のビット）を返す（PDFは'document'）
+        if not flags:
+            return default
+        return self.CATEGORIES[(flags & -flags).bit_length() - 1]
+    
+    def category_of(self, url, default=None):
+        """URLのカテゴリ（処理中のURL、またはディスク上のインデックスにあるURL。未分類ならdefault）"""
+        url = str(url)
+        with self._lock:
+            flags = self._pending.get(url, 0)
+            if not flags and self._conn is not None:
+                for (category,) in self._conn.execute('SELECT category FROM url_categories WHERE url = ?', (url,)):
+                    flags |= self._bits.get(category, 0)
+        
+        return self._category_from_flags(flags, default)
+    
+    def release(self, url, default=None):
+        """結果を確定したURLのカテゴリを返して処理中の情報を解放（未分類ならdefault）"""
+        with self._lock:
+            flags = self._pending.pop(str(url), 0)
         
-        # デフォルトはHTML
-        return 'html'
+        return self._category_from_flags(flags, default)
+    
+    def snapshot(self):
+        """カテゴリごとの件数（ワーカーの書き込み中でも一貫した時点の値）"""
+        with self._lock:
+            return dict(self._counts)
+    
+    def flush(self):
+        """ディスク上のインデックスに反映"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.commit()
+    
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
 
 class WebContentExtractor:
     """Webページの本文を抽出するクラス（高度な実装）"""
     
     def __init__(self, options=None):
+        load_html_modules()
+        
         # オプション設定
         self.options = {
             'remove_ads': True,
@@ -272,6 +2077,7 @@ class WebContentExtractor:
             'normalize_spaces': True,
             'multilingual_support': True,
             'extraction_mode': 'auto',
+            'html_parser': 'html.parser', # HTMLパーサー（'html.parser' / 'lxml' / 'selectolax'）
             'continue_on_error': True,
             'exclude_ecommerce': False,
             'exclude_adult': False,
@@ -279,8 +2085,27 @@ class WebContentExtractor:
             'extract_metadata': True,    # メタデータ抽出フラグ
             'extract_images': False,     # 画像抽出フラグ
             'max_connections': 10,       # 同時接続数
+            'pool_hosts': 100,           # コネクションプールを保持するホスト数
+            'domain_rate_limit': 2.0,    # ドメインごとの毎秒リクエスト数（0で無制限）
+            'domain_max_connections': 2, # ドメインごとの同時接続数
+            'max_retries': 2,            # レート制限（429/503）時の再試行回数
+            'max_backoff': 300,          # ドメインごとの最大待機時間（秒）
+            'fetch_engine': 'thread',    # 取得エンジン（'thread' または 'async'）
+            'async_concurrency': 500,    # 非同期エンジンの同時リクエスト数
+            'extraction_processes': 0,   # バッチの本文抽出プロセス数（0でCPUコア数、1で取得と同じスレッド）
+            'stream_window': 1000,       # iter_extractで同時に保持するURLの上限
+            'result_sink_path': '',      # 結果を逐次追記するファイル（.jsonl / .csv / .sqlite、空で無効）
+            'job_journal_path': '',      # バッチを再開するためのジョブジャーナル（空で無効）
+            'dedup_index_path': '',      # 重複検出用のURLフィンガープリントを保存するファイル（空で保存しない）
+            'dedup_bloom_capacity': 0,   # Bloomフィルタで重複検出する想定URL数（0で正確なハッシュ表）
+            'dedup_bloom_error_rate': 0.001, # Bloomフィルタの偽陽性率
+            'category_index_path': '',   # URLとカテゴリの対応を記録するSQLiteファイル（空で件数のみ）
             'timeout': 30,               # タイムアウト（秒）
             'cache_enabled': True,       # キャッシュ有効化フラグ
+            'cache_ttl': 86400,          # Cache-Controlがない場合のキャッシュ有効期間（秒）
+            'cache_max_size_mb': 2048,   # キャッシュの最大サイズ（MB）
+            'cache_memory_mb': 256,      # メモリ上に保持するキャッシュの最大サイズ（MB）
+            'result_cache_max_size_mb': 512, # 本文抽出結果キャッシュの最大サイズ（MB）
             'user_agent_rotation': True, # UAローテーションフラグ
             'extract_pdf_text': True     # PDF抽出フラグ
         }
@@ -289,8 +2114,12 @@ class WebContentExtractor:
         if options:
             self.options.update(options)
         
-        # セッション（再利用可能なHTTP接続）
-        self.session = requests.Session()
+        # トランスポート（ホスト単位で再利用可能なHTTP接続）
+        self.transport = HTTPTransport(
+            max_connections=self.options['max_connections'],
+            pool_hosts=self.options['pool_hosts']
+        )
+        self.session = self.transport.session
         
         # 本文検出に用いる優先セレクタ（日本語サイトと一般サイト両方に対応）
         self.content_selectors = [
@@ -408,26 +2237,33 @@ class WebContentExtractor:
             'Sec-Fetch-User': '?1'
         }
         
-        # 処理済みURLのハッシュセット（重複検出用）
-        self.processed_url_hashes = set()
-        
-        # URL分類用のコンテナ
-        self.categorized_urls = {
-            'html': set(),
-            'document': set(),
-            'pdf': set(),
-            'image': set(),
-            'video': set(),
-            'audio': set(),
-            'archive': set(),
-            'ecommerce': set(),
-            'adult': set(),
-            'invalid': set(),
-            'duplicate': set()
-        }
+        # 処理済みURLのフィンガープリント（重複検出用）
+        self.seen_urls = URLFingerprintSet(
+            self.options.get('dedup_index_path') or None,
+            self.options.get('dedup_bloom_capacity', 0),
+            self.options.get('dedup_bloom_error_rate', 0.001)
+        )
+        
+        # URL分類ごとの件数
+        self.url_categories = URLCategoryIndex(self.options.get('category_index_path') or None)
+        
+        # 除外クラス名/IDの判定用パターン（exclude_classesが変わったときに再構築）
+        self._exclude_matcher = None
+        self._exclude_matcher_key = None
+        
+        # 定型文パターンのコンパイル結果（boilerplate_patternsが変わったときに再構築）
+        self._boilerplate_compiled = (None, [])
         
-        # キャッシュシステム初期化
-        self.cache = {}
+        # clean_text用の削除パターン（オプション・boilerplate_patternsが変わったときに再構築）
+        self._text_cleaner = (None, [])
+        self._get_text_cleaner()
+        
+        # パーサーごとの解析時間の統計
+        self.parse_stats = {}
+        self._parse_stats_lock = threading.Lock()
+        
+        # キャッシュシステム初期化（ストアは初回使用時に開く）
+        self.cache = None
         if self.options['cache_enabled']:
             self.load_cache()
     
@@ -440,80 +2276,219 @@ class WebContentExtractor:
             headers['User-Agent'] = USER_AGENTS[0]
         return headers
     
+    def get_pool_stats(self):
+        """コネクションプールのヒット/ミス数を取得"""
+        return self.transport.get_pool_stats()
+    
+    def get_category_stats(self):
+        """URLのカテゴリ別の件数を取得（バッチ処理中の進捗コールバックからも呼び出せる）"""
+        return self.url_categories.snapshot()
+    
     def load_cache(self):
-        """キャッシュをロード"""
-        cache_file = os.path.join(CACHE_DIR, 'extractor_cache.pkl')
-        try:
-            if os.path.exists(cache_file):
-                with open(cache_file, 'rb') as f:
-                    self.cache = pickle.load(f)
-                logger.info(f"キャッシュをロードしました: {len(self.cache)}件")
-        except Exception as e:
-            logger.error(f"キャッシュのロード中にエラーが発生しました: {e}")
-            self.cache = {}
+        """キャッシュストアを開く（旧形式のpickleキャッシュがあれば移行）"""
+        if self.cache is not None:
+            return self.cache
+        
+        max_bytes = self.options.get('cache_max_size_mb', 2048) * 1024 * 1024
+        memory_bytes = self.options.get('cache_memory_mb', 256) * 1024 * 1024
+        max_result_bytes = self.options.get('result_cache_max_size_mb', 512) * 1024 * 1024
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.cache = CacheStore(os.path.join(CACHE_DIR, 'extractor_cache.sqlite3'), max_bytes, memory_bytes, max_result_bytes)
+        # 終了時に書き込み待ちのエントリを反映
+        atexit.register(self.close_cache)
+        
+        legacy_file = os.path.join(CACHE_DIR, 'extractor_cache.pkl')
+        if os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, 'rb') as f:
+                    legacy_cache = pickle.load(f)
+                for url_hash, cache_entry in legacy_cache.items():
+                    self.cache.put(url_hash, self._make_cache_entry(
+                        cache_entry['content'].encode('utf-8'), 'utf-8', cache_entry.get('headers', {}),
+                        cache_entry.get('timestamp', 0)))
+                os.remove(legacy_file)
+                logger.info(f"旧形式のキャッシュを移行しました: {len(legacy_cache)}件")
+            except Exception as e:
+                logger.error(f"旧形式のキャッシュの移行中にエラーが発生しました: {e}")
+        
+        logger.info(f"キャッシュを開きました: {len(self.cache)}件")
+        return self.cache
     
     def save_cache(self):
-        """キャッシュを保存"""
-        cache_file = os.path.join(CACHE_DIR, 'extractor_cache.pkl')
+        """書き込み待ちのキャッシュをディスクに反映（完了まで待機）"""
+        if self.cache is None:
+            return
+        
         try:
-            # キャッシュが大きくなりすぎないようにする（最大1000件）
-            if len(self.cache) > 1000:
-                # 古い順に削除
-                cache_items = sorted(self.cache.items(), key=lambda x: x[1].get('timestamp', 0))
-                self.cache = dict(cache_items[-1000:])
-            
-            with open(cache_file, 'wb') as f:
-                pickle.dump(self.cache, f)
+            self.cache.flush()
             logger.info(f"キャッシュを保存しました: {len(self.cache)}件")
         except Exception as e:
             logger.error(f"キャッシュの保存中にエラーが発生しました: {e}")
     
-    def fetch_url(self, url, timeout=None):
-        """URLからHTMLコンテンツを取得（キャッシュ対応）"""
+    def save_url_indexes(self):
+        """重複検出用のフィンガープリントとカテゴリのインデックスをディスクに反映"""
+        try:
+            self.seen_urls.save()
+            self.url_categories.flush()
+        except Exception as e:
+            logger.error(f"URLインデックスの保存中にエラーが発生しました: {e}")
+    
+    def close_cache(self):
+        """書き込み待ちのキャッシュを反映してストアを閉じる"""
+        if self.cache is None:
+            return
+        
+        try:
+            self.cache.close()
+            logger.info(f"キャッシュを閉じました: {len(self.cache)}件")
+        except Exception as e:
+            logger.error(f"キャッシュのクローズ中にエラーが発生しました: {e}")
+        self.cache = None
+    
+    def _get_cache_entry(self, url_hash):
+        """キャッシュエントリを取得（キャッシュ無効時やエントリがなければNone）"""
+        if not self.options['cache_enabled']:
+            return None
+        
+        cache_entry = self.load_cache().get(url_hash)
+        # zstandardのない環境ではzstdで圧縮されたエントリを展開できない
+        if cache_entry is not None and cache_entry['codec'] == 'zstd' and not ZSTD_SUPPORT:
+            return None
+        return cache_entry
+    
+    def _decode_cache_entry(self, cache_entry):
+        """キャッシュエントリのボディを展開してテキストにデコード"""
+        body = decompress_cache_body(cache_entry['body'], cache_entry['codec'])
+        return decode_html_bytes(body, encoding=cache_entry['encoding'])
+    
+    def _is_cache_fresh(self, cache_entry):
+        """キャッシュエントリが有効期限内か"""
+        # 有効期限はレスポンスのCache-Control / Expiresに従う
+        expires = cache_entry.get('expires')
+        if expires is None:
+            lifetime = get_cache_lifetime(cache_entry.get('headers'), self.options.get('cache_ttl', 86400))
+            expires = cache_entry.get('timestamp', 0) + lifetime
+        return time.time() < expires
+    
+    def _get_revalidation_headers(self, cache_entry):
+        """期限切れのキャッシュを再検証するための条件付きリクエストヘッダーを生成"""
+        if cache_entry is None:
+            return {}
+        
+        cached_headers = {key.lower(): value for key, value in cache_entry.get('headers', {}).items()}
+        headers = {}
+        if cached_headers.get('etag'):
+            headers['If-None-Match'] = cached_headers['etag']
+        if cached_headers.get('last-modified'):
+            headers['If-Modified-Since'] = cached_headers['last-modified']
+        return headers
+    
+    def _make_cache_entry(self, body, encoding, headers, timestamp=None):
+        """レスポンスボディを圧縮してキャッシュエントリを構築"""
+        timestamp = time.time() if timestamp is None else timestamp
+        headers = {key.lower(): value for key, value in dict(headers).items()}
+        data, codec = compress_cache_body(body)
+        return {
+            'body': data,
+            'codec': codec,
+            'encoding': encoding,
+            'headers': headers,
+            'timestamp': timestamp,
+            'expires': timestamp + get_cache_lifetime(headers, self.options.get('cache_ttl', 86400))
+        }
+    
+    def _store_cached_content(self, url_hash, body, encoding, headers):
+        """取得したレスポンスボディを圧縮してキャッシュに保存"""
+        if not self.options['cache_enabled']:
+            return
+        
+        self.load_cache().put(url_hash, self._make_cache_entry(body, encoding, headers))
+    
+    def _decode_response_body(self, url_hash, body, content_type, headers):
+        """レスポンスボディをデコードし、生のボディを圧縮してキャッシュに保存"""
+        # エンコーディングを検出してデコード（charset指定がなければ自動検出）
+        encoding = detect_html_encoding(body, content_type)
+        html_content = decode_html_bytes(body, encoding=encoding)
+        
+        # 生のボディを圧縮してキャッシュに保存（デコードはキャッシュヒット時に行う）
+        self._store_cached_content(url_hash, body, encoding, headers)
+        
+        return html_content
+    
+    def _refresh_cached_content(self, normalized_url, url_hash, cache_entry, headers, classify=False):
+        """304 Not Modifiedを受けてキャッシュの有効期限を更新し、キャッシュ済みコンテンツを返す"""
+        if cache_entry is None:
+            raise FetchError(f"再検証するキャッシュが見つかりません: {normalized_url}", 304)
+        
+        # 304のヘッダー（新しいETagやCache-Control）で保存済みヘッダーを更新（ボディは再圧縮しない）
+        merged_headers = dict(cache_entry.get('headers', {}))
+        merged_headers.update({key.lower(): value for key, value in dict(headers).items()})
+        now = time.time()
+        self.load_cache().put(url_hash, dict(
+            cache_entry,
+            headers=merged_headers,
+            timestamp=now,
+            expires=now + get_cache_lifetime(merged_headers, self.options.get('cache_ttl', 86400))
+        ))
+        
+        if classify:
+            self._classify_cached_content(normalized_url, cache_entry)
+        
+        logger.info(f"キャッシュを再検証しました（304）: {normalized_url}")
+        return self._decode_cache_entry(cache_entry)
+    
+    def _classify_cached_content(self, normalized_url, cache_entry):
+        """キャッシュ済みコンテンツのカテゴリを保存済みのContent-Typeから記録"""
+        content_type = cache_entry.get('headers', {}).get('content-type', '').lower()
+        # キャッシュされるのはHTMLのみ（Content-Typeがなければ'html'）
+        url_category = URL.categorize_content_type(content_type) or 'html'
+        self._classify_url(normalized_url, url_category, False)
+    
+    def fetch_url(self, url, timeout=None, classify=False, cancel_token=None):
+        """URLからHTMLコンテンツを取得（キャッシュ対応、PDF/HTMLの振り分けはレスポンスで判定）
+        
+        cancel_tokenが取り消されると、ダウンロードをチャンクの区切りで中断する。
+        """
         if timeout is None:
             timeout = self.options['timeout']
         
-        # URL正規化
-        normalized_url = URL.normalize(url)
-        if not normalized_url:
+        # URL正規化（取り込み時に作成済みのレコードはそのまま使う）
+        record = URLRecord.parse(url)
+        if record is None:
             raise ValueError(f"無効なURL形式です: {url}")
+        normalized_url = record.url
         
         # キャッシュチェック
-        url_hash = URL.get_url_hash(normalized_url)
-        if self.options['cache_enabled'] and url_hash in self.cache:
-            cache_entry = self.cache[url_hash]
-            # キャッシュの有効期限（1日）
-            if time.time() - cache_entry.get('timestamp', 0) < 86400:
-                logger.info(f"キャッシュから取得: {normalized_url}")
-                return cache_entry['content']
-        
-        # URLのカテゴリをチェック
-        url_category = URL.categorize_url(normalized_url)
-        
-        # PDFの場合、別処理
-        if url_category == 'document' and URL.is_pdf_url(normalized_url):
-            if self.options['extract_pdf_text'] and PDF_SUPPORT:
-                return self.extract_pdf_text(normalized_url)
-            else:
-                raise ValueError(f"PDFからのテキスト抽出が無効化されています: {normalized_url}")
-        
-        # HTML以外のドキュメントの場合はエラー
-        if url_category != 'html' and url_category != 'document':
+        url_hash = record.url_hash
+        cache_entry = self._get_cache_entry(url_hash)
+        if cache_entry is not None and self._is_cache_fresh(cache_entry):
+            logger.info(f"キャッシュから取得: {normalized_url}")
+            if classify:
+                self._classify_cached_content(normalized_url, cache_entry)
+            return self._decode_cache_entry(cache_entry)
+        
+        # 拡張子で判定できる非対応タイプはリクエスト前に除外
+        url_category = record.category
+        if url_category and url_category not in ['html', 'document']:
             raise ValueError(f"このURLタイプはサポートされていません: {url_category} - {normalized_url}")
         
         try:
             # ヘッダーの準備
             headers = self.get_headers()
             
+            # 期限切れのキャッシュがあれば条件付きリクエストで再検証
+            headers.update(self._get_revalidation_headers(cache_entry))
+            
             # リクエスト送信（エラーハンドリング強化版）
             try:
                 response = self.session.get(
                     normalized_url, 
                     headers=headers, 
                     timeout=timeout,
+                    stream=True,  # ヘッダーと先頭バイトで振り分けるためストリーミング
                     verify=True  # SSL証明書を検証
                 )
-                response.raise_for_status()  # エラーチェック
+                self._raise_for_status(response)  # エラーチェック
             except requests.exceptions.SSLError:
                 # SSL証明書エラーの場合、検証をスキップして再試行
                 logger.warning(f"SSL証明書エラーのため検証をスキップして再試行: {normalized_url}")
@@ -521,40 +2496,78 @@ class WebContentExtractor:
                     normalized_url, 
                     headers=headers, 
                     timeout=timeout,
+                    stream=True,
                     verify=False
                 )
-                response.raise_for_status()
-            
-            # エンコーディングの検出と設定
-            if 'charset=' in response.headers.get('Content-Type', '').lower():
-                # Content-Typeヘッダーからエンコーディングを取得
-                pass  # requestsが自動的に検出します
-            else:
-                # エンコーディングを自動検出
-                response.encoding = response.apparent_encoding
-            
-            # レスポンスボディを取得
-            html_content = response.text
+                self._raise_for_status(response)
+            
+            # 変更がなければキャッシュを再利用
+            if response.status_code == 304:
+                response.close()
+                return self._refresh_cached_content(normalized_url, url_hash, cache_entry, response.headers, classify)
+            
+            with response:
+                # Content-Typeと先頭チャンクからPDF/HTMLを振り分け（HEADリクエストは送らない）
+                content_type = response.headers.get('Content-Type', '').lower()
+                chunks = response.iter_content(chunk_size=65536)
+                head = next(chunks, b'')
+                is_pdf = self._route_response(normalized_url, content_type, head, classify)
+                
+                # 残りのレスポンスボディを取得（取り消された場合はチャンクの区切りで中断）
+                body = head + b''.join(self._iter_uncancelled(chunks, cancel_token))
             
-            # キャッシュに保存
-            if self.options['cache_enabled']:
-                self.cache[url_hash] = {
-                    'content': html_content,
-                    'timestamp': time.time(),
-                    'headers': dict(response.headers)
-                }
-                # 定期的にキャッシュを保存
-                if len(self.cache) % 10 == 0:
-                    self.save_cache()
+            # PDFの場合、同じレスポンスからテキストを抽出
+            if is_pdf:
+                return self.pdf_bytes_to_html(body, normalized_url)
             
-            return html_content
+            return self._decode_response_body(url_hash, body, content_type, response.headers)
             
         except requests.exceptions.Timeout:
             raise TimeoutError(f"タイムアウト: {timeout}秒以内に応答がありませんでした。")
         except requests.exceptions.TooManyRedirects:
             raise ValueError(f"リダイレクトが多すぎます: {normalized_url}")
         except requests.exceptions.RequestException as e:
-            raise Exception(f"URLの取得に失敗しました: {e}")
+            # ステータスコードとRetry-Afterをスケジューラに伝える
+            response = getattr(e, 'response', None)
+            if response is not None:
+                raise FetchError(f"URLの取得に失敗しました: {e}", response.status_code,
+                                 parse_retry_after(response.headers.get('Retry-After')))
+            raise FetchError(f"URLの取得に失敗しました: {e}")
+    
+    @staticmethod
+    def _raise_for_status(response):
+        """エラーステータスなら接続を閉じてから例外を送出（ストリーミング中の接続を残さない）"""
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+    
+    @staticmethod
+    def _iter_uncancelled(chunks, cancel_token=None):
+        """バッチが取り消されるまでチャンクを順に返す"""
+        for chunk in chunks:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            yield chunk
+    
+    def _route_response(self, normalized_url, content_type, head, classify=False):
+        """レスポンスのContent-Typeと先頭バイトから処理方法を判定（PDFならTrue）"""
+        url_category = URL.categorize_url(normalized_url, content_type, head)
+        is_pdf = URL.is_pdf_url(normalized_url, content_type, head)
+        
+        # 抽出処理から呼ばれた場合はカテゴリも記録
+        if classify:
+            self._classify_url(normalized_url, url_category, is_pdf)
+            return is_pdf
+        
+        if is_pdf and (not self.options['extract_pdf_text'] or not PDF_SUPPORT):
+            raise ValueError(f"PDFからのテキスト抽出が無効化されています: {normalized_url}")
+        
+        if url_category != 'html' and url_category != 'document':
+            raise ValueError(f"このURLタイプはサポートされていません: {url_category} - {normalized_url}")
+        
+        return is_pdf
     
     def extract_pdf_text(self, url):
         """PDFからテキストを抽出"""
@@ -564,23 +2577,30 @@ class WebContentExtractor:
         try:
             # PDFファイルをダウンロード
             headers = self.get_headers()
-            response = requests.get(url, headers=headers, timeout=self.options['timeout'])
+            response = self.transport.get(url, headers=headers, timeout=self.options['timeout'])
             response.raise_for_status()
+            
+            return self.pdf_bytes_to_html(response.content, url)
         
-            # PDFをメモリ上で開く
-            pdf_file = io.BytesIO(response.content)
+        except Exception as e:
+            raise Exception(f"PDFの処理中にエラーが発生しました: {e}")
+    
+    def pdf_bytes_to_html(self, data, url):
+        """ダウンロード済みのPDFデータからテキストを抽出し、HTML形式で返す"""
+        if not PDF_SUPPORT:
+            raise ValueError("PDFサポートが有効ではありません。PyPDF2をインストールしてください。")
         
+        try:
+            # PDFをメモリ上で開く
+            pdf_file = io.BytesIO(data)
+            
             # PyPDF2でテキスト抽出
-            pdf_reader = PyPDF2.PdfFileReader(pdf_file)
-        
-            # ページ数取得
-            num_pages = pdf_reader.getNumPages()
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
         
             # 各ページからテキストを抽出
             text_content = ""
-            for page_num in range(num_pages):
-                page = pdf_reader.getPage(page_num)
-                text_content += page.extractText() + "\n\n"
+            for page in pdf_reader.pages:
+                text_content += (page.extract_text() or "") + "\n\n"
         
             # テキストがほとんど抽出できなかった場合
             if len(text_content.strip()) < 100:
@@ -624,7 +2644,7 @@ class WebContentExtractor:
             
         try:
             domain = URL.get_domain(url).lower()
-            path = urlparse(url).path.lower()
+            path = (url.path if isinstance(url, URLRecord) else urlparse(url).path).lower()
             return any(pattern in domain or pattern in path for pattern in self.adult_patterns)
         except:
             return False
@@ -634,25 +2654,182 @@ class WebContentExtractor:
         if not self.options.get('exclude_duplicates'):
             return False
             
-        normalized_url = URL.normalize(url)
-        if not normalized_url:
+        record = URLRecord.parse(url)
+        if record is None:
             return False
             
-        url_hash = URL.get_url_hash(normalized_url)
-        is_duplicate = url_hash in self.processed_url_hashes
+        # 重複でなければ処理中として予約（結果が確定したときに_settle_seen_urlで確定）
+        return not self.seen_urls.reserve(record.url_hash)
+    
+    def _settle_seen_url(self, url, finished):
+        """重複検出の予約を確定（finishedがFalseなら次回に再処理できるよう取り消す）"""
+        if not self.options.get('exclude_duplicates'):
+            return
         
-        # 重複でなければハッシュを追加
-        if not is_duplicate:
-            self.processed_url_hashes.add(url_hash)
-            
-        return is_duplicate
+        record = URLRecord.parse(url)
+        if record is None:
+            return
+        
+        if finished:
+            self.seen_urls.commit(record.url_hash)
+        else:
+            self.seen_urls.discard(record.url_hash)
+    
+    # 本文抽出の処理内容を変更した場合は更新して抽出結果キャッシュを無効化する
+    EXTRACTION_CACHE_VERSION = 5
+    
+    # 本文抽出の結果に影響するオプション
+    EXTRACTION_OPTION_KEYS = (
+        'remove_ads', 'remove_navigation', 'remove_footer', 'remove_related',
+        'remove_empty_lines', 'normalize_spaces', 'multilingual_support', 'extraction_mode',
+        'extract_metadata', 'extract_images', 'extract_links', 'html_parser'
+    )
+    
+    # 本文抽出の結果に影響する設定（抽出プロセスにも引き継ぐ）
+    EXTRACTION_SETTING_ATTRS = (
+        'content_selectors', 'exclude_tags', 'exclude_classes', 'boilerplate_patterns', 'site_specific_rules'
+    )
+    
+    # selectolaxで解析前に取り除くタグ（clean_soupで必ず削除され、本文・メタデータに使われない）
+    PRESTRIP_TAGS = ('style', 'noscript', 'svg', 'template', 'iframe')
+    
+    # noscriptはlexbor（スクリプト無効として解析）が中身をマークアップとして扱い、
+    # <p>などが外に押し出されて残るため、解析前にスクリプト有効時と同じく閉じタグまでを生のテキストとして取り除く
+    PRESTRIP_NOSCRIPT_RE = re.compile(r'<noscript\b.*?</noscript\s*>', re.IGNORECASE | re.DOTALL)
+    
+    def get_html_parser(self):
+        """利用可能なHTMLパーサーを取得（未インストールの場合はhtml.parserにフォールバック）"""
+        parser = self.options.get('html_parser', 'html.parser')
+        if parser == 'selectolax' and not SELECTOLAX_SUPPORT:
+            parser = 'lxml'
+        if parser in ('lxml', 'selectolax') and not LXML_SUPPORT:
+            parser = 'html.parser'
+        if parser not in ('html.parser', 'lxml', 'selectolax'):
+            parser = 'html.parser'
+        return parser
+    
+    def prestrip_html(self, html):
+        """selectolax（ネイティブDOM）で本文抽出に使われない要素を取り除いたHTMLを返す"""
+        tree = selectolax_lexbor.LexborHTMLParser(self.PRESTRIP_NOSCRIPT_RE.sub('', html))
+        
+        for node in tree.css(', '.join(self.PRESTRIP_TAGS)):
+            node.decompose()
+        
+        # JSON-LD（メタデータに使用）以外のスクリプトを削除
+        for node in tree.css('script'):
+            if (node.attributes.get('type') or '').lower() != 'application/ld+json':
+                node.decompose()
+        
+        return tree.html or ''
+    
+    def parse_html(self, html):
+        """設定されたバックエンドでHTMLを解析し、解析時間を記録"""
+        parser = self.get_html_parser()
+        start = time.perf_counter()
+        
+        if parser == 'selectolax':
+            # ネイティブDOMで不要な部分木を取り除いてからlxmlで構築
+            soup = BeautifulSoup(self.prestrip_html(html), 'lxml')
+        else:
+            soup = BeautifulSoup(html, parser)
+        
+        elapsed = time.perf_counter() - start
+        with self._parse_stats_lock:
+            stats = self.parse_stats.setdefault(parser, {'count': 0, 'total_time': 0.0, 'total_chars': 0})
+            stats['count'] += 1
+            stats['total_time'] += elapsed
+            stats['total_chars'] += len(html)
+        
+        return soup
+    
+    def merge_parse_stats(self, parse_stats):
+        """抽出プロセスで記録した解析時間の統計を合算"""
+        with self._parse_stats_lock:
+            for parser, worker_stats in parse_stats.items():
+                stats = self.parse_stats.setdefault(parser, {'count': 0, 'total_time': 0.0, 'total_chars': 0})
+                for key in ('count', 'total_time', 'total_chars'):
+                    stats[key] += worker_stats.get(key, 0)
+    
+    def get_parse_stats(self):
+        """パーサーごとの解析回数・合計時間・平均時間を取得"""
+        with self._parse_stats_lock:
+            return {
+                parser: dict(stats, average_ms=stats['total_time'] * 1000 / stats['count'] if stats['count'] else 0.0)
+                for parser, stats in self.parse_stats.items()
+            }
+    
+    def get_extraction_settings(self):
+        """本文抽出に影響するサイトルール・パターンなどの設定"""
+        return {name: getattr(self, name) for name in self.EXTRACTION_SETTING_ATTRS}
+    
+    def get_extraction_fingerprint(self):
+        """本文抽出に影響するオプション・サイトルール・パターンのハッシュ"""
+        settings = {
+            'version': self.EXTRACTION_CACHE_VERSION,
+            'options': {key: self.options.get(key) for key in self.EXTRACTION_OPTION_KEYS},
+            **self.get_extraction_settings()
+        }
+        serialized = json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
     
     def extract_main_content(self, html, url):
-        """HTMLから記事の本文を抽出する"""
+        """HTMLから記事の本文を抽出する（同じ内容・設定の抽出結果はキャッシュから返す）"""
         if not html:
             return None
-            
-        soup = BeautifulSoup(html, 'html.parser')
+        
+        result_key = self._get_result_key(html, url)
+        result = self._get_cached_result(result_key, url)
+        if result is not None:
+            return result
+        
+        result = self._extract_main_content(html, url)
+        self._put_cached_result(result_key, result)
+        return result
+    
+    def _get_result_key(self, html, url):
+        """抽出結果キャッシュのキー（キャッシュ無効時はNone）"""
+        if not self.options['cache_enabled']:
+            return None
+        
+        # URL・コンテンツのハッシュ・抽出設定のハッシュをキーにする
+        content_hash = hashlib.sha256(html.encode('utf-8', errors='surrogatepass')).hexdigest()
+        return hashlib.sha256(
+            f"{url}\n{content_hash}\n{self.get_extraction_fingerprint()}".encode('utf-8')).hexdigest()
+    
+    def _get_cached_result(self, result_key, url):
+        """キャッシュ済みの抽出結果を取得（なければNone）"""
+        if result_key is None:
+            return None
+        
+        try:
+            result = self.load_cache().get_result(result_key)
+            if result is not None:
+                logger.info(f"抽出結果をキャッシュから取得: {url}")
+            return result
+        except Exception as e:
+            logger.error(f"抽出結果キャッシュの読み込み中にエラーが発生しました: {e}")
+            return None
+    
+    def _put_cached_result(self, result_key, result):
+        """本文を抽出できた結果をキャッシュに保存"""
+        if result_key is None or not result or not result.get('content'):
+            return
+        
+        try:
+            self.load_cache().put_result(result_key, result)
+        except Exception as e:
+            logger.error(f"抽出結果キャッシュの保存中にエラーが発生しました: {e}")
+    
+    def _finish_pool_extraction(self, result_key, worker_result):
+        """抽出プロセスの結果を受け取り、解析時間の統計とキャッシュに反映"""
+        result, parse_stats = worker_result
+        self.merge_parse_stats(parse_stats)
+        self._put_cached_result(result_key, result)
+        return result
+    
+    def _extract_main_content(self, html, url):
+        """HTMLから記事の本文を抽出する（キャッシュを使わない抽出処理）"""
+        soup = self.parse_html(html)
         
         # タイトルの抽出
         title = self.extract_title(soup)
@@ -950,49 +3127,126 @@ class WebContentExtractor:
         
         return links
 
+    # clean_soupでクラス名/IDが一致しても削除しない無害な要素
+    CLEAN_SAFE_TAGS = frozenset({
+        'html', 'body', 'div', 'span', 'section', 'article', 'main', 'p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+        'ul', 'ol', 'li', 'table', 'tr', 'td', 'th', 'thead', 'tbody', 'a', 'img', 'figure', 'figcaption',
+        'blockquote', 'pre', 'code', 'em', 'strong', 'mark', 'time'
+    })
+    
+    # 空のdiv要素の判定で意味のある要素とみなすタグ
+    CLEAN_MEANINGFUL_TAGS = frozenset({
+        'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table', 'blockquote', 'pre', 'img'
+    })
+    
+    def _get_exclude_matcher(self):
+        """除外クラス名/IDの部分一致を1回で判定する正規表現を取得"""
+        key = tuple(self.exclude_classes)
+        if self._exclude_matcher_key != key:
+            pattern = '|'.join(re.escape(exclude_class.lower()) for exclude_class in key)
+            self._exclude_matcher = re.compile(pattern) if key else None
+            self._exclude_matcher_key = key
+        return self._exclude_matcher
+    
     def clean_soup(self, soup):
-        """不要な要素をHTML構造から削除（高度な実装）"""
-        # スキップするべき無害な要素のセット
-        safe_tags = {'html', 'body', 'div', 'span', 'section', 'article', 'main', 'p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'table', 'tr', 'td', 'th', 'thead', 'tbody', 'a', 'img', 'figure', 'figcaption', 'blockquote', 'pre', 'code', 'em', 'strong', 'mark', 'time'}
-        
-        # 不要なタグを削除
-        for tag in self.exclude_tags:
-            for element in soup.find_all(tag):
-                element.decompose()
-        
-        # 不要なクラスやIDを持つ要素を削除
-        for exclude_class in self.exclude_classes:
-            # クラス名部分一致で削除
-            for element in soup.find_all(class_=lambda c: c and exclude_class.lower() in c.lower()):
-                if element.name not in safe_tags:
-                    element.decompose()
-            
-            # ID部分一致で削除
-            for element in soup.find_all(id=lambda i: i and exclude_class.lower() in i.lower()):
-                if element.name not in safe_tags:
-                    element.decompose()
+        """不要な要素をHTML構造から削除（高度な実装）
+        
+        除外タグ・除外クラス/ID・コメントの判定を1回の走査で行い、空のdiv要素の判定に使う
+        テキスト長と意味のある要素の有無も同じ走査で子から親へ集計する。
+        """
+        exclude_tags = set(self.exclude_tags)
+        safe_tags = self.CLEAN_SAFE_TAGS
+        meaningful_tags = self.CLEAN_MEANINGFUL_TAGS
+        matcher = self._get_exclude_matcher()
+        
+        # div.get_text()の対象になる文字列の型（コメントなどは含まない）
+        probe = soup.new_tag('div')
+        text_types = getattr(probe, 'interesting_string_types', None) or (NavigableString, CData)
+        
+        removed = []          # 部分木ごと削除する要素
+        comments = []         # 削除するコメント
+        divs = []             # 残るdiv要素（文書順）: [要素, 開始番号, 終了番号, テキスト長, 意味のある子孫の有無]
+        attr_elements = []    # インラインスタイル・onclickを持つ要素
+        counter = 0
+        
+        # 各フレーム: [要素, 子のイテレータ, テキスト長, 意味のある子孫の有無, divの記録]
+        stack = [[soup, iter(soup.contents), 0, False, None]]
+        while stack:
+            frame = stack[-1]
+            node = next(frame[1], None)
+            
+            if node is None:
+                # 帰りがけに子孫の集計結果を親へ渡す
+                stack.pop()
+                element, _, text_length, has_meaningful, div_record = frame
+                if div_record is not None:
+                    div_record[2] = counter
+                    div_record[3] = text_length
+                    div_record[4] = has_meaningful
+                if stack:
+                    parent = stack[-1]
+                    parent[2] += text_length
+                    parent[3] = parent[3] or has_meaningful or element.name in meaningful_tags
+                continue
+            
+            if isinstance(node, Tag):
+                # 不要なタグ
+                if node.name in exclude_tags:
+                    removed.append(node)
+                    continue
+                
+                # 不要なクラスやIDを持つ要素（部分一致）
+                if matcher is not None and node.name not in safe_tags:
+                    classes = node.get('class')
+                    if isinstance(classes, (list, tuple)):
+                        classes = ' '.join(classes)
+                    element_id = node.get('id')
+                    if (classes and matcher.search(classes.lower())) or (element_id and matcher.search(element_id.lower())):
+                        removed.append(node)
+                        continue
+                
+                if 'style' in node.attrs or 'onclick' in node.attrs:
+                    attr_elements.append(node)
+                
+                counter += 1
+                div_record = None
+                if node.name == 'div':
+                    div_record = [node, counter, None, 0, False]
+                    divs.append(div_record)
+                
+                stack.append([node, iter(node.contents), 0, False, div_record])
+            
+            elif isinstance(node, Comment):
+                comments.append(node)
+            
+            elif isinstance(node, NavigableString):
+                node_type = type(node)
+                if node_type is text_types if isinstance(text_types, type) else node_type in text_types:
+                    frame[2] += len(node.strip())
+        
+        # インラインスタイル・オンクリック属性を削除
+        for element in attr_elements:
+            element.attrs.pop('style', None)
+            element.attrs.pop('onclick', None)
+        
+        # 不要なタグ・クラス・IDの要素を削除
+        for element in removed:
+            element.decompose()
         
         # コメントを削除
-        for comment in soup.find_all(text=lambda text: isinstance(text, Comment)):
+        for comment in comments:
             comment.extract()
         
         # 空のdiv要素を削除（少なくとも意味のある要素が1つ以上含まれているかチェック）
-        for div in soup.find_all('div'):
-            # 意味のあるタグ
-            meaningful_tags = div.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table', 'blockquote', 'pre', 'img'])
-            meaningful_text = div.get_text(strip=True)
-            
-            if not meaningful_tags and len(meaningful_text) < 50:
+        # 外側から順に判定し、削除したdivの内側のdivは判定しない
+        skip_until = 0
+        for div, start, end, text_length, has_meaningful in divs:
+            if start <= skip_until:
+                continue
+            if not has_meaningful and text_length < 50:
                 div.decompose()
+                skip_until = end
         
-        # インラインスタイルを削除
-        for element in soup.find_all(style=True):
-            del element['style']
-        
-        # オンクリック属性を削除
-        for element in soup.find_all(onclick=True):
-            del element['onclick']
-            
         return soup
 
     def find_content_by_selectors(self, soup):
@@ -1149,41 +3403,156 @@ class WebContentExtractor:
                 
         return None
 
+    def _get_boilerplate_regexes(self):
+        """定型文パターンのコンパイル済み正規表現を取得（boilerplate_patternsが変わった場合のみ再構築）"""
+        key = tuple(self.boilerplate_patterns)
+        compiled_key, regexes = self._boilerplate_compiled
+        if compiled_key != key:
+            regexes = [re.compile(pattern, re.IGNORECASE) for pattern in key]
+            self._boilerplate_compiled = (key, regexes)
+        return regexes
+    
+    @staticmethod
+    def _start_tag_text(tag):
+        """開始タグの文字列表現（定型文パターンの判定用）"""
+        parts = [tag.name]
+        for key, value in tag.attrs.items():
+            if value is None:
+                parts.append(key)
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            parts.append(f'{key}="{value}"')
+        return '<' + ' '.join(parts) + '>'
+    
+    def _analyze_content_tree(self, root):
+        """本文スコアリングに使う集計値を全要素について1回の走査で計算
+        
+        子から親へ集計するため、候補ごとの部分木の再走査や文字列化は行わない。
+        走査中に組み立てた文書全体の文字列に対して各定型文パターンを1回だけ検索し、
+        要素の部分木に対応する範囲に一致があるかで判定する。
+        
+        Returns:
+        - 段落要素のリスト（文書順）
+        - div要素のリスト（文書順）
+        - 要素ごとの集計値 {id(要素): [テキスト長, 見出し数, 画像数, リンク数, フォームの有無, 深さ, 開始位置, 終了位置]}
+        - 定型文パターンごとの一致範囲のリスト [(開始位置のリスト, 終了位置のリスト), ...]
+        """
+        heading_tags = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+        
+        # get_text()の対象になる文字列の型（コメントなどは含まない）
+        probe = root.new_tag('p')
+        text_types = getattr(probe, 'interesting_string_types', None) or (NavigableString, CData)
+        if isinstance(text_types, type):
+            text_types = (text_types,)
+        
+        paragraphs = []
+        divs = []
+        pieces = []
+        position = 0
+        root_stats = [0, 0, 0, 0, False, self.get_element_depth(root), 0, 0]
+        stats = {id(root): root_stats}
+        
+        # 各フレーム: [要素, 子のイテレータ, 集計値]
+        stack = [[root, iter(root.contents), root_stats]]
+        while stack:
+            frame = stack[-1]
+            node = next(frame[1], None)
+            
+            if node is None:
+                # 帰りがけに子孫の集計結果を親へ渡す
+                stack.pop()
+                element, element_stats = frame[0], frame[2]
+                if stack:
+                    end_tag = f'</{element.name}>'
+                    pieces.append(end_tag)
+                    position += len(end_tag)
+                    
+                    parent_stats = stack[-1][2]
+                    parent_stats[0] += element_stats[0]
+                    parent_stats[1] += element_stats[1] + (element.name in heading_tags)
+                    parent_stats[2] += element_stats[2] + (element.name == 'img')
+                    parent_stats[3] += element_stats[3] + (element.name == 'a')
+                    parent_stats[4] = parent_stats[4] or element_stats[4] or element.name == 'form'
+                element_stats[7] = position
+                continue
+            
+            if isinstance(node, Tag):
+                start_tag = self._start_tag_text(node)
+                depth = 0 if node.name == 'html' else frame[2][5] + 1
+                node_stats = [0, 0, 0, 0, False, depth, position, 0]
+                stats[id(node)] = node_stats
+                pieces.append(start_tag)
+                position += len(start_tag)
+                
+                if node.name == 'p':
+                    paragraphs.append(node)
+                elif node.name == 'div':
+                    divs.append(node)
+                
+                stack.append([node, iter(node.contents), node_stats])
+            
+            elif isinstance(node, NavigableString):
+                text = str(node)
+                pieces.append(text)
+                position += len(text)
+                if type(node) in text_types:
+                    frame[2][0] += len(text.strip())
+        
+        # 定型文パターンごとに文書全体を1回だけ検索
+        document = ''.join(pieces)
+        pattern_matches = []
+        for regex in self._get_boilerplate_regexes():
+            starts = []
+            ends = []
+            for match in regex.finditer(document):
+                starts.append(match.start())
+                ends.append(match.end())
+            pattern_matches.append((starts, ends))
+        
+        return paragraphs, divs, stats, pattern_matches
+    
     def find_content_by_scoring(self, soup):
         """スコアリングアルゴリズムで本文候補を検出（高度な実装）"""
         candidates = []
+        candidate_index = {}
+        
+        # テキスト長・要素数・定型文パターンの一致範囲を1回の走査で集計
+        paragraphs, divs, stats, pattern_matches = self._analyze_content_tree(soup)
         
         # 段落要素の親要素を候補として収集
-        for p in soup.find_all('p'):
+        for p in paragraphs:
             parent = p.parent
-            text_length = len(p.get_text(strip=True))
+            text_length = stats[id(p)][0]
             
             # 長い段落の親要素のみを候補に追加
             if text_length > 100:
                 # 既存の候補かどうかをチェック
-                existing = next((c for c in candidates if c['element'] == parent), None)
+                existing = candidate_index.get(id(parent))
                 if existing:
                     existing['paragraphs'] += 1
                     existing['text_length'] += text_length
                 else:
-                    candidates.append({
+                    candidate = {
                         'element': parent,
                         'paragraphs': 1,
                         'text_length': text_length,
-                        'depth': self.get_element_depth(parent)
-                    })
+                        'depth': stats[id(parent)][5]
+                    }
+                    candidates.append(candidate)
+                    candidate_index[id(parent)] = candidate
         
         # 候補がない場合
         if not candidates:
             # div要素を検索
-            for div in soup.find_all('div'):
-                text = div.get_text(strip=True)
-                if len(text) > 500:
+            for div in divs:
+                text_length = stats[id(div)][0]
+                if text_length > 500:
                     candidates.append({
                         'element': div,
                         'paragraphs': 1,
-                        'text_length': len(text),
-                        'depth': self.get_element_depth(div)
+                        'text_length': text_length,
+                        'depth': stats[id(div)][5]
                     })
         
         # スコアを計算して最良の候補を見つける
@@ -1191,6 +3560,8 @@ class WebContentExtractor:
         best_score = 0
         
         for candidate in candidates:
+            _, heading_count, image_count, link_count, has_form, _, start, end = stats[id(candidate['element'])]
+            
             # 基本スコア: テキストの長さと段落数による
             score = candidate['text_length'] * 0.5 + candidate['paragraphs'] * 100
             
@@ -1202,24 +3573,21 @@ class WebContentExtractor:
                 score *= 0.8  # 深すぎる要素には20%のペナルティ
             
             # 見出しがあればボーナス
-            headings = candidate['element'].find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            score += len(headings) * 50
+            score += heading_count * 50
             
             # 画像があれば若干のボーナス（多すぎるとペナルティ）
-            images = candidate['element'].find_all('img')
-            if 1 <= len(images) <= 3:
-                score += len(images) * 30
-            elif len(images) > 5:
-                score -= (len(images) - 5) * 20
+            if 1 <= image_count <= 3:
+                score += image_count * 30
+            elif image_count > 5:
+                score -= (image_count - 5) * 20
             
             # フォームがあればペナルティ
-            if candidate['element'].find('form'):
+            if has_form:
                 score -= 300
             
             # リンクが多すぎるとペナルティ
-            links = candidate['element'].find_all('a')
-            if len(links) > 10:
-                score -= (len(links) - 10) * 5
+            if link_count > 10:
+                score -= (link_count - 10) * 5
             
             # インラインスタイルがあればペナルティ（広告の可能性）
             if candidate['element'].get('style'):
@@ -1235,10 +3603,10 @@ class WebContentExtractor:
                 if (element_class and any(term in c.lower() for c in element_class)) or (term in element_id.lower()):
                     score += 100
             
-            # 不要なキーワードを含む場合はペナルティ
-            element_html = str(candidate['element'])
-            for pattern in self.boilerplate_patterns:
-                if re.search(pattern, element_html, re.IGNORECASE):
+            # 不要なキーワードを含む場合はペナルティ（要素の範囲内に一致があるパターン1つにつき）
+            for starts, ends in pattern_matches:
+                i = bisect.bisect_left(starts, start)
+                if i < len(starts) and ends[i] <= end:
                     score -= 100
             
             if score > best_score:
@@ -1256,102 +3624,202 @@ class WebContentExtractor:
             current = current.parent
         return depth
 
+    # extract_formatted_textで中のテキストをまとめて出力し、子孫は個別に出力しない要素
+    FORMAT_LEAF_TAGS = frozenset({
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'blockquote', 'pre', 'code', 'table'
+    })
+    
+    # 子孫に含まれる場合はdivのテキストをまとめて出力しない要素
+    FORMAT_DIV_BLOCK_TAGS = frozenset({
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'blockquote', 'ul', 'ol'
+    })
+    
     def extract_formatted_text(self, element):
-        """要素から書式を維持したテキストを抽出（高度な実装）"""
+        """要素から書式を維持したテキストを抽出（高度な実装）
+        
+        1回の深さ優先走査で見出し・段落・リスト・コード・表・図を出現順に出力する。
+        段落などのブロックは中のテキストをまとめて出力し、子孫を重複して出力しない。
+        """
         if not element:
             return ""
         
-        # 結果のテキスト
+        # get_text()の対象になる文字列の型（コメントなどは含まない）
+        text_types = getattr(element, 'interesting_string_types', None) or (NavigableString, CData)
+        if isinstance(text_types, type):
+            text_types = (text_types,)
+        
+        leaf_tags = self.FORMAT_LEAF_TAGS
+        div_block_tags = self.FORMAT_DIV_BLOCK_TAGS
+        
+        # 結果のテキスト（divのテキストはstringsの範囲で保持し、最後に結合）
         result = []
         
+        # strip済みの文字列と、その累積文字数
+        strings = []
+        offsets = [0]
+        
         # 処理済みのIDを記録（重複処理回避）
         processed_ids = set()
         
-        # 見出しと段落を順番に処理
-        for child in element.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'blockquote', 'ul', 'ol', 'li', 'pre', 'code', 'table', 'figure', 'div'], recursive=True):
-            # 既に処理済みのIDがあればスキップ
-            if 'id' in child.attrs:
-                if child['id'] in processed_ids:
-                    continue
-                processed_ids.add(child['id'])
+        # 順序リストごとの項目数
+        list_counters = {}
+        
+        # 処理中のdivの状態 [結果の件数, 文字列の件数, 見出し・段落などを含むか]
+        div_states = []
+        
+        # 処理中のfigureの状態 [キャプションを出力する位置, キャプションを処理済みか]
+        figure_states = []
+        
+        def collect_strings(root, skip_tags=None):
+            """部分木の文字列をstringsに追加し、skip_tagsで除外した要素のリストを返す"""
+            skipped = []
+            stack = [iter(root.contents)]
+            while stack:
+                node = next(stack[-1], None)
+                if node is None:
+                    stack.pop()
+                elif isinstance(node, Tag):
+                    if skip_tags and node.name in skip_tags:
+                        skipped.append(node)
+                        continue
+                    if div_states and node.name in div_block_tags:
+                        div_states[-1][2] = True
+                    stack.append(iter(node.contents))
+                elif type(node) in text_types:
+                    text = node.strip()
+                    if text:
+                        strings.append(text)
+                        offsets.append(offsets[-1] + len(text))
+            return skipped
+        
+        # 各フレーム: [要素, 子のイテレータ, 種類]
+        stack = [[element, iter(element.contents), None]]
+        while stack:
+            frame = stack[-1]
+            child = next(frame[1], None)
+            
+            if child is None:
+                stack.pop()
+                if frame[2] == 'div':
+                    entry_count, start, has_block = div_states.pop()
+                    if has_block:
+                        if div_states:
+                            div_states[-1][2] = True
+                    elif offsets[len(strings)] - offsets[start] > 200:  # 十分な長さのテキストがある
+                        # 見出しや段落を含まないdivはテキストをまとめて出力（子孫の出力は置き換える）
+                        del result[entry_count:]
+                        result.append((start, len(strings)))
+                elif frame[2] == 'figure':
+                    figure_states.pop()
+                continue
+            
+            if not isinstance(child, Tag):
+                # ブロックに含まれないテキストはdivの判定にのみ使用
+                if type(child) in text_types:
+                    text = child.strip()
+                    if text:
+                        strings.append(text)
+                        offsets.append(offsets[-1] + len(text))
+                continue
             
-            # 空テキストの場合はスキップ
-            text = child.get_text(strip=True)
-            if not text:
+            name = child.name
+            if div_states and name in div_block_tags:
+                div_states[-1][2] = True
+            
+            if name == 'li' and frame[0].name == 'ol':
+                # 順序リスト項目の番号（それまでのli要素の数）
+                list_counters[id(frame[0])] = list_counters.get(id(frame[0]), 0) + 1
+            
+            if name == 'figcaption' and figure_states and not figure_states[-1][1]:
+                # 図のキャプション（figure内の最初のfigcaptionのみ）
+                figure_states[-1][1] = True
+                start = len(strings)
+                collect_strings(child)
+                caption = ''.join(strings[start:])
+                if caption:
+                    result[figure_states[-1][0]] = f"[図: {caption}]"
                 continue
+            
+            # 既に処理済みのIDがあれば、要素自体は出力せず子孫のみ処理
+            if name in leaf_tags or name in ('li', 'div', 'figure'):
+                element_id = child.attrs.get('id')
+                if element_id is not None:
+                    if element_id in processed_ids:
+                        stack.append([child, iter(child.contents), None])
+                        continue
+                    processed_ids.add(element_id)
+            
+            if name in leaf_tags:
+                start = len(strings)
+                collect_strings(child)
+                
+                # 空テキストの場合はスキップ
+                text = ''.join(strings[start:])
+                if not text:
+                    continue
                 
-            if child.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                # 見出し（レベルに応じてフォーマット）
-                level = int(child.name[1])
-                heading_markers = "#" * level
-                result.append(f"\n{heading_markers} {text}\n")
+                if name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+                    # 見出し（レベルに応じてフォーマット）
+                    level = int(name[1])
+                    heading_markers = "#" * level
+                    result.append(f"\n{heading_markers} {text}\n")
                 
-            elif child.name == 'p':
-                # 段落
-                if text:
+                elif name == 'p':
+                    # 段落
                     result.append(text)
-                    
-            elif child.name == 'blockquote':
-                # 引用
-                if text:
-                    # 複数行の引用に対応
-                    quoted_lines = []
-                    for line in text.split('\n'):
-                        quoted_lines.append(f"> {line}")
-                    result.append('\n'.join(quoted_lines))
-                    
-            elif child.name == 'ul':
-                # 非順序リスト
-                # リスト項目はliタグで処理するため、ここでは何もしない
-                pass
-                
-            elif child.name == 'ol':
-                # 順序リスト
-                # リスト項目はliタグで処理するため、ここでは何もしない
-                pass
-                
-            elif child.name == 'li':
-                # リスト項目
-                parent = child.parent
-                if parent and parent.name == 'ol':
-                    # 順序リスト項目の番号を求める
-                    index = 1
-                    for sibling in child.previous_siblings:
-                        if sibling.name == 'li':
-                            index += 1
-                    result.append(f"{index}. {text}")
+                
+                elif name == 'blockquote':
+                    # 引用（複数行の引用に対応）
+                    result.append('\n'.join(f"> {line}" for line in text.split('\n')))
+                
+                elif name in ('pre', 'code'):
+                    # コードブロック
+                    result.append(f"\n```\n{text}\n```\n")
+                
                 else:
-                    # 非順序リスト項目
-                    result.append(f"• {text}")
-                    
-            elif child.name in ['pre', 'code']:
-                # コードブロック
+                    # テーブル（簡易ASCII形式に変換）
+                    table_text = self.format_table(child)
+                    if table_text:
+                        result.append(table_text)
+            
+            elif name == 'li':
+                # リスト項目（入れ子のリストは項目の後に処理）
+                start = len(strings)
+                nested_lists = collect_strings(child, ('ul', 'ol'))
+                text = ''.join(strings[start:])
                 if text:
-                    result.append(f"\n```\n{text}\n```\n")
-                    
-            elif child.name == 'table':
-                # テーブル（簡易ASCII形式に変換）
-                table_text = self.format_table(child)
-                if table_text:
-                    result.append(table_text)
-                    
-            elif child.name == 'figure':
-                # 図（キャプションがあれば追加）
-                caption = child.find('figcaption')
-                if caption and caption.get_text(strip=True):
-                    result.append(f"[図: {caption.get_text(strip=True)}]")
-                    
-            elif child.name == 'div':
-                # div要素は特別扱い（一部の重要なdivのみ処理）
-                # 意味のある段落要素や見出しを含むdivのみ処理
-                if len(text) > 200:  # 十分な長さのテキストがある
-                    # すでに処理したタグが含まれていない場合のみ追加
-                    if not child.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'blockquote', 'ul', 'ol']):
-                        result.append(text)
+                    if frame[0].name == 'ol':
+                        result.append(f"{list_counters[id(frame[0])]}. {text}")
+                    else:
+                        # 非順序リスト項目
+                        result.append(f"• {text}")
+                if nested_lists:
+                    stack.append([child, iter(nested_lists), None])
+            
+            elif name == 'div':
+                # div要素は特別扱い（見出しや段落を含まない十分な長さのdivのみテキストをまとめて出力）
+                div_states.append([len(result), len(strings), False])
+                stack.append([child, iter(child.contents), 'div'])
+            
+            elif name == 'figure':
+                # 図（キャプションがあれば出現位置に追加）
+                figure_states.append([len(result), False])
+                result.append(None)
+                stack.append([child, iter(child.contents), 'figure'])
+            
+            else:
+                # ul・olなどのコンテナは子要素を処理
+                stack.append([child, iter(child.contents), None])
+        
+        # divのテキストを結合し、キャプションのない図の位置を除く
+        result = [
+            ''.join(strings[item[0]:item[1]]) if isinstance(item, tuple) else item
+            for item in result if item is not None
+        ]
         
         # 結果がない場合は通常のテキスト抽出を実行
         if not result:
-            return element.get_text(strip=True)
+            return ''.join(strings)
         
         # 結果を結合
         return '\n\n'.join(result)
@@ -1412,82 +3880,94 @@ class WebContentExtractor:
         
         return "\n".join(result)
 
+    # clean_textで削除するパターン（有効/無効を切り替えるオプション名, パターン）
+    CLEAN_TEXT_PATTERNS = (
+        # 広告・プロモーションの削除
+        ('remove_ads', (
+            r'\[PR\]|\[広告\]|\[Advertisement\]|\[Sponsored\]',
+            r'広告|スポンサー|PR|プロモーション',
+            r'Sponsored|Advertisement|Promotion',
+            r'Advertisements?(\s+by\s+\w+)?',
+            r'Sponsored\s+Content',
+            r'Promoted\s+(Stories|Content)',
+            r'Recommended\s+For\s+You'
+        )),
+        # ナビゲーション・メニューの削除
+        ('remove_navigation', (
+            r'サイトマップ|プライバシーポリシー|利用規約|お問い合わせ',
+            r'ログイン|新規登録|パスワードを忘れた',
+            r'検索|Search',
+            r'メニュー|ナビゲーション',
+            r'ホーム|TOP',
+            r'Sign\s+(in|up)',
+            r'Log\s+(in|out)',
+            r'Create\s+an\s+account',
+            r'Forgot\s+password',
+            r'Navigation|Menu|Sitemap',
+            r'Skip\s+to\s+(content|main)'
+        )),
+        # フッター・コピーライトの削除
+        ('remove_footer', (
+            r'copyright|©|all\s+rights\s+reserved',
+            r'\d{4}-\d{4}\s+\w+\.\s+all\s+rights\s+reserved\.',
+            r'powered\s+by\s+\w+',
+            r'Copyright\s+©\s+\d{4}[-\d{4}]?',
+            r'All\s+Rights\s+Reserved',
+            r'Terms\s+of\s+(Use|Service)',
+            r'Privacy\s+Policy',
+            r'Contact\s+Us'
+        )),
+        # 関連記事・おすすめコンテンツの削除
+        ('remove_related', (
+            r'関連記事|関連情報|こちらもおすすめ|あわせて読みたい',
+            r'関連|おすすめ|人気の記事',
+            r'Related\s+Articles|Related\s+Posts|You\s+might\s+also\s+like',
+            r'Recommended\s+Articles',
+            r'More\s+in\s+[A-Za-z\s]+',
+            r'Popular\s+in\s+[A-Za-z\s]+',
+            r'Trending\s+Now',
+            r'Most\s+Read',
+            r'From\s+Our\s+Network'
+        ))
+    )
+    
+    CLEAN_TEXT_NEWLINES_RE = re.compile(r'\n{3,}')
+    CLEAN_TEXT_SPACES_RE = re.compile(r' {2,}')
+    CLEAN_TEXT_URL_RE = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+')
+    
+    def _get_text_cleaner(self):
+        """clean_textの削除用正規表現を取得（オプション・パターンが変わった場合のみ再構築）
+        
+        パターンは1つずつ順に適用する（前のパターンの削除で新たに一致する文字列も削除する）。
+        """
+        key = (
+            tuple(bool(self.options.get(option, True)) for option, _ in self.CLEAN_TEXT_PATTERNS),
+            tuple(self.boilerplate_patterns)
+        )
+        cleaner_key, regexes = self._text_cleaner
+        if cleaner_key != key:
+            regexes = []
+            for enabled, (_, patterns) in zip(key[0], self.CLEAN_TEXT_PATTERNS):
+                if enabled:
+                    regexes.extend(compile_removal_regex(pattern) for pattern in patterns)
+            
+            # 正規表現で不要なパターンを削除（共通処理）
+            regexes.extend(compile_removal_regex(pattern) for pattern in key[1])
+            self._text_cleaner = (key, regexes)
+        return regexes
+    
     def clean_text(self, text):
         """抽出したテキストを整形（高度な実装）"""
         if not text:
             return ""
         
-        # オプションに基づいて処理
-        if self.options.get('remove_ads', True):
-            # 広告・プロモーションの削除
-            patterns = [
-                r'\[PR\]|\[広告\]|\[Advertisement\]|\[Sponsored\]',
-                r'広告|スポンサー|PR|プロモーション',
-                r'Sponsored|Advertisement|Promotion',
-                r'Advertisements?(\s+by\s+\w+)?',
-                r'Sponsored\s+Content',
-                r'Promoted\s+(Stories|Content)',
-                r'Recommended\s+For\s+You'
-            ]
-            for pattern in patterns:
-                text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-        
-        if self.options.get('remove_navigation', True):
-            # ナビゲーション・メニューの削除
-            patterns = [
-                r'サイトマップ|プライバシーポリシー|利用規約|お問い合わせ',
-                r'ログイン|新規登録|パスワードを忘れた',
-                r'検索|Search',
-                r'メニュー|ナビゲーション',
-                r'ホーム|TOP',
-                r'Sign\s+(in|up)',
-                r'Log\s+(in|out)',
-                r'Create\s+an\s+account',
-                r'Forgot\s+password',
-                r'Navigation|Menu|Sitemap',
-                r'Skip\s+to\s+(content|main)'
-            ]
-            for pattern in patterns:
-                text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-        
-        if self.options.get('remove_footer', True):
-            # フッター・コピーライトの削除
-            patterns = [
-                r'copyright|©|all\s+rights\s+reserved',
-                r'\d{4}-\d{4}\s+\w+\.\s+all\s+rights\s+reserved\.',
-                r'powered\s+by\s+\w+',
-                r'Copyright\s+©\s+\d{4}[-\d{4}]?',
-                r'All\s+Rights\s+Reserved',
-                r'Terms\s+of\s+(Use|Service)',
-                r'Privacy\s+Policy',
-                r'Contact\s+Us'
-            ]
-            for pattern in patterns:
-                text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-        
-        if self.options.get('remove_related', True):
-            # 関連記事・おすすめコンテンツの削除
-            patterns = [
-                r'関連記事|関連情報|こちらもおすすめ|あわせて読みたい',
-                r'関連|おすすめ|人気の記事',
-                r'Related\s+Articles|Related\s+Posts|You\s+might\s+also\s+like',
-                r'Recommended\s+Articles',
-                r'More\s+in\s+[A-Za-z\s]+',
-                r'Popular\s+in\s+[A-Za-z\s]+',
-                r'Trending\s+Now',
-                r'Most\s+Read',
-                r'From\s+Our\s+Network'
-            ]
-            for pattern in patterns:
-                text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-            
-        # 正規表現で不要なパターンを削除（共通処理）
-        for pattern in self.boilerplate_patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+        # オプションに基づいて広告・ナビゲーション・フッター・関連記事・定型文を削除
+        for regex in self._get_text_cleaner():
+            text = regex.sub('', text)
         
         # 余分な改行、スペースの削除
         # 3つ以上の連続する改行を2つに
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = self.CLEAN_TEXT_NEWLINES_RE.sub('\n\n', text)
         
         # 行頭と行末の空白を削除
         lines = [line.strip() for line in text.split('\n')]
@@ -1495,216 +3975,815 @@ class WebContentExtractor:
         
         # 連続する空白を1つに
         if self.options.get('normalize_spaces', True):
-            text = re.sub(r' {2,}', ' ', text)
+            text = self.CLEAN_TEXT_SPACES_RE.sub(' ', text)
         
         # 空行の最適化
         if self.options.get('remove_empty_lines', True):
             # 空行が3行以上続く場合、2行に減らす
-            text = re.sub(r'\n{3,}', '\n\n', text)
+            text = self.CLEAN_TEXT_NEWLINES_RE.sub('\n\n', text)
         
         # テキストの前後のスペースを削除
         text = text.strip()
         
         # URLをリンク形式に変換
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-        # f-stringエラーの修正: リテラル置換を使用
-        text = re.sub(url_pattern, lambda m: '[' + m.group(0) + '](' + m.group(0) + ')', text)
+        text = self.CLEAN_TEXT_URL_RE.sub(r'[\g<0>](\g<0>)', text)
         
         return text
 
-    def extract_from_url(self, url, timeout=None):
-        """URLから本文を抽出する（メイン関数）"""
-        if timeout is None:
-            timeout = self.options['timeout']
-        
-        # URL正規化と検証
-        normalized_url = URL.normalize(url)
-        if not normalized_url:
+    def _screen_url(self, url, check_duplicate=True):
+        """URLを正規化し、重複・除外対象サイトでないかを判定（URLレコードを返す）"""
+        # URL正規化と検証（取り込み時に作成済みのレコードはそのまま使う）
+        record = URLRecord.parse(url)
+        if record is None:
             raise ValueError(f"無効なURL形式です: {url}")
-            
-        # 重複チェック
-        if self.is_duplicate_url(normalized_url):
+        normalized_url = record.url
+        
+        # 重複チェック（バッチ処理では投入時にチェック済み）
+        if check_duplicate and self.is_duplicate_url(record):
             # 重複URLに分類
-            self.categorized_urls['duplicate'].add(normalized_url)
+            self.url_categories.add('duplicate', normalized_url)
             raise ValueError(f"重複URLのため除外されました: {normalized_url}")
         
         # Eコマースサイトの判定
-        if self.is_ecommerce_site(normalized_url):
+        if self.is_ecommerce_site(record):
             # Eコマースサイトに分類
-            self.categorized_urls['ecommerce'].add(normalized_url)
+            self.url_categories.add('ecommerce', normalized_url)
             raise ValueError(f"Eコマースサイトのため除外されました: {normalized_url}")
-            
+        
         # アダルトサイトの判定
-        if self.is_adult_site(normalized_url):
+        if self.is_adult_site(record):
             # アダルトサイトに分類
-            self.categorized_urls['adult'].add(normalized_url)
+            self.url_categories.add('adult', normalized_url)
             raise ValueError(f"アダルトサイトのため除外されました: {normalized_url}")
         
-        # URLのカテゴリをチェック
-        url_category = URL.categorize_url(normalized_url)
-        
+        return record
+    
+    def _classify_url(self, normalized_url, url_category, is_pdf):
+        """URLのカテゴリを記録し、本文抽出の対象外であれば例外を送出"""
         # カテゴリを記録
-        if url_category in self.categorized_urls:
-            self.categorized_urls[url_category].add(normalized_url)
+        self.url_categories.add(url_category, normalized_url)
         
         # PDFの場合、PDFカテゴリにも追加
-        if url_category == 'document' and URL.is_pdf_url(normalized_url):
-            self.categorized_urls['pdf'].add(normalized_url)
+        if is_pdf:
+            self.url_categories.add('pdf', normalized_url)
             if not self.options['extract_pdf_text'] or not PDF_SUPPORT:
                 raise ValueError(f"PDFからのテキスト抽出が無効化されています: {normalized_url}")
         
         # HTML以外のコンテンツタイプの場合はエラー
         if url_category not in ['html', 'document']:
             raise ValueError(f"このURLタイプは本文抽出に適していません: {url_category} - {normalized_url}")
+    
+    def extract_from_url(self, url, timeout=None, check_duplicate=True, cancel_token=None):
+        """URLから本文を抽出する（メイン関数）"""
+        # HTMLを取得
+        normalized_url, html = self._fetch_for_extraction(url, timeout, check_duplicate, cancel_token)
+        
+        # 本文抽出
+        extraction_result = self.extract_main_content(html, normalized_url)
+        
+        return self._check_extraction_result(normalized_url, extraction_result)
+    
+    def _fetch_for_extraction(self, url, timeout=None, check_duplicate=True, cancel_token=None):
+        """本文抽出の対象となるURLを判定してHTMLを取得（正規化済みURLとHTMLを返す）"""
+        if timeout is None:
+            timeout = self.options['timeout']
+        
+        # URL正規化と除外判定
+        record = self._screen_url(url, check_duplicate)
+        normalized_url = record.url
+        
+        # 拡張子で判定できるカテゴリは取得前に振り分け、それ以外はレスポンスで判定
+        url_category = record.category
+        if url_category:
+            self._classify_url(normalized_url, url_category, record.is_pdf)
         
         # HTMLを取得
-        html = self.fetch_url(normalized_url, timeout)
+        html = self.fetch_url(record, timeout, classify=url_category is None, cancel_token=cancel_token)
         
         if not html:
             raise ValueError(f"{normalized_url} の取得に失敗しました。")
-            
-        # 本文抽出
-        extraction_result = self.extract_main_content(html, normalized_url)
         
+        return normalized_url, html
+    
+    def _check_extraction_result(self, normalized_url, extraction_result):
+        """本文を抽出できなかった場合は例外を送出"""
         if not extraction_result or not extraction_result.get('content'):
             raise ValueError(f"{normalized_url} から本文を抽出できませんでした。")
-            
+        
         return extraction_result
     
-    def process_url_batch(self, urls, max_workers=None, callback=None, error_callback=None, progress_callback=None):
-        """複数のURLを一括処理（スレッドプール実装）"""
+    def _iter_batch_urls(self, urls, skipped_urls=None, journal=None):
+        """バッチ処理用にURLを正規化し、重複と処理済みのURLを除きながら順に返す
+        
+        正規化はここで一度だけ行い、以降の段階には作成したURLレコードを渡す。
+        """
+        for url in urls:
+            record = URLRecord.parse(url)
+            if record is None:
+                if skipped_urls is not None:
+                    skipped_urls.append(url)
+                continue
+            
+            # ジョブジャーナルで処理済みのURLは再開時にスキップ
+            if journal is not None and journal.is_finished(record.url):
+                if skipped_urls is not None:
+                    skipped_urls.append(url)
+                continue
+            
+            if self.options.get('exclude_duplicates') and self.is_duplicate_url(record):
+                self.url_categories.add('duplicate', record.url, pending=False)
+                if skipped_urls is not None:
+                    skipped_urls.append(url)
+                continue
+            
+            yield record
+    
+    def _prepare_batch_urls(self, urls, journal=None):
+        """バッチ処理用にURLを正規化し、重複を排除"""
+        skipped_urls = []
+        normalized_urls = list(self._iter_batch_urls(urls, skipped_urls, journal))
+        return normalized_urls, skipped_urls
+    
+    def process_url_batch(self, urls, max_workers=None, callback=None, error_callback=None, progress_callback=None, sinks=None,
+                          journal=None, cancel_token=None):
+        """複数のURLを一括処理（スレッドプール / asyncio実装）
+        
+        journal（またはjob_journal_pathオプション）を指定すると、前回までに処理済みのURLを
+        スキップし、一時的なエラーで失敗したURLだけを再試行する。
+        cancel_tokenが取り消された場合は、それまでに完了した結果を返す。
+        """
+        # オプションで指定されたジャーナルはバッチの間だけ開く
+        if journal is None and self.options.get('job_journal_path'):
+            with JobJournal(self.options['job_journal_path']) as journal:
+                return self.process_url_batch(
+                    urls, max_workers, callback, error_callback, progress_callback, sinks, journal, cancel_token)
+        
+        # URL正規化と重複排除
+        normalized_urls, skipped_urls = self._prepare_batch_urls(urls, journal)
+        
+        return list(self._run_url_batch(
+            normalized_urls, len(normalized_urls), None, max_workers, callback, error_callback, progress_callback, sinks,
+            journal, cancel_token))
+    
+    def iter_extract(self, urls, max_workers=None, callback=None, error_callback=None, progress_callback=None, window=None,
+                     sinks=None, journal=None, cancel_token=None):
+        """URLのイテラブルを処理し、完了した順に結果を返すジェネレータ
+        
+        入力（遅延読み込みのファイルなど）は必要な分だけ読み進め、処理中・待機中の
+        URLをwindow件までに抑えるため、入力の長さに関わらずメモリ使用量は一定に保たれる。
+        進捗コールバックの総数は不明のためNoneになる。
+        
+        Parameters:
+        - urls: URLのイテラブル
+        - window: 同時に保持するURLの上限（省略時はstream_windowオプション）
+        - sinks: 結果を完了順に追記するResultSinkのリスト
+        - journal: 処理済みのURLをスキップするJobJournal（省略時はjob_journal_pathオプション）
+        - cancel_token: 処理を途中で取り消すためのCancellationToken
+        """
+        # オプションで指定されたジャーナルは処理の間だけ開く
+        if journal is None and self.options.get('job_journal_path'):
+            with JobJournal(self.options['job_journal_path']) as journal:
+                yield from self.iter_extract(
+                    urls, max_workers, callback, error_callback, progress_callback, window, sinks, journal, cancel_token)
+            return
+        
+        if window is None:
+            window = self.options.get('stream_window', 1000)
+        
+        yield from self._run_url_batch(
+            self._iter_batch_urls(urls, journal=journal), None, max(1, window), max_workers,
+            callback, error_callback, progress_callback, sinks, journal, cancel_token)
+    
+    def _run_url_batch(self, normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback,
+                       sinks=None, journal=None, cancel_token=None):
+        """正規化済みURLを取得エンジンで処理し、完了した順に結果を返すジェネレータ
+        
+        total_urlsは既知の場合のURL数（不明ならNone）、windowは同時に保持するURLの上限（Noneで無制限）。
+        各結果はsinks・result_sink_pathオプションの出力先・journalに完了した時点で追記する。
+        cancel_tokenが取り消されると、処理中のURLの結果を待たずに終了する。
+        """
         # 並列処理の制限（デフォルトはシステムに最適化）
         if max_workers is None:
             max_workers = self.options.get('max_connections', 10)
         
-        # URL正規化と重複排除
-        normalized_urls = []
-        skipped_urls = []
-        for url in urls:
-            normalized_url = URL.normalize(url)
-            if not normalized_url:
-                skipped_urls.append(url)
-                continue
-            
-            if self.options.get('exclude_duplicates') and self.is_duplicate_url(normalized_url):
-                self.categorized_urls['duplicate'].add(normalized_url)
-                skipped_urls.append(url)
-                continue
-            
-            normalized_urls.append(normalized_url)
+        # 同時接続数に合わせてコネクションプールを拡張
+        self.transport.ensure_pool_size(max_workers)
+        
+        # プログレスコールバックで初期状態を通知
+        if progress_callback:
+            progress_callback(None, 0, total_urls, "開始中...")
+        
+        if self.options.get('fetch_engine') == 'async' and not ASYNC_SUPPORT:
+            logger.warning("aiohttpがインストールされていないため、スレッドエンジンで処理します")
+        
+        processed = 0
+        sinks = list(sinks or [])
+        
+        # オプションで指定された出力先はバッチの間だけ開く
+        option_sink = self._open_option_sink()
+        if option_sink is not None:
+            sinks.append(option_sink)
+        
+        # 再開時は前回までの処理済みURLのカテゴリを統計に含める
+        if journal is not None:
+            journal_stats = journal.get_stats()
+            if journal_stats:
+                logger.info(f"ジョブジャーナルから再開: 完了 {journal_stats['done']}件 / 失敗 {journal_stats['failed']}件 / "
+                            f"再試行 {journal_stats['retry']}件")
+            journal.restore_categories(self.url_categories)
+            sinks.append(journal)
+        
+        # 本文抽出（CPU処理）は取得とは別のプロセスで並列に実行（プールはバッチごとに作成）
+        pool = self._create_extraction_pool(total_urls)
+        try:
+            if self.options.get('fetch_engine') == 'async' and ASYNC_SUPPORT:
+                # イベントループ上で多数のリクエストを同時に処理
+                results = self._iter_url_batch_async(
+                    normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback,
+                    cancel_token, pool)
+            else:
+                results = self._iter_url_batch_threaded(
+                    normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback,
+                    cancel_token, pool)
+            
+            for result in results:
+                processed += 1
+                for sink in sinks:
+                    sink.write(result)
+                yield result
+        finally:
+            if pool is not None:
+                pool.close()
+            
+            # 書き込み済みの結果をディスクに同期
+            for sink in sinks:
+                try:
+                    if sink is option_sink:
+                        sink.close()
+                    else:
+                        sink.flush()
+                except Exception as e:
+                    logger.error(f"結果の出力先の同期中にエラーが発生しました: {e}")
+            
+            # 完了しなかったURLの予約を取り消し、次回の実行でも重複を検出できるように保存
+            # （取り消された場合は保存しない）
+            self.seen_urls.clear_reservations()
+            if cancel_token is None or not cancel_token.cancelled:
+                self.save_url_indexes()
+        
+        # 最終的なカテゴリ別の統計情報を生成
+        stats = self.get_category_stats()
+        
+        pool_stats = self.get_pool_stats()
+        logger.info(f"コネクションプール: 再利用 {pool_stats['hits']}件 / 新規接続 {pool_stats['misses']}件")
+        
+        for parser, parse_stats in self.get_parse_stats().items():
+            logger.info(f"HTML解析 ({parser}): {parse_stats['count']}件 / 平均 {parse_stats['average_ms']:.1f}ms")
+        
+        if self.cache is not None and self.cache.dropped_writes:
+            logger.warning(f"キャッシュの書き込みキューが満杯のため破棄した書き込み: {self.cache.dropped_writes}件")
+        
+        # 完了通知
+        if cancel_token is not None and cancel_token.cancelled:
+            logger.info(f"バッチ処理が取り消されました: {processed}件処理済み")
+            if progress_callback:
+                progress_callback(None, processed, total_urls, "中断", stats)
+        elif progress_callback:
+            total = total_urls if total_urls is not None else processed
+            progress_callback(None, total, total, "完了", stats)
+    
+    def _open_option_sink(self):
+        """result_sink_pathオプションの出力先を開く（未指定ならNone）"""
+        path = self.options.get('result_sink_path')
+        if not path:
+            return None
+        
+        sink = open_result_sink(path)
+        logger.info(f"結果を逐次出力します: {path}")
+        return sink
+    
+    def _create_extraction_pool(self, total_urls=None):
+        """バッチ用の本文抽出プロセスプールを作成（1プロセス以下なら作成しない）"""
+        processes = self.options.get('extraction_processes', 0) or os.cpu_count() or 1
+        if total_urls is not None:
+            processes = min(processes, total_urls)
+        if processes <= 1:
+            return None
+        
+        try:
+            pool = ExtractionPool(self.options, self.get_extraction_settings(), processes)
+        except Exception as e:
+            logger.warning(f"本文抽出プロセスを起動できないため、取得スレッドで抽出します: {e}")
+            return None
+        
+        logger.info(f"本文抽出プロセス: {processes}個（処理待ち上限 {pool.max_pending}件）")
+        return pool
+    
+    def _create_scheduler(self):
+        """バッチ用のドメイン別スケジューラを作成"""
+        return DomainScheduler(
+            rate=self.options.get('domain_rate_limit', 2.0),
+            max_concurrency=self.options.get('domain_max_connections', 2),
+            max_retries=self.options.get('max_retries', 2),
+            max_backoff=self.options.get('max_backoff', 300)
+        )
+    
+    @staticmethod
+    def _fill_scheduler(scheduler, url_iter, window, in_flight):
+        """処理中・待機中のURLがwindow件になるまで入力を読み進めてスケジューラに追加
+        
+        入力を読み終えた場合はNoneを返す（windowがNoneなら入力をすべて追加）。
+        """
+        if url_iter is None:
+            return None
+        
+        while window is None or len(scheduler) + in_flight < window:
+            url = next(url_iter, None)
+            if url is None:
+                return None
+            scheduler.add(url)
+        
+        return url_iter
+    
+    def _iter_url_batch_threaded(self, normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback,
+                                 cancel_token=None, pool=None):
+        """正規化済みURLをスレッドプールで処理（ドメイン別スケジューラ経由）
+        
+        本文抽出プロセスプール（pool）がある場合、スレッドはHTMLの取得までを行い、
+        取得したHTMLをプールに渡してすぐ次のURLの取得に移る。
+        取得中のダウンロードはcancel_tokenの取り消しをチャンクの区切りで確認する。
+        """
+        processed = 0
+        url_iter = iter(normalized_urls)
+        scheduler = self._create_scheduler()
+        
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            future_to_url = {}
+            # 本文抽出プロセスで処理中のタスク {Future: (URL, 取得ステージの結果)}
+            extracting = {}
+            
+            while True:
+                # 取り消された場合は処理中のURLの結果を待たずに終了
+                if cancel_token is not None and cancel_token.cancelled:
+                    break
+                
+                # 処理中のURLと合わせてwindow件まで入力を読み進める
+                url_iter = self._fill_scheduler(scheduler, url_iter, window, len(future_to_url) + len(extracting))
+                if url_iter is None and not scheduler.has_pending() and not future_to_url and not extracting:
+                    break
+                
+                # 空いているワーカーに、ドメインの制限内で処理可能なURLを投入
+                # （本文抽出の処理待ちが上限に達している間は新しい取得を控える）
+                wait = None
+                while len(future_to_url) < max_workers and not (pool is not None and pool.is_full()):
+                    url, wait = scheduler.acquire()
+                    if url is None:
+                        break
+                    # 重複チェックは投入前に済んでいる
+                    if pool is not None:
+                        future = executor.submit(self._process_fetch_stage, url, callback, error_callback, progress_callback, scheduler,
+                                                 cancel_token)
+                    else:
+                        future = executor.submit(self.process_single_url, url, callback, error_callback, progress_callback, False, scheduler,
+                                                 cancel_token)
+                    future_to_url[future] = url
+                
+                # 取り消しを確認できるように待機時間を区切る
+                if cancel_token is not None:
+                    wait = min(wait, cancel_token.POLL_INTERVAL) if wait is not None else cancel_token.POLL_INTERVAL
+                
+                if not future_to_url and not extracting:
+                    # すべてのドメインがレート制限中
+                    time.sleep(wait if wait is not None else 0.05)
+                    continue
+                
+                # 完了したタスクを処理（レート制限の解除時刻になったら投入に戻る）
+                done, _ = concurrent.futures.wait(
+                    [*future_to_url, *extracting], timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+                
+                for future in done:
+                    if future in extracting:
+                        # 本文抽出プロセスの結果を受け取る
+                        url, stage = extracting.pop(future)
+                        try:
+                            result = self._process_extraction_stage(url, stage, future, callback, error_callback, progress_callback)
+                        except Exception as e:
+                            logger.error(f"URL処理エラー: {url} - {e}")
+                            continue
+                    else:
+                        url = future_to_url.pop(future)
+                        try:
+                            result = future.result()
+                        except ExtractionCancelled:
+                            # 取り消しにより中断されたURL
+                            result = None
+                        except Exception as e:
+                            logger.error(f"URL処理エラー: {url} - {e}")
+                            # すでに個別のタスクでエラーハンドリングされているので、ここでは何もしない
+                            result = None
+                        
+                        scheduler.release(url, result)
+                        
+                        # 再試行のために戻されたURL
+                        if result is None or result.get('retrying'):
+                            continue
+                        
+                        # 取得済みのHTMLを本文抽出プロセスに渡す
+                        if 'html' in result:
+                            try:
+                                extracting[pool.submit(result.pop('html'), result['normalized_url'])] = (url, result)
+                                continue
+                            except Exception as e:
+                                try:
+                                    result = self._handle_failure(url, e, error_callback, progress_callback)
+                                except Exception:
+                                    continue
+                    
+                    # 進捗を更新
+                    processed += 1
+                    if progress_callback:
+                        progress_callback(str(url), processed, total_urls, self._format_progress(processed, total_urls))
+                    
+                    yield result
+        finally:
+            # 取り消された場合は未開始のURLを取り消し、取得中のスレッドの終了を待たない
+            cancelled = cancel_token is not None and cancel_token.cancelled
+            executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+    
+    def _iter_url_batch_async(self, normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback,
+                              cancel_token=None, pool=None):
+        """非同期エンジンの結果を同期のジェネレータとして返す
+        
+        結果を1件返すごとにイベントループを止めるため、呼び出し側が次の結果を
+        要求するまで新しい取得は進まない。
+        """
+        loop = asyncio.new_event_loop()
+        results = self._aiter_url_batch_async(
+            normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback, cancel_token, pool)
+        try:
+            while True:
+                try:
+                    result = loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+                yield result
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    
+    async def _aiter_url_batch_async(self, normalized_urls, total_urls, window, max_workers, callback, error_callback, progress_callback,
+                                     cancel_token=None, pool=None):
+        """正規化済みURLを単一のイベントループ上で処理（ドメイン別スケジューラ経由）"""
+        processed = 0
+        url_iter = iter(normalized_urls)
+        concurrency = self.options.get('async_concurrency', 500)
+        if total_urls is not None:
+            concurrency = min(concurrency, total_urls or 1)
+        concurrency = max(1, concurrency)
+        scheduler = self._create_scheduler()
+        
+        # 本文抽出（CPU処理）はイベントループを塞がないようにスレッドで実行
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            async with self.transport.create_async_session(concurrency) as session:
+                task_to_url = {}
+                
+                try:
+                    while True:
+                        # 取り消された場合は処理中のタスクを取り消して終了
+                        if cancel_token is not None and cancel_token.cancelled:
+                            break
+                        
+                        # 処理中のURLと合わせてwindow件まで入力を読み進める
+                        url_iter = self._fill_scheduler(scheduler, url_iter, window, len(task_to_url))
+                        if url_iter is None and not scheduler.has_pending() and not task_to_url:
+                            break
+                        
+                        # ドメインの制限内で処理可能なURLをタスクとして起動
+                        # （本文抽出の処理待ちが上限に達している間は新しい取得を控える）
+                        wait = None
+                        while len(task_to_url) < concurrency and not (pool is not None and pool.is_full()):
+                            url, wait = scheduler.acquire()
+                            if url is None:
+                                break
+                            task = asyncio.ensure_future(self._process_single_url_async(
+                                session, executor, url, callback, error_callback, progress_callback, scheduler, pool))
+                            task_to_url[task] = url
+                        
+                        # 取り消しを確認できるように待機時間を区切る
+                        if cancel_token is not None:
+                            wait = min(wait, cancel_token.POLL_INTERVAL) if wait is not None else cancel_token.POLL_INTERVAL
+                        
+                        if not task_to_url:
+                            # すべてのドメインがレート制限中
+                            await asyncio.sleep(wait if wait is not None else 0.05)
+                            continue
+                        
+                        # 完了したタスクを処理（レート制限の解除時刻になったら起動に戻る）
+                        done, _ = await asyncio.wait(
+                            task_to_url, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                        
+                        for task in done:
+                            url = task_to_url.pop(task)
+                            try:
+                                result = task.result()
+                            except Exception as e:
+                                logger.error(f"URL処理エラー: {url} - {e}")
+                                result = None
+                            
+                            scheduler.release(url, result)
+                            
+                            # 再試行のために戻されたURL
+                            if result is None or result.get('retrying'):
+                                continue
+                            
+                            # 進捗を更新
+                            processed += 1
+                            if progress_callback:
+                                progress_callback(str(url), processed, total_urls, self._format_progress(processed, total_urls))
+                            
+                            yield result
+                finally:
+                    # 途中で打ち切られた場合は処理中のタスクを取り消す
+                    for task in task_to_url:
+                        task.cancel()
+                    if task_to_url:
+                        await asyncio.gather(*task_to_url, return_exceptions=True)
+    
+    @staticmethod
+    def _format_progress(processed, total_urls):
+        """進捗表示用の文字列"""
+        if total_urls is None:
+            return f"処理済み: {processed}"
+        return f"処理済み: {processed}/{total_urls}"
+    
+    def process_single_url(self, url, callback=None, error_callback=None, progress_callback=None, check_duplicate=True, scheduler=None,
+                           cancel_token=None):
+        """単一URLの処理（並列処理用）"""
+        try:
+            # 進捗コールバック（URL処理開始）
+            if progress_callback:
+                progress_callback(str(url), None, None, "処理中")
+            
+            # URL処理
+            extraction_result = self.extract_from_url(url, check_duplicate=check_duplicate, cancel_token=cancel_token)
+            
+            return self._handle_success(url, extraction_result, callback)
+        
+        except Exception as e:
+            return self._handle_failure(url, e, error_callback, progress_callback, scheduler)
+
+    async def _process_single_url_async(self, session, executor, url, callback=None, error_callback=None, progress_callback=None, scheduler=None,
+                                        pool=None):
+        """単一URLの非同期処理（process_single_urlと同じコールバック契約）"""
+        try:
+            # 進捗コールバック（URL処理開始）
+            if progress_callback:
+                progress_callback(str(url), None, None, "処理中")
+            
+            # URL処理
+            extraction_result = await self.extract_from_url_async(session, executor, url, check_duplicate=False, pool=pool)
+            
+            return self._handle_success(url, extraction_result, callback)
+        
+        except Exception as e:
+            return self._handle_failure(url, e, error_callback, progress_callback, scheduler)
+    
+    def _process_fetch_stage(self, url, callback=None, error_callback=None, progress_callback=None, scheduler=None, cancel_token=None):
+        """取得ステージ: HTMLを取得して本文抽出プロセスに渡す情報を返す（抽出結果がキャッシュ済みなら成功結果を返す）"""
+        try:
+            # 進捗コールバック（URL処理開始）
+            if progress_callback:
+                progress_callback(str(url), None, None, "処理中")
+            
+            normalized_url, html = self._fetch_for_extraction(url, check_duplicate=False, cancel_token=cancel_token)
+            
+            # 同じ内容・設定の抽出結果があれば本文抽出プロセスに渡さない
+            result_key = self._get_result_key(html, normalized_url)
+            extraction_result = self._get_cached_result(result_key, normalized_url)
+            if extraction_result is not None:
+                return self._handle_success(url, self._check_extraction_result(normalized_url, extraction_result), callback)
+            
+            return {'url': str(url), 'normalized_url': normalized_url, 'html': html, 'result_key': result_key, 'success': True}
+        
+        except Exception as e:
+            return self._handle_failure(url, e, error_callback, progress_callback, scheduler)
+    
+    def _process_extraction_stage(self, url, stage, future, callback=None, error_callback=None, progress_callback=None):
+        """抽出ステージ: 本文抽出プロセスの結果から成功/エラーの結果を構築"""
+        try:
+            extraction_result = self._finish_pool_extraction(stage['result_key'], future.result())
+            return self._handle_success(url, self._check_extraction_result(stage['normalized_url'], extraction_result), callback)
+        
+        except Exception as e:
+            return self._handle_failure(url, e, error_callback, progress_callback)
+    
+    def _handle_failure(self, url, e, error_callback=None, progress_callback=None, scheduler=None):
+        """処理中の例外を再試行またはエラー結果に振り分け"""
+        # 取り消しはエラーとして扱わない（結果を返さずに中断）
+        if isinstance(e, ExtractionCancelled):
+            raise e
+        
+        # レート制限による拒否はスケジューラに戻して後で再試行
+        if scheduler is not None and scheduler.requeue(url, e):
+            return {'url': str(url), 'retrying': True}
+        
+        error_result = self._handle_error(url, e, error_callback, progress_callback)
+        
+        # エラー時の処理継続判定
+        if not self.options.get('continue_on_error', True):
+            raise e
+        
+        return error_result
+    
+    def _handle_success(self, url, extraction_result, callback=None):
+        """成功結果を構築してコールバックに通知"""
+        self._settle_seen_url(url, True)
+        
+        # 結果にはURLレコードではなくURL文字列を記録
+        url = str(url)
+        
+        # 結果を整形
+        if isinstance(extraction_result, dict):
+            content = extraction_result.get('formatted_text', extraction_result.get('content', ''))
+        else:
+            content = extraction_result
+        
+        # 結果を構築
+        result = {
+            'url': url,
+            'content': content,
+            'raw_result': extraction_result,
+            'success': True,
+            'timestamp': datetime.datetime.now().isoformat(),
+            'category': self.url_categories.release(url, 'html')  # 分類されていなければHTML
+        }
+        
+        # 成功コールバック
+        if callback:
+            callback(result)
+        
+        return result
+    
+    def _handle_error(self, url, e, error_callback=None, progress_callback=None):
+        """エラー結果を構築してコールバックに通知"""
+        record = url
+        # 結果にはURLレコードではなくURL文字列を記録
+        url = str(url)
+        logger.exception(f"URL処理エラー: {url}")
+        
+        # カテゴリ判定を試みる
+        category = self.url_categories.release(url, 'invalid')
+        
+        # エラー情報を構築
+        error_result = {
+            'url': url,
+            'content': f"エラー: {str(e)}",
+            'success': False,
+            'error': str(e),
+            'error_type': type(e).__name__,
+            'status_code': getattr(e, 'status_code', None),
+            'retry_after': getattr(e, 'retry_after', None),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'category': category
+        }
+        
+        # 恒久的なエラーは処理済みとし、一時的なエラーは次回に再処理する
+        # （重複として除外されたURLは元のURLの予約を確定させない）
+        if category != 'duplicate':
+            self._settle_seen_url(record, not JobJournal.is_transient(error_result))
+        
+        # エラーコールバック
+        if error_callback:
+            error_callback(error_result)
+        
+        # 進捗コールバック（エラー）
+        if progress_callback:
+            progress_callback(url, None, None, f"エラー: {str(e)}")
+        
+        return error_result
+    
+    async def extract_from_url_async(self, session, executor, url, timeout=None, check_duplicate=True, pool=None):
+        """URLから本文を非同期で抽出する（extract_from_urlの非同期版、poolは本文抽出プロセスプール）"""
+        if timeout is None:
+            timeout = self.options['timeout']
+        
+        # URL正規化と除外判定
+        record = self._screen_url(url, check_duplicate)
+        normalized_url = record.url
+        
+        # 拡張子で判定できるカテゴリは取得前に振り分け、それ以外はレスポンスヘッダーで判定
+        url_category = record.category
+        if url_category:
+            self._classify_url(normalized_url, url_category, record.is_pdf)
+        
+        # HTMLを取得
+        html = await self.fetch_url_async(session, executor, record, timeout, classify=url_category is None)
+        
+        if not html:
+            raise ValueError(f"{normalized_url} の取得に失敗しました。")
+        
+        # 本文抽出（CPU処理は抽出プロセス、プールがなければスレッドで実行）
+        extraction_result = await self._extract_main_content_async(executor, html, normalized_url, pool)
+        
+        return self._check_extraction_result(normalized_url, extraction_result)
+    
+    async def _extract_main_content_async(self, executor, html, url, pool=None):
+        """extract_main_contentの非同期版（イベントループの外で抽出）"""
+        loop = asyncio.get_running_loop()
+        if pool is None:
+            return await loop.run_in_executor(executor, self.extract_main_content, html, url)
+        
+        # 抽出結果キャッシュの読み書き（ハッシュ計算・SQLite・シリアライズ）もスレッドで行う
+        result_key = await loop.run_in_executor(executor, self._get_result_key, html, url)
+        result = await loop.run_in_executor(executor, self._get_cached_result, result_key, url)
+        if result is not None:
+            return result
+        
+        worker_result = await asyncio.wrap_future(pool.submit(html, url))
+        return await loop.run_in_executor(executor, self._finish_pool_extraction, result_key, worker_result)
+    
+    async def fetch_url_async(self, session, executor, url, timeout=None, classify=False):
+        """URLからHTMLコンテンツを非同期で取得（キャッシュ対応）
+        
+        キャッシュの読み書き・圧縮・エンコーディングの検出とデコードはイベントループを塞がないように
+        executorのスレッドで行う。
+        """
+        if timeout is None:
+            timeout = self.options['timeout']
+        
+        # URL正規化（取り込み時に作成済みのレコードはそのまま使う）
+        record = URLRecord.parse(url)
+        if record is None:
+            raise ValueError(f"無効なURL形式です: {url}")
+        normalized_url = record.url
+        
+        # キャッシュチェック
+        loop = asyncio.get_running_loop()
+        url_hash = record.url_hash
+        cache_entry = await loop.run_in_executor(executor, self._get_cache_entry, url_hash)
+        if cache_entry is not None and self._is_cache_fresh(cache_entry):
+            logger.info(f"キャッシュから取得: {normalized_url}")
+            if classify:
+                self._classify_cached_content(normalized_url, cache_entry)
+            return await loop.run_in_executor(executor, self._decode_cache_entry, cache_entry)
+        
+        headers = self.get_headers()
+        # 期限切れのキャッシュがあれば条件付きリクエストで再検証
+        headers.update(self._get_revalidation_headers(cache_entry))
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
         
-        # 処理用のワーカーを起動
-        results = []
-        total_urls = len(normalized_urls)
-        processed = 0
+        try:
+            try:
+                async with session.get(normalized_url, headers=headers, timeout=client_timeout) as response:
+                    return await self._read_async_response(response, executor, normalized_url, url_hash, cache_entry, classify)
+            except aiohttp.ClientSSLError:
+                # SSL証明書エラーの場合、検証をスキップして再試行
+                logger.warning(f"SSL証明書エラーのため検証をスキップして再試行: {normalized_url}")
+                async with session.get(normalized_url, headers=headers, timeout=client_timeout, ssl=False) as response:
+                    return await self._read_async_response(response, executor, normalized_url, url_hash, cache_entry, classify)
         
-        # プログレスコールバックで初期状態を通知
-        if progress_callback:
-            progress_callback(None, 0, total_urls, "開始中...")
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"タイムアウト: {timeout}秒以内に応答がありませんでした。")
+        except aiohttp.TooManyRedirects:
+            raise ValueError(f"リダイレクトが多すぎます: {normalized_url}")
+        except aiohttp.ClientResponseError as e:
+            # ステータスコードとRetry-Afterをスケジューラに伝える
+            retry_after = parse_retry_after(e.headers.get('Retry-After')) if e.headers else None
+            raise FetchError(f"URLの取得に失敗しました: {e}", e.status, retry_after)
+        except aiohttp.ClientError as e:
+            raise FetchError(f"URLの取得に失敗しました: {e}")
+    
+    async def _read_async_response(self, response, executor, normalized_url, url_hash, cache_entry, classify):
+        """非同期レスポンスを検証し、本文をテキストとして読み込む"""
+        response.raise_for_status()
+        loop = asyncio.get_running_loop()
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # URLごとにタスクを投入
-            future_to_url = {executor.submit(self.process_single_url, url, callback, error_callback, progress_callback): url for url in normalized_urls}
-            
-            # 完了したタスクを処理
-            for future in concurrent.futures.as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"URL処理エラー: {url} - {e}")
-                    # すでに個別のタスクでエラーハンドリングされているので、ここでは何もしない
-                
-                # 進捗を更新
-                processed += 1
-                if progress_callback:
-                    progress_callback(url, processed, total_urls, f"処理済み: {processed}/{total_urls}")
+        # 変更がなければキャッシュを再利用
+        if response.status == 304:
+            return await loop.run_in_executor(
+                executor, self._refresh_cached_content, normalized_url, url_hash, cache_entry, response.headers, classify)
         
-        # 最終的なカテゴリ別の統計情報を生成
-        stats = {category: len(urls) for category, urls in self.categorized_urls.items()}
+        # Content-Typeと先頭バイトからPDF/HTMLを振り分け
+        content_type = response.headers.get('Content-Type', '').lower()
+        head = await response.content.read(65536)
+        is_pdf = self._route_response(normalized_url, content_type, head, classify)
         
-        # 完了通知
-        if progress_callback:
-            progress_callback(None, total_urls, total_urls, "完了", stats)
+        body = head + await response.content.read()
+        
+        # PDFの場合、別処理
+        if is_pdf:
+            if not self.options['extract_pdf_text'] or not PDF_SUPPORT:
+                raise ValueError(f"PDFからのテキスト抽出が無効化されています: {normalized_url}")
+            return await loop.run_in_executor(executor, self.pdf_bytes_to_html, body, normalized_url)
         
-        return results
+        # エンコーディングの検出・デコード・キャッシュへの保存
+        return await loop.run_in_executor(
+            executor, self._decode_response_body, url_hash, body, content_type, response.headers)
     
-    def process_single_url(self, url, callback=None, error_callback=None, progress_callback=None):
-        """単一URLの処理（並列処理用）"""
-        try:
-            # 進捗コールバック（URL処理開始）
-            if progress_callback:
-                progress_callback(url, None, None, "処理中")
-            
-            # URL処理
-            extraction_result = self.extract_from_url(url)
-            
-            # 結果を整形
-            if isinstance(extraction_result, dict):
-                content = extraction_result.get('formatted_text', extraction_result.get('content', ''))
-            else:
-                content = extraction_result
-            
-            # 結果を構築
-            result = {
-                'url': url,
-                'content': content,
-                'raw_result': extraction_result,
-                'success': True,
-                'timestamp': datetime.datetime.now().isoformat(),
-                'category': 'html'  # デフォルト値
-            }
-            
-            # URLカテゴリがあれば追加
-            for category, urls in self.categorized_urls.items():
-                if url in urls:
-                    result['category'] = category
-                    break
-            
-            # 成功コールバック
-            if callback:
-                callback(result)
-            
-            return result
-            
-        except Exception as e:
-            logger.exception(f"URL処理エラー: {url}")
-            
-            # カテゴリ判定を試みる
-            category = 'invalid'
-            for cat, urls in self.categorized_urls.items():
-                if url in urls:
-                    category = cat
-                    break
-            
-            # エラー情報を構築
-            error_result = {
-                'url': url,
-                'content': f"エラー: {str(e)}",
-                'success': False,
-                'error': str(e),
-                'error_type': type(e).__name__,
-                'timestamp': datetime.datetime.now().isoformat(),
-                'category': category
-            }
-            
-            # エラーコールバック
-            if error_callback:
-                error_callback(error_result)
-            
-            # 進捗コールバック（エラー）
-            if progress_callback:
-                progress_callback(url, None, None, f"エラー: {str(e)}")
-            
-            # エラー時の処理継続判定
-            if not self.options.get('continue_on_error', True):
-                raise
-            
-            return error_result
-
     def combine_results_to_single_file(self, results, format_type='txt', include_headers=True, include_errors=False, separate_sections=True):
-    """
+        """
     複数の抽出結果を1つのファイルにまとめる
     
     Parameters:
@@ -1717,15 +4796,15 @@ class WebContentExtractor:
     Returns:
     - コンバインされたテキスト
     """
-    combined_text = ""
+        combined_text = ""
     
-    # (残りのコード)
+        # (残りのコード)
     
-    # 出力ファイルのヘッダー
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # 出力ファイルのヘッダー
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    if format_type == 'html':
-        combined_text += f"""<!DOCTYPE html>
+        if format_type == 'html':
+            combined_text += f"""<!DOCTYPE html>
 <html>
 <head>
     <title>Web テキスト抽出結果</title>
@@ -1736,110 +4815,110 @@ class WebContentExtractor:
     <p>抽出日時: {timestamp}</p>
     <p>URL件数: {len(results)}件</p>
 """
-    elif format_type == 'md':
-        combined_text += f"# Web テキスト抽出結果\n\n"
-        combined_text += f"抽出日時: {timestamp}\n\n"
-        combined_text += f"URL件数: {len(results)}件\n\n"
-    else:  # txt
-        combined_text += f"=== Web テキスト抽出結果 ===\n\n"
-        combined_text += f"抽出日時: {timestamp}\n"
-        combined_text += f"URL件数: {len(results)}件\n\n"
-        combined_text += f"{'=' * 60}\n\n"
-    
-    # カテゴリ別に分類
-    if separate_sections:
-        categorized_results = {}
-        for result in results:
-            # エラー結果をスキップ（オプションによる）
-            if not result['success'] and not include_errors:
-                continue
+        elif format_type == 'md':
+            combined_text += f"# Web テキスト抽出結果\n\n"
+            combined_text += f"抽出日時: {timestamp}\n\n"
+            combined_text += f"URL件数: {len(results)}件\n\n"
+        else:  # txt
+            combined_text += f"=== Web テキスト抽出結果 ===\n\n"
+            combined_text += f"抽出日時: {timestamp}\n"
+            combined_text += f"URL件数: {len(results)}件\n\n"
+            combined_text += f"{'=' * 60}\n\n"
+    
+        # カテゴリ別に分類
+        if separate_sections:
+            categorized_results = {}
+            for result in results:
+                # エラー結果をスキップ（オプションによる）
+                if not result['success'] and not include_errors:
+                    continue
             
-            category = result.get('category', 'html')
-            if category not in categorized_results:
-                categorized_results[category] = []
+                category = result.get('category', 'html')
+                if category not in categorized_results:
+                    categorized_results[category] = []
             
-            categorized_results[category].append(result)
+                categorized_results[category].append(result)
         
-        # 通常のHTMLコンテンツを先に表示
-        category_order = ['html', 'document', 'pdf', 'image', 'video', 'audio', 'archive', 'ecommerce', 'adult', 'duplicate', 'invalid']
+            # 通常のHTMLコンテンツを先に表示
+            category_order = ['html', 'document', 'pdf', 'image', 'video', 'audio', 'archive', 'ecommerce', 'adult', 'duplicate', 'invalid']
         
-        for category in category_order:
-            if category not in categorized_results:
-                continue
+            for category in category_order:
+                if category not in categorized_results:
+                    continue
             
-            category_results = categorized_results[category]
-            if not category_results:
-                continue
+                category_results = categorized_results[category]
+                if not category_results:
+                    continue
             
-            # カテゴリヘッダー
-            if format_type == 'html':
-                combined_text += f"""
+                # カテゴリヘッダー
+                if format_type == 'html':
+                    combined_text += f"""
 <section class="category">
 <h2>{category.capitalize()} コンテンツ ({len(category_results)}件)</h2>
 """
-            elif format_type == 'md':
-                combined_text += f"## {category.capitalize()} コンテンツ ({len(category_results)}件)\n\n"
-            else:  # txt
-                combined_text += f"=== {category.capitalize()} コンテンツ ({len(category_results)}件) ===\n\n"
+                elif format_type == 'md':
+                    combined_text += f"## {category.capitalize()} コンテンツ ({len(category_results)}件)\n\n"
+                else:  # txt
+                    combined_text += f"=== {category.capitalize()} コンテンツ ({len(category_results)}件) ===\n\n"
             
-            # 各結果を追加
-            for result in category_results:
+                # 各結果を追加
+                for result in category_results:
+                    combined_text += self._format_single_result(result, format_type, include_headers)
+                
+                if format_type == 'html':
+                    combined_text += """
+</section>
+"""
+                else:
+                    if format_type == 'md':
+                        combined_text += "\n---\n\n"
+                    else:  # txt
+                        combined_text += f"\n{'=' * 60}\n\n"
+        else:
+            # セクション分けなし - 単純に追加
+            for result in results:
+                # エラー結果をスキップ（オプションによる）
+                if not result['success'] and not include_errors:
+                    continue
+                
                 combined_text += self._format_single_result(result, format_type, include_headers)
             
-            if format_type == 'html':
-                combined_text += """
-</section>
+                # セパレータ
+                if format_type == 'html':
+                    combined_text += """
+<hr>
 """
-            else:
-                if format_type == 'md':
+                elif format_type == 'md':
                     combined_text += "\n---\n\n"
                 else:  # txt
                     combined_text += f"\n{'=' * 60}\n\n"
-    else:
-        # セクション分けなし - 単純に追加
-        for result in results:
-            # エラー結果をスキップ（オプションによる）
-            if not result['success'] and not include_errors:
-                continue
-            
-            combined_text += self._format_single_result(result, format_type, include_headers)
-            
-            # セパレータ
-            if format_type == 'html':
-                combined_text += """
-<hr>
-"""
-            elif format_type == 'md':
-                combined_text += "\n---\n\n"
-            else:  # txt
-                combined_text += f"\n{'=' * 60}\n\n"
 
-    # フッター
-    if format_type == 'html':
-        combined_text += """
+        # フッター
+        if format_type == 'html':
+            combined_text += """
 </body>
 </html>
 """
 
-    return combined_text
+        return combined_text
 
-def _format_single_result(self, result, format_type, include_headers):
-    """単一の結果をフォーマット"""
-    formatted_text = ""
+    def _format_single_result(self, result, format_type, include_headers):
+        """単一の結果をフォーマット"""
+        formatted_text = ""
     
-    url = result.get('url', '')
-    timestamp = result.get('timestamp', '')
+        url = result.get('url', '')
+        timestamp = result.get('timestamp', '')
     
-    # 成功か失敗かによって処理を分ける
-    if result.get('success', False):
-        # 成功結果の場合
-        content = result.get('content', '')
-        raw_result = result.get('raw_result', {})
-        title = raw_result.get('title', '') if isinstance(raw_result, dict) else ''
-        
-        if include_headers:
-            if format_type == 'html':
-                formatted_text += f"""
+        # 成功か失敗かによって処理を分ける
+        if result.get('success', False):
+            # 成功結果の場合
+            content = result.get('content', '')
+            raw_result = result.get('raw_result', {})
+            title = raw_result.get('title', '') if isinstance(raw_result, dict) else ''
+        
+            if include_headers:
+                if format_type == 'html':
+                    formatted_text += f"""
 <div class="result">
     <h2><a href="{url}" target="_blank">{url}</a></h2>
     {f"<h3>{title}</h3>" if title else ""}
@@ -1849,50 +4928,326 @@ def _format_single_result(self, result, format_type, include_headers):
     </div>
 </div>
 """
-            elif format_type == 'md':
-                formatted_text += f"### [{url}]({url})\n\n"
-                if title:
-                    formatted_text += f"#### {title}\n\n"
-                formatted_text += f"抽出日時: {timestamp}\n\n"
-                formatted_text += f"{content}\n\n"
-            else:  # txt
-                formatted_text += f"URL: {url}\n"
-                if title:
-                    formatted_text += f"タイトル: {title}\n"
-                formatted_text += f"抽出日時: {timestamp}\n\n"
-                formatted_text += f"{content}\n\n"
-        else:
-            # ヘッダーなし（コンテンツのみ）
-            if format_type == 'html':
-                formatted_text += f"""
+                elif format_type == 'md':
+                    formatted_text += f"### [{url}]({url})\n\n"
+                    if title:
+                        formatted_text += f"#### {title}\n\n"
+                    formatted_text += f"抽出日時: {timestamp}\n\n"
+                    formatted_text += f"{content}\n\n"
+                else:  # txt
+                    formatted_text += f"URL: {url}\n"
+                    if title:
+                        formatted_text += f"タイトル: {title}\n"
+                    formatted_text += f"抽出日時: {timestamp}\n\n"
+                    formatted_text += f"{content}\n\n"
+            else:
+                # ヘッダーなし（コンテンツのみ）
+                if format_type == 'html':
+                    formatted_text += f"""
 <div class="content">
     {content}
 </div>
 """
-            else:
-                formatted_text += f"{content}\n\n"
-    else:
-        # エラー結果の場合
-        error_message = result.get('error', '不明なエラー')
+                else:
+                    formatted_text += f"{content}\n\n"
+        else:
+            # エラー結果の場合
+            error_message = result.get('error', '不明なエラー')
         
-        if format_type == 'html':
-            formatted_text += f"""
+            if format_type == 'html':
+                formatted_text += f"""
 <div class="result error">
     <h2><a href="{url}" target="_blank">{url}</a></h2>
     <p class="timestamp">抽出日時: {timestamp}</p>
     <p class="error-message">エラー: {error_message}</p>
 </div>
 """
-        elif format_type == 'md':
-            formatted_text += f"### [{url}]({url})\n\n"
-            formatted_text += f"抽出日時: {timestamp}\n\n"
-            formatted_text += f"**エラー**: {error_message}\n\n"
-        else:  # txt
-            formatted_text += f"URL: {url}\n"
-            formatted_text += f"抽出日時: {timestamp}\n"
-            formatted_text += f"エラー: {error_message}\n\n"
+            elif format_type == 'md':
+                formatted_text += f"### [{url}]({url})\n\n"
+                formatted_text += f"抽出日時: {timestamp}\n\n"
+                formatted_text += f"**エラー**: {error_message}\n\n"
+            else:  # txt
+                formatted_text += f"URL: {url}\n"
+                formatted_text += f"抽出日時: {timestamp}\n"
+                formatted_text += f"エラー: {error_message}\n\n"
     
-    return formatted_text
+        return formatted_text
+
+
+class ExtractionService:
+    """1つのWebContentExtractorを共有する常駐型の抽出サービス
+    
+    呼び出し元ごとに抽出器を作らず、コネクションプール・キャッシュ・本文抽出プロセスを
+    温めたまま使い回す。ジョブは上限付きの優先度キュー（値が小さいほど優先）に入れ、
+    固定数のワーカースレッドが処理する。
+    """
+    
+    def __init__(self, options=None, workers=None, max_queue=1000):
+        self.extractor = WebContentExtractor(options)
+        self.workers = workers or self.extractor.options.get('max_connections', 10)
+        self.jobs = queue.PriorityQueue(maxsize=max_queue)
+        self._sequence = itertools.count()
+        self._threads = []
+        self.server = None
+        
+        # 同時接続数に合わせてコネクションプールを拡張し、本文抽出プロセスを常駐させる
+        self.extractor.transport.ensure_pool_size(self.workers)
+        self.pool = self.extractor._create_extraction_pool()
+    
+    def start(self, host='127.0.0.1', port=8080):
+        """ワーカーを起動してHTTPサーバーを開始（停止されるまで戻らない）"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work_loop, name=f'ExtractionWorker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        
+        self.server = ExtractionHTTPServer((host, port), ExtractionRequestHandler)
+        self.server.service = self
+        logger.info(f"抽出サービスを開始しました: http://{host}:{self.server.server_port}/ (ワーカー {self.workers}個)")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+    
+    def shutdown(self):
+        """HTTPサーバーを停止（別スレッドから呼び出す）"""
+        if self.server is not None:
+            self.server.shutdown()
+    
+    def close(self):
+        """ワーカー・本文抽出プロセス・キャッシュを終了"""
+        if self.server is not None:
+            self.server.server_close()
+        for _ in self._threads:
+            self.jobs.put((float('inf'), next(self._sequence), None, None, None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        self.extractor.save_url_indexes()
+        self.extractor.close_cache()
+    
+    def submit(self, url, results, cancel_token, priority=0):
+        """ジョブをキューに追加（キューが満杯ならFalse）"""
+        try:
+            self.jobs.put_nowait((priority, next(self._sequence), url, results, cancel_token))
+            return True
+        except queue.Full:
+            return False
+    
+    def _work_loop(self):
+        while True:
+            priority, sequence, url, results, cancel_token = self.jobs.get()
+            if url is None:
+                break
+            
+            # 呼び出し元が切断したジョブは処理しない
+            if cancel_token.cancelled:
+                continue
+            
+            # 取得中に呼び出し元が切断した場合はチャンクの区切りで中断する
+            try:
+                results.put(self.extract(url, cancel_token))
+            except ExtractionCancelled:
+                continue
+    
+    def extract(self, url, cancel_token=None):
+        """1件のURLを処理して成功/エラーの結果を返す"""
+        extractor = self.extractor
+        
+        # 処理中に報告済みのエラー（continue_on_errorがFalseの場合は報告後に例外が再送出される）
+        reported = []
+        try:
+            if self.pool is None:
+                return extractor.process_single_url(
+                    url, error_callback=reported.append, check_duplicate=False, cancel_token=cancel_token)
+            
+            # 取得はワーカースレッド、本文抽出は常駐の抽出プロセスで行う
+            stage = extractor._process_fetch_stage(url, error_callback=reported.append, cancel_token=cancel_token)
+            if 'html' not in stage:
+                return stage
+            future = self.pool.submit(stage.pop('html'), stage['normalized_url'])
+            return extractor._process_extraction_stage(url, stage, future, error_callback=reported.append)
+        except ExtractionCancelled:
+            raise
+        except Exception as e:
+            if reported:
+                return reported[-1]
+            return extractor._handle_error(url, e)
+    
+    def get_stats(self):
+        """サービスの状態（キューの件数・プールと解析の統計・カテゴリ別件数）"""
+        extractor = self.extractor
+        return {
+            'queued': self.jobs.qsize(),
+            'workers': self.workers,
+            'extraction_processes': self.pool.processes if self.pool is not None else 1,
+            'pool': extractor.get_pool_stats(),
+            'parse': extractor.get_parse_stats(),
+            'categories': extractor.get_category_stats()
+        }
+
+
+class ExtractionHTTPServer(http.server.ThreadingHTTPServer):
+    """抽出サービスのHTTPサーバー（リクエストごとのスレッドで処理）"""
+    
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # 標準エラー出力ではなくログに記録
+        logger.exception(f"リクエストの処理中にエラーが発生しました: {client_address}")
+
+
+class ExtractionRequestHandler(http.server.BaseHTTPRequestHandler):
+    """抽出サービスのHTTPリクエストハンドラ
+    
+    - GET  /extract?url=...&priority=N : 1件を抽出してJSONで返す
+    - POST /extract {"url": ..., "priority": N}
+    - POST /batch   {"urls": [...], "priority": N}（または1行1URLのテキスト）:
+      完了した順にNDJSONでストリーミング
+    - GET  /stats : サービスの状態
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    
+    # キューが満杯の場合に再試行を促す秒数
+    RETRY_AFTER = 1
+    
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+    
+    def do_GET(self):
+        parsed = urlsplit(self.path)
+        if parsed.path == '/stats':
+            self._send_json(200, self.server.service.get_stats())
+        elif parsed.path == '/extract':
+            params = urllib.parse.parse_qs(parsed.query)
+            self._handle_extract(params.get('url', [''])[0], params.get('priority', ['0'])[0])
+        else:
+            self._send_json(404, {'error': f"不明なパスです: {parsed.path}"})
+    
+    def do_POST(self):
+        parsed = urlsplit(self.path)
+        try:
+            body = self._read_body()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        
+        if parsed.path == '/extract':
+            self._handle_extract(body.get('url', ''), body.get('priority', 0))
+        elif parsed.path == '/batch':
+            self._handle_batch(body.get('urls', []), body.get('priority', 0))
+        else:
+            self._send_json(404, {'error': f"不明なパスです: {parsed.path}"})
+    
+    def _read_body(self):
+        """リクエストボディを読み込む（JSON以外は1行1URLのテキストとして扱う）"""
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length).decode('utf-8') if length else ''
+        if 'json' in (self.headers.get('Content-Type') or ''):
+            body = json.loads(data or '{}')
+            if not isinstance(body, dict):
+                raise ValueError("JSONオブジェクトを指定してください")
+            return body
+        
+        params = urllib.parse.parse_qs(urlsplit(self.path).query)
+        return {'urls': list(read_url_lines(data.splitlines())), 'priority': params.get('priority', ['0'])[0]}
+    
+    def _handle_extract(self, url, priority):
+        if not url:
+            self._send_json(400, {'error': "URLを指定してください"})
+            return
+        
+        results = queue.Queue()
+        cancel_token = CancellationToken()
+        if not self.server.service.submit(url, results, cancel_token, self._parse_priority(priority)):
+            self._send_json(503, {'error': "ジョブキューが満杯です"}, {'Retry-After': str(self.RETRY_AFTER)})
+            return
+        
+        try:
+            while True:
+                try:
+                    result = results.get(timeout=cancel_token.POLL_INTERVAL)
+                    break
+                except queue.Empty:
+                    if self._client_disconnected():
+                        raise ConnectionResetError("呼び出し元が切断しました")
+            
+            self._send_json(200, result)
+        except (BrokenPipeError, ConnectionResetError):
+            # 呼び出し元が切断した場合はジョブを取り消す
+            cancel_token.cancel()
+            self.close_connection = True
+    
+    def _handle_batch(self, urls, priority):
+        service = self.server.service
+        priority = self._parse_priority(priority)
+        results = queue.Queue()
+        cancel_token = CancellationToken()
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        url_iter = iter(urls)
+        url = next(url_iter, None)
+        pending = 0
+        try:
+            while url is not None or pending:
+                # キューに空きがある分だけ投入（満杯の間は結果の送信を進める）
+                while url is not None and service.submit(url, results, cancel_token, priority):
+                    pending += 1
+                    url = next(url_iter, None)
+                
+                try:
+                    result = results.get(timeout=0.1)
+                except queue.Empty:
+                    if self._client_disconnected():
+                        raise ConnectionResetError("呼び出し元が切断しました")
+                    continue
+                
+                pending -= 1
+                self._write_chunk(dump_result_json(result) + '\n')
+            
+            self._write_chunk('')
+        except (BrokenPipeError, ConnectionResetError):
+            # 呼び出し元が切断した場合は残りのジョブを取り消す
+            cancel_token.cancel()
+            self.close_connection = True
+    
+    def _client_disconnected(self):
+        """呼び出し元が接続を閉じたか（読み込み可能なのに受信データがない）"""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except (OSError, ValueError):
+            return True
+    
+    @staticmethod
+    def _parse_priority(priority):
+        try:
+            return int(priority)
+        except (TypeError, ValueError):
+            return 0
+    
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+    
+    def _send_json(self, status, data, headers=None):
+        body = dump_result_json(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
 
 
 class UltimateWebTextExtractorApp:
@@ -1920,6 +5275,7 @@ class UltimateWebTextExtractorApp:
         # アプリケーション状態
         self.is_processing = False
         self.worker_thread = None
+        self.cancel_token = None
         self.current_url_index = -1
         self.results = []
         self.start_time = None
@@ -2685,6 +6041,21 @@ class UltimateWebTextExtractorApp:
         
         row += 1
         
+        # HTMLパーサー
+        ttk.Label(basic_tab, text="HTMLパーサー:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        html_parser = tk.StringVar(value=self.extractor.options.get('html_parser', 'html.parser'))
+        settings_vars['html_parser'] = html_parser
+        
+        parsers = [("標準 (html.parser)", "html.parser"), ("lxml", "lxml"), ("selectolax", "selectolax")]
+        frame = ttk.Frame(basic_tab)
+        frame.grid(row=row, column=1, sticky=tk.W, pady=5)
+        
+        for i, (text, value) in enumerate(parsers):
+            ttk.Radiobutton(frame, text=text, variable=html_parser, value=value).grid(
+                row=0, column=i, padx=5)
+        
+        row += 1
+        
         # キャッシュ有効
         cache_enabled = tk.BooleanVar(value=self.extractor.options.get('cache_enabled', True))
         settings_vars['cache_enabled'] = cache_enabled
@@ -2699,6 +6070,46 @@ class UltimateWebTextExtractorApp:
             row=row, column=0, columnspan=2, sticky=tk.W, pady=5)
         row += 1
         
+        # 結果の逐次出力先
+        ttk.Label(basic_tab, text="結果の逐次出力先:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        result_sink_path = tk.StringVar(value=self.extractor.options.get('result_sink_path', ''))
+        settings_vars['result_sink_path'] = result_sink_path
+        frame = ttk.Frame(basic_tab)
+        frame.grid(row=row, column=1, sticky=tk.W, pady=5)
+        ttk.Entry(frame, textvariable=result_sink_path, width=30).grid(row=0, column=0, padx=5)
+        
+        def browse_sink_path():
+            path = filedialog.asksaveasfilename(
+                title="結果の逐次出力先",
+                defaultextension=".jsonl",
+                filetypes=[("JSON Lines", "*.jsonl"), ("CSVファイル", "*.csv"), ("SQLiteデータベース", "*.sqlite")]
+            )
+            if path:
+                result_sink_path.set(path)
+        
+        ttk.Button(frame, text="参照...", command=browse_sink_path).grid(row=0, column=1)
+        row += 1
+        
+        # ジョブジャーナル（中断したバッチの再開用）
+        ttk.Label(basic_tab, text="ジョブジャーナル:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        job_journal_path = tk.StringVar(value=self.extractor.options.get('job_journal_path', ''))
+        settings_vars['job_journal_path'] = job_journal_path
+        frame = ttk.Frame(basic_tab)
+        frame.grid(row=row, column=1, sticky=tk.W, pady=5)
+        ttk.Entry(frame, textvariable=job_journal_path, width=30).grid(row=0, column=0, padx=5)
+        
+        def browse_journal_path():
+            path = filedialog.asksaveasfilename(
+                title="ジョブジャーナル",
+                defaultextension=".journal",
+                filetypes=[("ジョブジャーナル", "*.journal"), ("すべてのファイル", "*.*")]
+            )
+            if path:
+                job_journal_path.set(path)
+        
+        ttk.Button(frame, text="参照...", command=browse_journal_path).grid(row=0, column=1)
+        row += 1
+        
         # 多言語サポート
         multilingual = tk.BooleanVar(value=self.extractor.options.get('multilingual_support', True))
         settings_vars['multilingual_support'] = multilingual
@@ -2806,6 +6217,44 @@ class UltimateWebTextExtractorApp:
             row=row, column=1, sticky=tk.W, pady=5)
         row += 1
         
+        # 取得エンジン
+        ttk.Label(connection_tab, text="取得エンジン:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        fetch_engine = tk.StringVar(value=self.extractor.options.get('fetch_engine', 'thread'))
+        settings_vars['fetch_engine'] = fetch_engine
+        
+        engines = [("スレッド", "thread"), ("非同期 (asyncio)", "async")]
+        frame = ttk.Frame(connection_tab)
+        frame.grid(row=row, column=1, sticky=tk.W, pady=5)
+        
+        for i, (text, value) in enumerate(engines):
+            ttk.Radiobutton(frame, text=text, variable=fetch_engine, value=value).grid(
+                row=0, column=i, padx=5)
+        
+        row += 1
+        
+        # 非同期エンジンの同時リクエスト数
+        ttk.Label(connection_tab, text="非同期同時リクエスト数:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        async_concurrency = tk.IntVar(value=self.extractor.options.get('async_concurrency', 500))
+        settings_vars['async_concurrency'] = async_concurrency
+        ttk.Spinbox(connection_tab, from_=10, to=5000, increment=10, textvariable=async_concurrency, width=10).grid(
+            row=row, column=1, sticky=tk.W, pady=5)
+        row += 1
+        
+        # ドメインごとのレート制限
+        ttk.Label(connection_tab, text="ドメインごとの毎秒リクエスト数:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        domain_rate_limit = tk.DoubleVar(value=self.extractor.options.get('domain_rate_limit', 2.0))
+        settings_vars['domain_rate_limit'] = domain_rate_limit
+        ttk.Spinbox(connection_tab, from_=0, to=100, increment=0.5, textvariable=domain_rate_limit, width=10).grid(
+            row=row, column=1, sticky=tk.W, pady=5)
+        row += 1
+        
+        ttk.Label(connection_tab, text="ドメインごとの同時接続数:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        domain_max_connections = tk.IntVar(value=self.extractor.options.get('domain_max_connections', 2))
+        settings_vars['domain_max_connections'] = domain_max_connections
+        ttk.Spinbox(connection_tab, from_=1, to=50, textvariable=domain_max_connections, width=10).grid(
+            row=row, column=1, sticky=tk.W, pady=5)
+        row += 1
+        
         # ユーザーエージェントローテーション
         user_agent_rotation = tk.BooleanVar(value=self.extractor.options.get('user_agent_rotation', True))
         settings_vars['user_agent_rotation'] = user_agent_rotation
@@ -2866,6 +6315,7 @@ class UltimateWebTextExtractorApp:
                     'normalize_spaces': True,
                     'multilingual_support': True,
                     'extraction_mode': 'auto',
+                    'html_parser': 'html.parser',
                     'continue_on_error': True,
                     'exclude_ecommerce': False,
                     'exclude_adult': False,
@@ -2874,10 +6324,16 @@ class UltimateWebTextExtractorApp:
                     'extract_images': False,
                     'extract_links': False,
                     'max_connections': 10,
+                    'fetch_engine': 'thread',
+                    'async_concurrency': 500,
+                    'domain_rate_limit': 2.0,
+                    'domain_max_connections': 2,
                     'timeout': 30,
                     'cache_enabled': True,
                     'user_agent_rotation': True,
-                    'extract_pdf_text': True
+                    'extract_pdf_text': True,
+                    'result_sink_path': '',
+                    'job_journal_path': ''
                 }
                 
                 # 変数を更新
@@ -2885,7 +6341,7 @@ class UltimateWebTextExtractorApp:
                     if key in default_options:
                         if isinstance(var, tk.BooleanVar):
                             var.set(default_options[key])
-                        elif isinstance(var, tk.IntVar):
+                        elif isinstance(var, (tk.IntVar, tk.DoubleVar)):
                             var.set(default_options[key])
                         elif isinstance(var, tk.StringVar):
                             var.set(default_options[key])
@@ -2935,8 +6391,9 @@ class UltimateWebTextExtractorApp:
         self.results = []
         self.output_text.delete('1.0', tk.END)
         
-        # スレッド用のキュー
+        # スレッド用のキューと取り消し用のトークン
         self.result_queue = queue.Queue()
+        self.cancel_token = CancellationToken()
         
         # 開始時刻を記録
         self.start_time = time.time()
@@ -2950,7 +6407,8 @@ class UltimateWebTextExtractorApp:
                 'max_workers': self.extractor.options.get('max_connections', 10),
                 'callback': self.on_url_success,
                 'error_callback': self.on_url_error,
-                'progress_callback': self.on_progress_update
+                'progress_callback': self.on_progress_update,
+                'cancel_token': self.cancel_token
             }
         )
         self.worker_thread.daemon = True
@@ -3089,10 +6547,13 @@ class UltimateWebTextExtractorApp:
             # UIを更新
             self.status_label.config(text="中断中...")
             
-            # スレッドを停止（Pythonではスレッドの強制終了は難しいのでフラグで管理）
+            # バッチを取り消し（未開始のURLは取り消され、取得中のURLはチャンクの区切りで中断）
+            if self.cancel_token is not None:
+                self.cancel_token.cancel()
+            
             if self.worker_thread and self.worker_thread.is_alive():
-                # スレッド停止を待機
-                self.worker_thread.join(1.0)
+                # 途中までの結果が出力先に同期されるのを待機
+                self.worker_thread.join(2.0)
             
             # 完了処理
             self.finalize_extraction()
@@ -3241,8 +6702,9 @@ class UltimateWebTextExtractorApp:
         self.results = []
         self.output_text.delete('1.0', tk.END)
         
-        # スレッド用のキュー
+        # スレッド用のキューと取り消し用のトークン
         self.result_queue = queue.Queue()
+        self.cancel_token = CancellationToken()
         
         # 開始時刻を記録
         self.start_time = time.time()
@@ -3256,7 +6718,8 @@ class UltimateWebTextExtractorApp:
                 'max_workers': self.extractor.options.get('max_connections', 10),
                 'callback': self.on_url_success,
                 'error_callback': self.on_url_error,
-                'progress_callback': self.on_progress_update
+                'progress_callback': self.on_progress_update,
+                'cancel_token': self.cancel_token
             }
         )
         self.worker_thread.daemon = True
@@ -3670,7 +7133,8 @@ class UltimateWebTextExtractorApp:
             'Pillow': 'PIL',
             'PyPDF2': 'PyPDF2',
             'lxml': 'lxml',
-            'chardet': 'chardet'
+            'chardet': 'chardet',
+            'aiohttp': 'aiohttp'
         }
         
         for package, module in required_packages.items():
@@ -3725,19 +7189,134 @@ class UltimateWebTextExtractorApp:
             if messagebox.askyesno("確認", "保存されていない結果があります。終了しますか？"):
                 # 設定を保存
                 self.save_settings()
-                # キャッシュを保存
-                self.extractor.save_cache()
+                # 書き込み待ちのキャッシュを保存して閉じる
+                self.extractor.close_cache()
                 self.root.destroy()
         else:
             # 設定を保存
             self.save_settings()
-            # キャッシュを保存
-            self.extractor.save_cache()
+            # 書き込み待ちのキャッシュを保存して閉じる
+            self.extractor.close_cache()
             self.root.destroy()
 
 
+def read_url_lines(lines):
+    """URLリストの各行からURLを取り出す（空行と#で始まる行は無視）"""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def cli_main(argv=None):
+    """コマンドラインモードのエントリーポイント（GUIモジュールを読み込まない）"""
+    parser = argparse.ArgumentParser(
+        description="URLリストの各ページから本文を抽出し、結果を完了した順に出力します。")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="URLリストのファイル（1行1URL、-または省略で標準入力）")
+    parser.add_argument('-o', '--output', default='-',
+                        help="結果の出力先（.jsonl / .csv / .sqlite、-または省略で標準出力にJSONL）")
+    parser.add_argument('-f', '--format', choices=sorted(RESULT_SINK_TYPES),
+                        help="出力形式（省略時は出力先の拡張子で判定）")
+    parser.add_argument('-w', '--workers', type=int,
+                        help="同時接続数（省略時はmax_connectionsオプション）")
+    parser.add_argument('--options',
+                        help="WebContentExtractorのオプションを記述したJSONファイル")
+    parser.add_argument('--journal',
+                        help="ジョブジャーナルのファイル（中断したバッチを再開）")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="標準エラー出力に進捗を表示しない")
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help="入力を処理せず、指定したポートで抽出サービスを起動")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="抽出サービスで待ち受けるアドレス（デフォルト: 127.0.0.1）")
+    parser.add_argument('--max-queue', type=int, default=1000,
+                        help="抽出サービスのジョブキューの上限")
+    args = parser.parse_args(argv)
+    
+    configure_logging()
+    
+    options = {}
+    if args.options:
+        with open(args.options, encoding='utf-8') as f:
+            options = json.load(f)
+    
+    if args.serve is not None:
+        service = ExtractionService(options, args.workers, args.max_queue)
+        # SIGTERMでも通常の停止処理を行う
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=service.shutdown).start())
+        try:
+            service.start(args.host, args.serve)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    
+    format_type = args.format or ('jsonl' if args.output == '-' else None)
+    try:
+        sink = open_result_sink(args.output, format_type)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    
+    extractor = WebContentExtractor(options)
+    journal = JobJournal(args.journal) if args.journal else None
+    
+    # Ctrl+C / SIGTERMではそれまでの結果を出力してから終了
+    cancel_token = CancellationToken()
+    
+    def request_cancel(signum, frame):
+        cancel_token.cancel()
+    
+    signal.signal(signal.SIGINT, request_cancel)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_cancel)
+    
+    input_file = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    start_time = time.monotonic()
+    last_report = 0.0
+    counts = Counter()
+    
+    def report_progress(final=False):
+        elapsed = time.monotonic() - start_time
+        rate = counts['total'] / elapsed if elapsed > 0 else 0.0
+        sys.stderr.write(f"\r処理済み: {counts['total']}件（成功 {counts['success']}件 / エラー {counts['error']}件）"
+                         f" {rate:.1f}件/秒")
+        if final:
+            sys.stderr.write("\n")
+        sys.stderr.flush()
+    
+    try:
+        results = extractor.iter_extract(
+            read_url_lines(input_file), args.workers, sinks=[sink], journal=journal, cancel_token=cancel_token)
+        for result in results:
+            counts['total'] += 1
+            counts['success' if result.get('success') else 'error'] += 1
+            
+            # 進捗は一定間隔で1行に上書き表示
+            if not args.quiet and time.monotonic() - last_report >= 0.5:
+                last_report = time.monotonic()
+                report_progress()
+    finally:
+        sink.close()
+        if journal is not None:
+            journal.close()
+        if input_file is not sys.stdin:
+            input_file.close()
+        extractor.close_cache()
+    
+    if not args.quiet:
+        report_progress(final=True)
+    
+    if cancel_token.cancelled:
+        sys.stderr.write("処理を中断しました。\n")
+        return 130
+    return 0
+
+
 def main():
     """アプリケーションのメインエントリーポイント"""
+    configure_logging()
+    load_gui_modules()
     root = tk.Tk()
     app = UltimateWebTextExtractorApp(root)
     
@@ -3751,6 +7330,10 @@ def main():
 
 
 if __name__ == "__main__":
+    # 引数があればコマンドラインモード（GUIモジュールの読み込みとパッケージのインストールを行わない）
+    if len(sys.argv) > 1:
+        sys.exit(cli_main())
+    
     # パッケージのインストールを確認
     if install_required_packages():
         main()